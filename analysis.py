@@ -0,0 +1,695 @@
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import analysis_backends
+import generation_guard
+import metrics
+import long_call
+import search_index
+import token_budget
+from disk_cache import DiskCache, default_cache_root
+from report_sections import SECTION_TITLES, split_sections
+
+# Shared Design Thinking analysis step used by analyze_call.py, app.py and app_gradio.py.
+
+DEFAULT_MODEL_ID = analysis_backends.DEFAULT_MODEL_ID
+DEFAULT_MAX_TOKENS = 2500
+DEFAULT_TEMPERATURE = 0.3  # Lower temperature for more focused analysis
+
+# Parallel section groups: the framework is split into independent groups that
+# are requested at the same time, each with its own share of max_tokens, so the
+# report takes about as long as the longest group instead of all 8 sections
+# back to back. Off by default (CALL_ANALYZER_PARALLEL_SECTIONS=1 or
+# parallel_sections=True).
+PARALLEL_SECTIONS = os.getenv("CALL_ANALYZER_PARALLEL_SECTIONS", "0") == "1"
+# (name, sections, max_tokens at DEFAULT_MAX_TOKENS)
+SECTION_GROUPS = (
+    ("emotion_control", (1, 2, 3), 1000),
+    ("trust_exit", (4, 5), 700),
+    ("pressure_reframe", (6, 7, 8), 1100),  # + the closing reflective line
+)
+
+# Stands in for the sections of a group whose request failed
+SECTION_UNAVAILABLE = "_(Section unavailable: the request for it failed.)_"
+
+# Pre-flight: transcripts with fewer words than this (silence, "Thank you.")
+# are answered locally, as rule 4 of the prompt would, without a request
+MIN_TRANSCRIPT_WORDS = int(os.getenv("CALL_ANALYZER_MIN_TRANSCRIPT_WORDS", "12"))
+UNCLEAR_REPORT = "Transcript is unclear: the recording has too little speech to analyze ({words} words transcribed)."
+
+ANALYSIS_CACHE_MB = int(os.getenv("CALL_ANALYZER_ANALYSIS_CACHE_MB", "64"))
+ANALYSIS_CACHE_TTL_HOURS = float(os.getenv("CALL_ANALYZER_ANALYSIS_CACHE_TTL_HOURS", str(24 * 7)))
+
+# The User's specific "Design Thinking Fellow" persona prompt
+SYSTEM_PROMPT = """
+You are not a chatbot.
+You are a Design Thinking Fellow analyzing a real conversation between a team member and a business founder.
+
+Your job is NOT to summarize the conversation.
+Your job is to deeply understand what was FELT, not just what was SAID.
+
+Analyze the conversation using the following mindset:
+
+1. Founder Context Awareness
+   - Assume the founder is busy, risk-aware, and mentally filtering noise.
+   - Identify what pressure, hesitation, or expectation the founder might be carrying at each moment.
+
+2. Emotional State Mapping
+   - Track how the founder’s emotional state shifts during the conversation
+     (curious → guarded → disengaged / open → rushed → skeptical, etc.).
+   - Explain WHY those shifts happened.
+
+3. Control & Power Balance
+   - Identify who had control of the conversation at different points.
+   - Explain moments where control was lost or forcefully taken.
+
+4. Trust & Risk Perception
+   - Analyze how each statement either reduced or increased the founder’s perceived risk.
+   - Focus on clarity, time respect, and relevance — not politeness.
+
+5. Discomfort & Exit Signals
+   - Identify subtle discomfort signals such as pauses, vague affirmations,
+     topic changes, or suggestions to “email later.”
+   - Explain what these signals actually mean in a real business context.
+
+6. Pressure Response of the Caller
+   - Identify how the caller behaved under pressure
+     (over-explaining, justifying, selling, rushing, or grounding the conversation).
+   - Explain what this reveals about the caller’s maturity.
+
+7. How I Would Speak Differently
+   - Do NOT write a full script.
+   - Instead, explain what you would remove, reduce, or reframe to give
+     the founder more control and mental comfort.
+
+8. My Conversation Analysis Framework
+   - Build a short, original framework that analyzes conversations based on:
+     emotion, control, risk, energy exchange, and exit signals.
+   - Focus on understanding human behavior, not communication theory.
+
+Important:
+- Avoid generic advice, soft language, or textbook communication tips.
+- Write like a thoughtful human who understands business pressure.
+- Prioritize empathy, clarity, and respect for mental space.
+- The goal is insight, not perfection.
+
+End the analysis with one reflective line about what this conversation teaches
+about trust, maturity, or human interaction in real-world business settings.
+"""
+
+
+# Section blocks inside SYSTEM_PROMPT
+_PROMPT_SECTION_RE = re.compile(r"^([1-8])\. ", re.MULTILINE)
+
+# Language specific instruction (rule 5 of the user message)
+LANGUAGE_INSTRUCTIONS = {
+    "Hinglish": "5. OUTPUT LANGUAGE: Generate the ENTIRE analysis in HINGLISH (Natural mix of Hindi and English). Keep technical headers in English, but explain the insights in Hinglish (e.g., 'Founder kaafi guarded lag raha tha').",
+    "English": "5. OUTPUT LANGUAGE: Generate the analysis in standard professional ENGLISH.",
+}
+
+# Yielded by stream_analyze() when the generation guard restarts the report:
+# consumers should drop the text received so far
+RESTART = object()
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(
+            os.path.join(default_cache_root(), "analyses"),
+            max_bytes=ANALYSIS_CACHE_MB * 1024 * 1024,
+            ttl_seconds=ANALYSIS_CACHE_TTL_HOURS * 3600,
+        )
+    return _cache
+
+
+def _lang_instruction(language):
+    if language is None:
+        return ""
+    return LANGUAGE_INSTRUCTIONS.get(language, LANGUAGE_INSTRUCTIONS["English"]) + "\n"
+
+
+def section_system_prompt(numbers):
+    """
+    SYSTEM_PROMPT with only the given framework sections. The closing
+    reflective line is asked for together with section 8.
+    """
+    starts = {int(m.group(1)): m.start() for m in _PROMPT_SECTION_RE.finditer(SYSTEM_PROMPT)}
+    important = SYSTEM_PROMPT.index("Important:")
+    closing = SYSTEM_PROMPT.index("End the analysis")
+    blocks = "".join(SYSTEM_PROMPT[starts[n]:starts.get(n + 1, important)] for n in sorted(numbers))
+    prompt = SYSTEM_PROMPT[:starts[1]] + blocks + SYSTEM_PROMPT[important:closing]
+    if 8 in numbers:
+        prompt += SYSTEM_PROMPT[closing:]
+    return prompt
+
+
+def build_messages(transcript, language=None, sections=None):
+    """
+    Builds the chat messages. language=None leaves out the output-language rule
+    (the CLI's original prompt). sections limits the request to some of the
+    framework sections (see SECTION_GROUPS).
+    """
+    lang_instruction = _lang_instruction(language)
+    system_prompt = SYSTEM_PROMPT if sections is None else section_system_prompt(sections)
+    section_label = "1-8" if sections is None else ", ".join(str(n) for n in sorted(sections))
+
+    # Improved prompt to prevent hallucination
+    user_message = f"""
+Here is the raw transcript of a real call. 
+Your task is to analyze it using the Design Thinking framework provided in the system prompt.
+
+RULES:
+1. Do NOT generate any new dialogue or conversation.
+2. Do NOT repeat the transcript.
+3. OUTPUT ONLY the analysis sections ({section_label}).
+4. If the transcript is empty or unclear, say "Transcript is unclear".
+{lang_instruction}
+--- TRANSCRIPT BEGINS ---
+{transcript}
+--- TRANSCRIPT ENDS ---
+
+Analyze the transcript now:
+"""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+
+def render_sections(sections):
+    """
+    {number: text} -> the report layout ("**1. Founder Context Awareness**" + text).
+    """
+    return "\n\n".join(f"**{n}. {SECTION_TITLES[n]}**\n\n{sections[n]}" for n in sorted(sections) if n)
+
+
+def _group_sections(numbers, text):
+    # A group's own sections from its output; sections it wrote for other
+    # groups are dropped. No headings at all ("Transcript is unclear") is kept
+    # under the group's first section.
+    parsed = split_sections(text)
+    if not any(parsed.get(n) for n in numbers):
+        return {numbers[0]: text.strip()} if text.strip() else {}
+    return {n: parsed[n] for n in numbers if parsed.get(n)}
+
+
+def assemble_sections(group_texts):
+    """
+    Joins the outputs of SECTION_GROUPS (same order) into one report.
+    """
+    if not any(split_sections(text).keys() - {0} for text in group_texts):
+        # Every group answered without sections: one answer is enough
+        return next((text.strip() for text in group_texts if text.strip()), "")
+    sections = {}
+    for (_, numbers, _), text in zip(SECTION_GROUPS, group_texts):
+        sections.update(_group_sections(numbers, text))
+    return render_sections(sections)
+
+
+def _group_requests(transcript, language, model_id, max_tokens):
+    """
+    [(name, messages, max_tokens)] per section group, or None if a group
+    prompt doesn't fit the context window (the long-call path handles those).
+    """
+    requests = []
+    for name, numbers, group_tokens in SECTION_GROUPS:
+        messages = build_messages(transcript, language, sections=numbers)
+        group_max = max(1, round(group_tokens * max_tokens / DEFAULT_MAX_TOKENS))
+        if not token_budget.fits(messages, model_id, group_max):
+            return None
+        requests.append((name, messages, group_max))
+    return requests
+
+
+def _run_group(backend, token, model_id, name, messages, transcript, max_tokens, temperature, retry_log, outcome,
+               usage):
+    # One group's guarded, streamed request; runs on a worker thread
+    with metrics.span("analyze_group", attach=False, backend=backend.name, model=model_id, group=name,
+                      max_tokens=max_tokens) as span:
+        parts = []
+        for delta in _guarded_stream(backend, token, model_id, messages, transcript,
+                                     max_tokens, temperature, span, retry_log, outcome):
+            if delta is RESTART:
+                parts = []
+                continue
+            parts.append(delta)
+        text = "".join(parts)
+        usage.append(_record_tokens(span, model_id, messages, text))
+    return text
+
+
+def _group_result(future, name, numbers, outcome):
+    # A failed group leaves its sections marked unavailable instead of failing
+    # the whole report (which is then not cached); fails only if every group did
+    try:
+        return future.result()
+    except Exception as e:
+        failed = outcome.setdefault("failed_groups", [])
+        failed.append(name)
+        if len(failed) == len(SECTION_GROUPS):
+            raise
+        print(f"⚠️ Sections {', '.join(str(n) for n in numbers)} failed ({type(e).__name__}: {e}); "
+              f"continuing without them.")
+        metrics.inc("call_analyzer_section_group_failures_total", group=name)
+        return render_sections({n: SECTION_UNAVAILABLE for n in numbers})
+
+
+def _submit_groups(pool, backend, token, model_id, requests, transcript, temperature, retry_log, outcome, usage):
+    return [
+        pool.submit(_run_group, backend, token, model_id, name, messages, transcript, group_max,
+                    temperature, retry_log, outcome, usage)
+        for name, messages, group_max in requests
+    ]
+
+
+def _mode(parallel_sections):
+    # Extra fingerprint fields; the single-request key stays what it always was
+    return {"sections": "parallel"} if parallel_sections else {}
+
+
+def fingerprint(model_id, messages, **sampling):
+    """
+    Cache key over everything that shapes the output: model, full prompt
+    (system prompt, language rule, transcript) and sampling parameters.
+    """
+    payload = json.dumps(
+        {"model": model_id, "messages": messages, "sampling": sampling},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def preflight(transcript, language=None, model_id=DEFAULT_MODEL_ID, max_tokens=DEFAULT_MAX_TOKENS):
+    """
+    Budgets one analysis before anything is sent, with the model's tokenizer:
+    {"route", "max_tokens", "prompt_tokens", "transcript_tokens", "words"}.
+    route is "local" (too little speech: answered with UNCLEAR_REPORT),
+    "single" (max_tokens shrunk to what the context window leaves, if needed)
+    or "map_reduce" (long_call.py).
+    """
+    words = len(re.findall(r"\w+", transcript))
+    plan = {"route": "local", "max_tokens": 0, "prompt_tokens": 0, "transcript_tokens": 0, "words": words}
+    if words < MIN_TRANSCRIPT_WORDS:
+        return plan
+    messages = build_messages(transcript, language)
+    plan["prompt_tokens"] = token_budget.count_message_tokens(messages, model_id)
+    plan["transcript_tokens"] = token_budget.count_tokens(transcript, model_id)
+    plan["route"], plan["max_tokens"] = token_budget.plan_completion(plan["prompt_tokens"], model_id, max_tokens)
+    return plan
+
+
+def _request_messages(backend, messages, transcript, token, language, model_id, plan):
+    """
+    Returns the messages to actually send. If the single-shot prompt would
+    overflow the context window (see preflight), the transcript goes through
+    the map-reduce path (long_call.py) and the reduce prompt is returned instead.
+    """
+    if plan["route"] == "single":
+        return messages
+
+    notes = long_call.map_notes(transcript, token, model_id, _reduce_budget(language, model_id, plan["max_tokens"]),
+                                backend=backend)
+    return _reduce_messages(notes, language)
+
+
+def _reduce_budget(language, model_id, max_tokens):
+    # Tokens left for the notes next to the reduce prompt and the completion
+    reduce_template = long_call.build_reduce_user_message([], _lang_instruction(language))
+    return (
+        token_budget.context_window(model_id)
+        - max_tokens
+        - token_budget.count_message_tokens(
+            [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": reduce_template}],
+            model_id,
+        )
+    )
+
+
+def _reduce_messages(notes, language):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": long_call.build_reduce_user_message(notes, _lang_instruction(language))}
+    ]
+
+
+def _record_tokens(span, model_id, request_messages, report):
+    # Counted locally: the streamed backends don't report provider usage
+    prompt_tokens = token_budget.count_message_tokens(request_messages, model_id)
+    completion_tokens = token_budget.count_tokens(report, model_id)
+    span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, report_chars=len(report))
+    metrics.inc("call_analyzer_llm_tokens_total", prompt_tokens, kind="prompt", model=model_id)
+    metrics.inc("call_analyzer_llm_tokens_total", completion_tokens, kind="completion", model=model_id)
+    return prompt_tokens, completion_tokens
+
+
+def _record_preflight(span, plan, model_id):
+    span.set(route=plan["route"], max_tokens=plan["max_tokens"], transcript_tokens=plan["transcript_tokens"])
+    metrics.inc("call_analyzer_preflight_total", route=plan["route"], model=model_id)
+
+
+def _record_usage(model_id, backend, language, route, plan=None, prompt_tokens=0, completion_tokens=0):
+    # One line per analysis in the token usage log (capacity planning)
+    plan = plan or {}
+    token_budget.record_usage(
+        model=model_id, backend=backend.name, language=language, route=route,
+        transcript_tokens=plan.get("transcript_tokens"), max_tokens=plan.get("max_tokens"),
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+    )
+
+
+def _local_report(plan):
+    print(f"🔇 Transcript has only {plan['words']} words; skipping the model.")
+    return UNCLEAR_REPORT.format(words=plan["words"])
+
+
+def warm(backend=None):
+    """
+    Loads the backend's model and caches the SYSTEM_PROMPT prefix (local backends).
+    """
+    analysis_backends.get_backend(backend).warm(SYSTEM_PROMPT)
+
+
+def cached(transcript, language=None, model_id=None, max_tokens=DEFAULT_MAX_TOKENS,
+           temperature=DEFAULT_TEMPERATURE, backend=None, parallel_sections=None):
+    """
+    Returns the cached report for exactly this request, or None.
+    """
+    model_id = model_id or analysis_backends.get_backend(backend).default_model_id
+    parallel_sections = PARALLEL_SECTIONS if parallel_sections is None else parallel_sections
+    key = fingerprint(model_id, build_messages(transcript, language), max_tokens=max_tokens, temperature=temperature,
+                      **_mode(parallel_sections))
+    entry = get_cache().get(key)
+    return entry["analysis"] if entry is not None else None
+
+
+def _record_guard(span, model_id, guard, max_tokens, elapsed_s):
+    # What stopping early saved: the rest of max_tokens at the observed rate
+    generated = token_budget.count_tokens(guard.text, model_id)
+    saved_tokens = max(0, max_tokens - generated)
+    saved_s = saved_tokens * elapsed_s / generated if generated else 0.0
+    trips = span.attrs.get("guard", []) + [guard.reason]
+    span.set(
+        guard=trips,
+        guard_saved_tokens=span.attrs.get("guard_saved_tokens", 0) + saved_tokens,
+        guard_saved_s=round(span.attrs.get("guard_saved_s", 0.0) + saved_s, 2),
+    )
+    metrics.inc("call_analyzer_guard_trips_total", reason=guard.reason, model=model_id)
+    metrics.inc("call_analyzer_guard_saved_tokens_total", saved_tokens, model=model_id)
+    metrics.inc("call_analyzer_guard_saved_seconds_total", saved_s, model=model_id)
+    print(f"🛑 Stopped a degenerate generation ({generation_guard.REASONS[guard.reason]}) after "
+          f"{generated} tokens, saving ~{saved_tokens} tokens / ~{saved_s:.0f}s")
+
+
+def _guarded_stream(backend, token, model_id, request_messages, transcript, max_tokens, temperature,
+                    span, retry_log, outcome):
+    """
+    Streams the report through generation_guard. When the guard trips the
+    stream is closed right away, RESTART is yielded and the request is retried
+    once with adjusted sampling. If the retry trips too, its clean part is
+    kept with a note and outcome["degenerate"] is set.
+    """
+    sampling = {"temperature": temperature}
+    for attempt in range(2):
+        guard = generation_guard.GenerationGuard(transcript)
+        started = time.perf_counter()
+        stream = backend.stream(token, model_id, request_messages, max_tokens=max_tokens,
+                                retry_log=retry_log, **sampling)
+        try:
+            for delta in stream:
+                if generation_guard.ENABLED and guard.feed(delta):
+                    break
+                yield delta
+        finally:
+            stream.close()  # stops the provider from generating the rest
+        if guard.reason is None:
+            return
+
+        _record_guard(span, model_id, guard, max_tokens, time.perf_counter() - started)
+        yield RESTART
+        if attempt == 0:
+            sampling = generation_guard.retry_sampling(temperature)
+        else:
+            outcome["degenerate"] = True
+            yield (guard.clean_text()
+                   + f"\n\n_(Generation stopped early: {generation_guard.REASONS[guard.reason]}.)_")
+
+
+def analyze(transcript, token, language=None, model_id=None,
+            max_tokens=DEFAULT_MAX_TOKENS, temperature=DEFAULT_TEMPERATURE, fresh=False, backend=None,
+            parallel_sections=None):
+    """
+    Runs the Design Thinking analysis. Identical requests are answered from the
+    result cache; fresh=True skips the lookup and always asks the model for a
+    new sample (which then replaces the cached one). backend names an engine
+    from analysis_backends (CALL_ANALYZER_BACKEND by default).
+    parallel_sections requests the SECTION_GROUPS concurrently
+    (default: CALL_ANALYZER_PARALLEL_SECTIONS).
+    """
+    backend = analysis_backends.get_backend(backend)
+    model_id = model_id or backend.default_model_id
+    parallel_sections = PARALLEL_SECTIONS if parallel_sections is None else parallel_sections
+    messages = build_messages(transcript, language)
+    key = fingerprint(model_id, messages, max_tokens=max_tokens, temperature=temperature, **_mode(parallel_sections))
+
+    with metrics.span("analyze", backend=backend.name, model=model_id, language=language,
+                      transcript_chars=len(transcript), parallel_sections=parallel_sections) as span:
+        if not fresh:
+            cached = get_cache().get(key)
+            if cached is not None:
+                span.set(cached=True)
+                _record_usage(model_id, backend, language, "cache")
+                return cached["analysis"]
+
+        plan = preflight(transcript, language, model_id, max_tokens)
+        _record_preflight(span, plan, model_id)
+        if plan["route"] == "local":
+            _record_usage(model_id, backend, language, "local", plan)
+            return _local_report(plan)
+
+        if not token and backend.requires_token:
+            raise ValueError("No API Key provided.")
+
+        retry_log = []
+        outcome = {}
+        groups = _group_requests(transcript, language, model_id, max_tokens) if parallel_sections else None
+        if groups:
+            span.set(cached=False, map_reduce=False, groups=len(groups))
+            usage = []
+            with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                futures = _submit_groups(pool, backend, token, model_id, groups, transcript, temperature,
+                                         retry_log, outcome, usage)
+                analysis = assemble_sections([
+                    _group_result(future, name, numbers, outcome)
+                    for (name, numbers, _), future in zip(SECTION_GROUPS, futures)
+                ])
+            prompt_tokens, completion_tokens = (sum(u[i] for u in usage) for i in (0, 1))
+            span.set(retries=len(retry_log), report_chars=len(analysis),
+                     prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+            _record_usage(model_id, backend, language, "sections", plan, prompt_tokens, completion_tokens)
+        else:
+            request_messages = _request_messages(backend, messages, transcript, token, language, model_id, plan)
+            span.set(cached=False, map_reduce=request_messages is not messages)
+
+            # Streamed internally so the guard can cut off loops/echoes early
+            parts = []
+            for delta in _guarded_stream(backend, token, model_id, request_messages, transcript,
+                                         plan["max_tokens"], temperature, span, retry_log, outcome):
+                if delta is RESTART:
+                    parts = []
+                    continue
+                parts.append(delta)
+            analysis = "".join(parts)
+            span.set(retries=len(retry_log))
+            tokens = _record_tokens(span, model_id, request_messages, analysis)
+            _record_usage(model_id, backend, language, plan["route"], plan, *tokens)
+
+    if analysis and not outcome:
+        get_cache().put(key, {"analysis": analysis, "model": model_id})
+        search_index.index_report(transcript, analysis, model=model_id, language=language)
+    return analysis
+
+
+def stream_analyze(transcript, token, language=None, model_id=None,
+                   max_tokens=DEFAULT_MAX_TOKENS, temperature=DEFAULT_TEMPERATURE, fresh=False, backend=None,
+                   parallel_sections=None):
+    """
+    Same as analyze(), but yields the report as text chunks while the model
+    generates it. A cache hit yields the whole report as one chunk. The full
+    report is cached once the stream completes. If the generation guard
+    restarts the report, RESTART is yielded: drop the text received so far.
+    With parallel sections each group's sections are yielded as one chunk,
+    in report order, as soon as that group (and the ones before it) finish.
+    """
+    backend = analysis_backends.get_backend(backend)
+    model_id = model_id or backend.default_model_id
+    parallel_sections = PARALLEL_SECTIONS if parallel_sections is None else parallel_sections
+    messages = build_messages(transcript, language)
+    key = fingerprint(model_id, messages, max_tokens=max_tokens, temperature=temperature, **_mode(parallel_sections))
+
+    if not fresh:
+        cached = get_cache().get(key)
+        if cached is not None:
+            _record_usage(model_id, backend, language, "cache")
+            yield cached["analysis"]
+            return
+
+    plan = preflight(transcript, language, model_id, max_tokens)
+    if plan["route"] == "local":
+        metrics.inc("call_analyzer_preflight_total", route="local", model=model_id)
+        _record_usage(model_id, backend, language, "local", plan)
+        yield _local_report(plan)
+        return
+
+    if not token and backend.requires_token:
+        raise ValueError("No API Key provided.")
+
+    groups = _group_requests(transcript, language, model_id, max_tokens) if parallel_sections else None
+    if groups:
+        yield from _stream_groups(backend, token, model_id, groups, transcript, language, temperature, key, plan)
+        return
+
+    # Not attached to the context: this generator may be resumed from other threads
+    with metrics.span("analyze", attach=False, backend=backend.name, model=model_id, language=language,
+                      transcript_chars=len(transcript), cached=False, stream=True) as span:
+        _record_preflight(span, plan, model_id)
+        request_messages = _request_messages(backend, messages, transcript, token, language, model_id, plan)
+        span.set(map_reduce=request_messages is not messages)
+
+        retry_log = []
+        outcome = {}
+        parts = []
+        started = time.perf_counter()
+        for delta in _guarded_stream(backend, token, model_id, request_messages, transcript,
+                                     plan["max_tokens"], temperature, span, retry_log, outcome):
+            if delta is RESTART:
+                parts = []
+                yield delta
+                continue
+            if "ttft_s" not in span.attrs:
+                ttft = time.perf_counter() - started
+                span.set(ttft_s=round(ttft, 3))
+                metrics.observe("call_analyzer_llm_ttft_seconds", ttft, model=model_id)
+            parts.append(delta)
+            yield delta
+
+        report = "".join(parts)
+        span.set(retries=len(retry_log))
+        tokens = _record_tokens(span, model_id, request_messages, report)
+        _record_usage(model_id, backend, language, plan["route"], plan, *tokens)
+    if report and not outcome:
+        get_cache().put(key, {"analysis": report, "model": model_id})
+        search_index.index_report(transcript, report, model=model_id, language=language)
+
+
+def _stream_groups(backend, token, model_id, groups, transcript, language, temperature, key, plan):
+    # stream_analyze() for parallel section groups
+    with metrics.span("analyze", attach=False, backend=backend.name, model=model_id, language=language,
+                      transcript_chars=len(transcript), cached=False, stream=True, parallel_sections=True,
+                      groups=len(groups)) as span:
+        _record_preflight(span, plan, model_id)
+        retry_log = []
+        outcome = {}
+        usage = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            futures = _submit_groups(pool, backend, token, model_id, groups, transcript, temperature,
+                                     retry_log, outcome, usage)
+            texts = []
+            for (name, numbers, _), future in zip(SECTION_GROUPS, futures):
+                texts.append(_group_result(future, name, numbers, outcome))
+                chunk = render_sections(_group_sections(numbers, texts[-1]))
+                if not chunk:
+                    continue
+                if "ttft_s" not in span.attrs:
+                    ttft = time.perf_counter() - started
+                    span.set(ttft_s=round(ttft, 3))
+                    metrics.observe("call_analyzer_llm_ttft_seconds", ttft, model=model_id)
+                    yield chunk
+                else:
+                    yield "\n\n" + chunk
+        report = assemble_sections(texts)
+        prompt_tokens, completion_tokens = (sum(u[i] for u in usage) for i in (0, 1))
+        span.set(retries=len(retry_log), report_chars=len(report),
+                 prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        _record_usage(model_id, backend, language, "sections", plan, prompt_tokens, completion_tokens)
+    if report and not outcome:
+        get_cache().put(key, {"analysis": report, "model": model_id})
+        search_index.index_report(transcript, report, model=model_id, language=language)
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def analyze_file(text_path, token, language=None, model_id=None,
+                 max_tokens=DEFAULT_MAX_TOKENS, temperature=DEFAULT_TEMPERATURE, fresh=False, backend=None):
+    """
+    analyze() for a transcript on disk (e.g. stream_transcription.py output).
+    A file that could fit one prompt is read and analyzed as usual; longer
+    ones go through the map-reduce path block by block and are never held in
+    memory as one string. Those reports are cached by the file's digest and
+    not added to the search index.
+    """
+    backend = analysis_backends.get_backend(backend)
+    model_id = model_id or backend.default_model_id
+    size = os.path.getsize(text_path)
+    if size <= 4 * token_budget.context_window(model_id):  # ~4 bytes per token
+        with open(text_path, encoding="utf-8") as f:
+            return analyze(f.read(), token, language, model_id, max_tokens, temperature, fresh, backend.name)
+
+    placeholder = f"<transcript file sha256:{_file_digest(text_path)}>"
+    key = fingerprint(model_id, build_messages(placeholder, language), max_tokens=max_tokens, temperature=temperature)
+    with metrics.span("analyze", backend=backend.name, model=model_id, language=language,
+                      transcript_bytes=size, from_file=True) as span:
+        if not fresh:
+            cached = get_cache().get(key)
+            if cached is not None:
+                span.set(cached=True)
+                _record_usage(model_id, backend, language, "cache")
+                return cached["analysis"]
+
+        if not token and backend.requires_token:
+            raise ValueError("No API Key provided.")
+
+        plan = {"route": "map_reduce", "max_tokens": max_tokens, "transcript_tokens": None}
+        _record_preflight(span, plan, model_id)
+        span.set(cached=False, map_reduce=True)
+        notes = long_call.map_blocks_notes(
+            lambda: long_call.read_blocks(text_path), token, model_id,
+            _reduce_budget(language, model_id, max_tokens), backend=backend,
+        )
+        request_messages = _reduce_messages(notes, language)
+
+        retry_log = []
+        outcome = {}
+        parts = []
+        # The guard's echo check runs against the notes, the text actually in the prompt
+        for delta in _guarded_stream(backend, token, model_id, request_messages, "\n\n".join(notes),
+                                     max_tokens, temperature, span, retry_log, outcome):
+            if delta is RESTART:
+                parts = []
+                continue
+            parts.append(delta)
+        analysis = "".join(parts)
+        span.set(retries=len(retry_log))
+        tokens = _record_tokens(span, model_id, request_messages, analysis)
+        _record_usage(model_id, backend, language, "map_reduce", plan, *tokens)
+
+    if analysis and not outcome:
+        get_cache().put(key, {"analysis": analysis, "model": model_id})
+    return analysis
+
+
+metrics.describe("call_analyzer_section_group_failures_total", "Parallel section groups that failed and were left out of a report")
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+import inference_client
+import metrics
+import token_budget
+
+# Pluggable engines behind the analysis step (analysis.py, long_call.py).
+# Every backend offers the same calls:
+#   complete(token, model_id, messages, max_tokens, temperature, retry_log, **sampling) -> (text, usage)
+#   stream(token, model_id, messages, max_tokens, temperature, retry_log, **sampling)   -> yields text deltas
+#   (sampling: extra OpenAI-style parameters such as frequency_penalty)
+#   complete_many(token, model_id, message_lists, max_tokens, temperature, return_exceptions) -> [text or error]
+#   warm(system_prompt)  -> optional start-up work (model load, prefix cache)
+#
+# "hf"        Hugging Face Inference API through inference_client (default).
+# "llama-cpp" A quantized GGUF model run locally on CPU with llama-cpp-python.
+#             The KV cache of each system prompt is computed once and restored
+#             for every later call, so per-call prefill only covers the transcript.
+#
+# Pick one with CALL_ANALYZER_BACKEND (or --backend in analyze_call.py).
+
+DEFAULT_BACKEND = "hf"
+DEFAULT_MODEL_ID = "meta-llama/Meta-Llama-3-8B-Instruct"
+
+LLAMA_CTX = int(os.getenv("CALL_ANALYZER_LLAMA_CTX", "8192"))
+LLAMA_THREADS = int(os.getenv("CALL_ANALYZER_LLAMA_THREADS", str(os.cpu_count() or 4)))
+MAX_CACHED_PREFIXES = 4  # analysis, map and condense system prompts fit comfortably
+
+
+class HuggingFaceBackend:
+    """
+    Hosted models via the pooled async inference client.
+    """
+
+    name = "hf"
+    requires_token = True
+    default_model_id = DEFAULT_MODEL_ID
+
+    def warm(self, system_prompt=None):
+        pass
+
+    def complete(self, token, model_id, messages, max_tokens, temperature, retry_log=None, **sampling):
+        response = inference_client.chat_completion(
+            token,
+            model_id,
+            messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            retry_log=retry_log,
+            **sampling
+        )
+        return response.choices[0].message.content or "", getattr(response, "usage", None)
+
+    def stream(self, token, model_id, messages, max_tokens, temperature, retry_log=None, **sampling):
+        return inference_client.stream_chat_completion(
+            token,
+            model_id,
+            messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            retry_log=retry_log,
+            **sampling
+        )
+
+    def complete_many(self, token, model_id, message_lists, max_tokens, temperature, return_exceptions=False):
+        # All requests go out at once; inference_client caps in-flight requests per model.
+        # return_exceptions: a failed request comes back as its exception instead
+        # of failing the whole batch
+        async def complete_all():
+            responses = await asyncio.gather(*(
+                inference_client.achat_completion(
+                    token, model_id, messages, max_tokens=max_tokens, temperature=temperature
+                )
+                for messages in message_lists
+            ), return_exceptions=return_exceptions)
+            return [r if isinstance(r, BaseException) else r.choices[0].message.content or "" for r in responses]
+
+        return inference_client.run(complete_all())
+
+
+class LlamaCppBackend:
+    """
+    Local CPU inference on a GGUF model with system-prompt KV caching.
+    One llama.cpp context is shared by every caller, so requests are serialized.
+    """
+
+    name = "llama-cpp"
+    requires_token = False
+
+    def __init__(self, model_path=None, n_ctx=LLAMA_CTX, n_threads=LLAMA_THREADS):
+        # e.g. models/Meta-Llama-3-8B-Instruct.Q4_K_M.gguf
+        self.model_path = model_path or os.getenv("CALL_ANALYZER_GGUF_PATH")
+        if not self.model_path:
+            raise ValueError("Set CALL_ANALYZER_GGUF_PATH to a GGUF model file to use the llama-cpp backend.")
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self.default_model_id = f"gguf:{os.path.basename(self.model_path)}"
+        token_budget.CONTEXT_WINDOWS[self.default_model_id] = n_ctx
+        self._llm = None
+        self._prefix_states = {}  # system prompt -> (prefix tokens, saved llama state)
+        self._lock = threading.Lock()
+
+    def _get_llm(self):
+        if self._llm is None:
+            try:
+                from llama_cpp import Llama
+            except ImportError:
+                raise RuntimeError("llama-cpp-python is not installed. Run: pip install llama-cpp-python")
+            print(f"⏳ Loading local model {self.model_path}...")
+            with metrics.span("model_load", model=self.default_model_id, backend=self.name):
+                self._llm = Llama(
+                    model_path=self.model_path,
+                    n_ctx=self.n_ctx,
+                    n_threads=self.n_threads,
+                    verbose=False,
+                )
+        return self._llm
+
+    # Llama 3 chat template, split so the system turn tokenizes on its own
+    @staticmethod
+    def _system_text(system_prompt):
+        return f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n\n{system_prompt}<|eot_id|>"
+
+    @staticmethod
+    def _turns_text(messages):
+        text = "".join(
+            f"<|start_header_id|>{m['role']}<|end_header_id|>\n\n{m['content']}<|eot_id|>" for m in messages
+        )
+        return text + "<|start_header_id|>assistant<|end_header_id|>\n\n"
+
+    def _tokenize(self, text):
+        return self._get_llm().tokenize(text.encode("utf-8"), add_bos=False, special=True)
+
+    def _prefix(self, system_prompt):
+        """
+        Returns the tokens of the system turn with their KV cache already in the
+        context, evaluating and saving it on first use.
+        """
+        llm = self._get_llm()
+        cached = self._prefix_states.get(system_prompt)
+        if cached is not None:
+            tokens, state = cached
+            llm.load_state(state)
+            return tokens, True
+
+        tokens = self._tokenize(self._system_text(system_prompt))
+        llm.reset()
+        llm.eval(tokens)
+        if len(self._prefix_states) >= MAX_CACHED_PREFIXES:
+            self._prefix_states.pop(next(iter(self._prefix_states)))
+        self._prefix_states[system_prompt] = (tokens, llm.save_state())
+        return tokens, False
+
+    def _prompt_tokens(self, messages):
+        if messages and messages[0]["role"] == "system":
+            prefix_tokens, reused = self._prefix(messages[0]["content"])
+            rest = messages[1:]
+        else:
+            prefix_tokens, reused = self._tokenize("<|begin_of_text|>"), False
+            rest = messages
+        if reused:
+            metrics.inc("call_analyzer_llm_prefix_cached_tokens_total", len(prefix_tokens), model=self.default_model_id)
+        # llama-cpp only evaluates the tokens after the part already in the KV cache
+        return prefix_tokens + self._tokenize(self._turns_text(rest))
+
+    def warm(self, system_prompt=None):
+        with self._lock:
+            self._get_llm()
+            if system_prompt:
+                self._prefix(system_prompt)
+
+    def complete(self, token, model_id, messages, max_tokens, temperature, retry_log=None, **sampling):
+        with self._lock:
+            prompt = self._prompt_tokens(messages)
+            result = self._get_llm().create_completion(
+                prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stop=["<|eot_id|>"],
+                **sampling
+            )
+        usage = result.get("usage") or {}
+        return result["choices"][0]["text"], SimpleNamespace(
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+        )
+
+    def stream(self, token, model_id, messages, max_tokens, temperature, retry_log=None, **sampling):
+        with self._lock:
+            prompt = self._prompt_tokens(messages)
+            for chunk in self._get_llm().create_completion(
+                prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stop=["<|eot_id|>"],
+                stream=True,
+                **sampling
+            ):
+                delta = chunk["choices"][0]["text"]
+                if delta:
+                    yield delta
+
+    def complete_many(self, token, model_id, message_lists, max_tokens, temperature, return_exceptions=False):
+        # Sequential on one context; each call still reuses its system-prompt prefix
+        results = []
+        for messages in message_lists:
+            try:
+                results.append(self.complete(token, model_id, messages, max_tokens, temperature)[0])
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+
+BACKENDS = {
+    HuggingFaceBackend.name: HuggingFaceBackend,
+    LlamaCppBackend.name: LlamaCppBackend,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """
+    Returns the shared instance of a backend (CALL_ANALYZER_BACKEND by default).
+    """
+    name = name or os.getenv("CALL_ANALYZER_BACKEND") or DEFAULT_BACKEND
+    with _instances_lock:
+        backend = _instances.get(name)
+        if backend is None:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown analysis backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+            backend = _instances[name] = BACKENDS[name]()
+        return backend
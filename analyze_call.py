@@ -1,8 +1,21 @@
 import os
-import whisper
-from huggingface_hub import InferenceClient
+import sys
+import glob
+import time
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+import whisper_registry
+import transcription
+import analysis
+import analysis_backends
+import pipeline
+import metrics
+import watch_folder
+import stream_transcription
+
 # Add FFmpeg to PATH (Hardcoded for this environment fix)
 ffmpeg_path = r"C:\Users\paiks\AppData\Local\Microsoft\Winget\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0.1-full_build\bin"
 os.environ["PATH"] += os.pathsep + ffmpeg_path
@@ -16,166 +29,438 @@ if not api_key:
     print("HUGGINGFACE_API_KEY not found in environment variables.")
     # Fallback/Exit or ask user
 
-# Initialize Client
-client = InferenceClient(token=api_key)
+# Whisper model size used by this process (set per worker in batch mode)
+_whisper_model_name = "base"
+# VAD-parallel decoding of long recordings ("auto"); off inside batch workers,
+# which already use the cores
+_parallel = "auto"
+# Streamed, bounded-memory transcription for very long recordings (--stream)
+_stream = os.getenv("CALL_ANALYZER_STREAM") == "1"
 
-# The User's specific "Design Thinking Fellow" persona prompt
-SYSTEM_PROMPT = """
-You are not a chatbot.
-You are a Design Thinking Fellow analyzing a real conversation between a team member and a business founder.
+def _init_worker(model_name="base", parallel="auto"):
+    """
+    Process pool initializer: loads Whisper once through the shared registry
+    so every file handled by this worker reuses the same model.
+    """
+    global _whisper_model_name, _parallel
+    _whisper_model_name = model_name
+    _parallel = parallel
+    if os.getenv("CALL_ANALYZER_TRACE") == "1":
+        metrics.configure_logging()
+    return whisper_registry.preload(model_name)
 
-Your job is NOT to summarize the conversation.
-Your job is to deeply understand what was FELT, not just what was SAID.
+def _print_progress(update):
+    print(f"   ... {update['done']}/{update['total']} segments transcribed")
 
-Analyze the conversation using the following mindset:
+def transcribe_audio(audio_path):
+    """
+    Transcribes audio using OpenAI's Whisper model (local).
+    """
+    print(f"🎧 Transcribing '{audio_path}'...")
+    result = transcription.transcribe(
+        audio_path, model_name=_whisper_model_name, parallel=_parallel, on_progress=_print_progress
+    )
+    if result["cached"]:
+        print("⚡ Transcript loaded from cache.")
+    
+    return result["text"]
 
-1. Founder Context Awareness
-   - Assume the founder is busy, risk-aware, and mentally filtering noise.
-   - Identify what pressure, hesitation, or expectation the founder might be carrying at each moment.
+def stream_transcribe_audio(audio_path, output_dir=None):
+    """
+    --stream: transcribes window by window into <name>_transcript/ (next to
+    the report) and returns the path of the transcript file.
+    """
+    file_root, _ = os.path.splitext(os.path.basename(audio_path))
+    target = os.path.join(output_dir or "", f"{file_root}_transcript")
+    print(f"🎧 Streaming transcription of '{audio_path}' into '{target}'...")
+    reported = [0]
 
-2. Emotional State Mapping
-   - Track how the founder’s emotional state shifts during the conversation
-     (curious → guarded → disengaged / open → rushed → skeptical, etc.).
-   - Explain WHY those shifts happened.
+    def on_progress(update):
+        # One line per 10 minutes of audio
+        if update["audio_seconds"] // 600 > reported[0]:
+            reported[0] = int(update["audio_seconds"] // 600)
+            print(f"   ... {update['audio_seconds'] / 60:.0f} min transcribed")
 
-3. Control & Power Balance
-   - Identify who had control of the conversation at different points.
-   - Explain moments where control was lost or forcefully taken.
+    result = stream_transcription.transcribe_stream(audio_path, target, model_name=_whisper_model_name,
+                                                    on_progress=on_progress)
+    return result["text_path"]
 
-4. Trust & Risk Perception
-   - Analyze how each statement either reduced or increased the founder’s perceived risk.
-   - Focus on clarity, time respect, and relevance — not politeness.
+def analyze_with_huggingface(transcript, fresh=False):
+    """
+    Sends the transcript to Hugging Face (Meta-Llama-3-8B-Instruct) for analysis,
+    or to the local model when CALL_ANALYZER_BACKEND=llama-cpp.
+    Repeat runs on the same transcript/prompt come back from the result cache
+    unless fresh=True.
+    """
+    backend = analysis_backends.get_backend()
+    target = "Hugging Face" if backend.name == "hf" else f"the local model ({backend.default_model_id})"
+    print(f"\n🧠 Sending transcript ({len(transcript)} chars) to {target} for Design Thinking Analysis...")
+    return analysis.analyze(transcript, api_key, fresh=fresh)
 
-5. Discomfort & Exit Signals
-   - Identify subtle discomfort signals such as pauses, vague affirmations,
-     topic changes, or suggestions to “email later.”
-   - Explain what these signals actually mean in a real business context.
+def analyze_transcript_file(text_path, fresh=False):
+    """
+    Like analyze_with_huggingface, for a streamed transcript read from disk.
+    """
+    print(f"\n🧠 Analyzing '{text_path}' ({os.path.getsize(text_path) / 1024:.0f} KB)...")
+    return analysis.analyze_file(text_path, api_key, fresh=fresh)
 
-6. Pressure Response of the Caller
-   - Identify how the caller behaved under pressure
-     (over-explaining, justifying, selling, rushing, or grounding the conversation).
-   - Explain what this reveals about the caller’s maturity.
+def _transcribe_and_analyze(audio_path, record, output_dir=None, fresh=False):
+    started = time.perf_counter()
+    if _stream:
+        text_path = stream_transcribe_audio(audio_path, output_dir)
+        record["transcribe_s"] = time.perf_counter() - started
+        print("\n📝 Transcript generated successfully.")
+        started = time.perf_counter()
+        report = analyze_transcript_file(text_path, fresh=fresh)
+    else:
+        transcript = transcribe_audio(audio_path)
+        record["transcribe_s"] = time.perf_counter() - started
+        print("\n📝 Transcript generated successfully.")
+        started = time.perf_counter()
+        report = analyze_with_huggingface(transcript, fresh=fresh)
+    record["analyze_s"] = time.perf_counter() - started
+    return report
 
-7. How I Would Speak Differently
-   - Do NOT write a full script.
-   - Instead, explain what you would remove, reduce, or reframe to give
-     the founder more control and mental comfort.
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".awb", ".ogg", ".aac", ".flac", ".amr", ".wma", ".mp4")
 
-8. My Conversation Analysis Framework
-   - Build a short, original framework that analyzes conversations based on:
-     emotion, control, risk, energy exchange, and exit signals.
-   - Focus on understanding human behavior, not communication theory.
+def collect_audio_files(inputs):
+    """
+    Expands files, directories and glob patterns into a sorted list of audio files.
+    Returns (files, missing) where missing lists inputs that matched nothing.
+    """
+    files = []
+    missing = []
+    for item in inputs:
+        # Remove quotes if user added them
+        if item.startswith('"') and item.endswith('"'):
+            item = item[1:-1]
 
-Important:
-- Avoid generic advice, soft language, or textbook communication tips.
-- Write like a thoughtful human who understands business pressure.
-- Prioritize empathy, clarity, and respect for mental space.
-- The goal is insight, not perfection.
+        if os.path.isdir(item):
+            matches = [
+                os.path.join(item, name) for name in os.listdir(item)
+                if name.lower().endswith(AUDIO_EXTENSIONS)
+            ]
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            matches = [
+                path for path in glob.glob(item, recursive=True)
+                if os.path.isfile(path) and path.lower().endswith(AUDIO_EXTENSIONS)
+            ]
 
-End the analysis with one reflective line about what this conversation teaches
-about trust, maturity, or human interaction in real-world business settings.
-"""
+        if not matches:
+            missing.append(item)
+        files.extend(matches)
 
-def transcribe_audio(audio_path):
+    # De-duplicate while keeping a stable order
+    seen = set()
+    unique = []
+    for path in sorted(files):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique, missing
+
+def save_report(audio_path, report, output_dir=None):
     """
-    Transcribes audio using OpenAI's Whisper model (local).
+    Writes the analysis next to the working directory (or output_dir) as <name>_report.txt.
     """
-    print(f"\n🎧 Loading Whisper model (this may take a moment first time)...")
-    model = whisper.load_model("base") 
-    
-    print(f"🎧 Transcribing '{audio_path}'...")
-    result = model.transcribe(audio_path)
-    
-    return result["text"]
+    base_name = os.path.basename(audio_path)
+    file_root, _ = os.path.splitext(base_name)
+    output_file = f"{file_root}_report.txt"
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        output_file = os.path.join(output_dir, output_file)
 
-def analyze_with_huggingface(transcript):
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(report)
+    return output_file
+
+def process_file(audio_path, output_dir=None, fresh=False):
     """
-    Sends the transcript to Hugging Face (Mistral-7B/Zephyr) for analysis.
+    Runs transcription + analysis for one file and returns a result record.
+    Never raises, so one bad file cannot take down a batch.
     """
-    print(f"\n🧠 Sending transcript ({len(transcript)} chars) to Hugging Face for Design Thinking Analysis...")
-    
-    # Model: Meta-Llama-3-8B-Instruct (High quality, requires access)
-    model_id = "meta-llama/Meta-Llama-3-8B-Instruct"
-    
-    # Improved prompt to prevent hallucination
-    user_message = f"""
-Here is the raw transcript of a real call. 
-Your task is to analyze it using the Design Thinking framework provided in the system prompt.
-
-RULES:
-1. Do NOT generate any new dialogue or conversation.
-2. Do NOT repeat the transcript.
-3. OUTPUT ONLY the analysis sections (1-8).
-4. If the transcript is empty or unclear, say "Transcript is unclear".
-
---- TRANSCRIPT BEGINS ---
-{transcript}
---- TRANSCRIPT ENDS ---
-
-Analyze the transcript now:
-"""
-    
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_message}
-    ]
-    
-    response = client.chat_completion(
-        model=model_id,
-        messages=messages,
-        max_tokens=2500,
-        temperature=0.3  # Lower temperature for more focused analysis
+    record = {
+        "path": audio_path,
+        "ok": False,
+        "error": None,
+        "output": None,
+        "transcribe_s": 0.0,
+        "analyze_s": 0.0,
+    }
+    with metrics.span("call", app="cli", file=os.path.basename(audio_path)) as span:
+        try:
+            # Step 1 + 2: Transcribe, Analyze
+            report = _transcribe_and_analyze(audio_path, record, output_dir, fresh)
+
+            # Step 3: Save
+            record["output"] = save_report(audio_path, report, output_dir)
+            record["ok"] = True
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            span.set(error=record["error"])
+    return record
+
+def print_summary(records, wall_seconds):
+    """
+    Prints per-file status plus overall throughput and failures.
+    """
+    ok = [r for r in records if r["ok"]]
+    failed = [r for r in records if not r["ok"]]
+
+    print("\n" + "="*40)
+    print("📊 BATCH SUMMARY")
+    print("="*40)
+    for r in records:
+        status = "✅" if r["ok"] else "❌"
+        detail = r["output"] if r["ok"] else r["error"]
+        print(f"{status} {r['path']} "
+              f"(transcribe {r['transcribe_s']:.1f}s, analyze {r['analyze_s']:.1f}s) -> {detail}")
+
+    per_minute = len(ok) / wall_seconds * 60 if wall_seconds > 0 else 0.0
+    print(f"\nFiles: {len(records)} | Succeeded: {len(ok)} | Failed: {len(failed)}")
+    print(f"Wall time: {wall_seconds:.1f}s | Throughput: {per_minute:.2f} calls/min")
+    transcribe_total = sum(r["transcribe_s"] for r in records)
+    analyze_total = sum(r["analyze_s"] for r in records)
+    print(f"Stage time: transcribe {transcribe_total:.1f}s + analyze {analyze_total:.1f}s "
+          f"= {transcribe_total + analyze_total:.1f}s of work")
+
+def run_batch(files, workers=1, output_dir=None, model_name="base", fresh=False):
+    """
+    Processes files through a pool of worker processes. Each worker loads
+    Whisper once (see _init_worker) and reuses it for every file it gets.
+    """
+    records = []
+    if workers <= 1:
+        _init_worker(model_name)
+        for audio_path in files:
+            record = process_file(audio_path, output_dir, fresh)
+            print(f"{'✅' if record['ok'] else '❌'} {audio_path}")
+            records.append(record)
+        return records
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_name, False),
+    ) as pool:
+        futures = {pool.submit(process_file, path, output_dir, fresh): path for path in files}
+        for future in as_completed(futures):
+            audio_path = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # A worker crash (e.g. OOM kill) only fails the file it was handling
+                record = {
+                    "path": audio_path, "ok": False, "error": f"{type(e).__name__}: {e}",
+                    "output": None, "transcribe_s": 0.0, "analyze_s": 0.0,
+                }
+            print(f"{'✅' if record['ok'] else '❌'} {audio_path}")
+            records.append(record)
+
+    # Keep the summary in input order rather than completion order
+    order = {path: i for i, path in enumerate(files)}
+    records.sort(key=lambda r: order[r["path"]])
+    return records
+
+def run_pipelined(files, output_dir=None, model_name="base", fresh=False,
+                  transcribe_workers=1, analyze_workers=2, queue_size=2):
+    """
+    Overlaps the stages: Whisper transcribes the next call while the LLM
+    request for the previous one is in flight (see pipeline.py).
+    """
+    _init_worker(model_name)
+    if transcribe_workers > 1 and whisper_registry.resolve()[2] == "openai":
+        print("⚠️ openai-whisper decodes one call at a time per process; extra transcribe workers only queue. "
+              "Use --workers (processes) or --whisper-engine faster-whisper to transcribe in parallel.")
+
+    def analyze_and_save(audio_path, transcript):
+        report = analyze_with_huggingface(transcript, fresh=fresh)
+        return save_report(audio_path, report, output_dir)
+
+    def on_record(record):
+        print(f"{'✅' if record['ok'] else '❌'} {record['path']}")
+
+    return pipeline.run_pipeline(
+        files,
+        transcribe_audio,
+        analyze_and_save,
+        transcribe_workers=transcribe_workers,
+        analyze_workers=analyze_workers,
+        queue_size=queue_size,
+        on_record=on_record,
     )
-    
-    return response.choices[0].message.content
 
-def main():
-    print("=== AI Customer Support Analyzer (Whisper + Hugging Face) ===")
-    
-    import sys
-    if len(sys.argv) > 1:
-        audio_path = sys.argv[1]
-    else:
-        audio_path = input("Enter the path to the audio file (e.g., call.mp3): ").strip()
-    
-    # Remove quotes if user added them
-    if audio_path.startswith('"') and audio_path.endswith('"'):
-        audio_path = audio_path[1:-1]
-        
-    if not os.path.exists(audio_path):
-        print(f"❌ Error: File not found at {audio_path}")
-        return
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI Customer Support Analyzer (Whisper + Hugging Face)")
+    parser.add_argument("inputs", nargs="*", help="Audio files, directories or glob patterns (e.g. 'calls/*.mp3')")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Number of worker processes (each loads Whisper once). Default: 1")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Directory for the *_report.txt files. Default: current directory")
+    parser.add_argument("--whisper-model", default="base",
+                        help="Whisper model size (tiny, base, small, ...). Default: base")
+    parser.add_argument("--whisper-engine", choices=whisper_registry.ENGINES, default=None,
+                        help="Transcription engine: 'openai' (PyTorch) or 'faster-whisper' (CTranslate2). "
+                             "Default: CALL_ANALYZER_WHISPER_ENGINE or openai")
+    parser.add_argument("--whisper-precision", choices=whisper_registry.PRECISIONS, default=None,
+                        help="Weights precision; int8 is the fast CPU option. Default: fp16 on GPU, fp32 on CPU")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="CPU threads per transcription process. Default: all cores, "
+                             "split between workers in batch mode")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Skip the analysis result cache and always request a new sample")
+    parser.add_argument("--backend", choices=sorted(analysis_backends.BACKENDS), default=None,
+                        help="Analysis engine: 'hf' (Hugging Face API) or 'llama-cpp' (local GGUF model "
+                             "from CALL_ANALYZER_GGUF_PATH). Default: CALL_ANALYZER_BACKEND or hf")
+    parser.add_argument("--parallel-sections", action="store_true",
+                        help="Request the report's section groups concurrently (lower latency per call)")
+    parser.add_argument("--trace", action="store_true",
+                        help="Log one JSON line per pipeline stage (span) to stderr")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write Prometheus-format metrics for this run to this file at the end")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Overlap transcription of the next call with analysis of the current one")
+    parser.add_argument("--transcribe-workers", type=int, default=1,
+                        help="Pipeline mode: concurrent Whisper transcriptions (faster-whisper only; openai-whisper "
+                             "decodes take turns on the shared model). Default: 1")
+    parser.add_argument("--analyze-workers", type=int, default=2,
+                        help="Pipeline mode: concurrent LLM requests. Default: 2")
+    parser.add_argument("--queue-size", type=int, default=2,
+                        help="Pipeline mode: transcripts allowed to wait for analysis. Default: 2")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep polling the inputs and process new or changed recordings as they appear")
+    parser.add_argument("--manifest", default=None,
+                        help="Watch mode: progress file used to resume after a restart. "
+                             "Default: .call_manifest.sqlite in the output directory")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="Watch mode: seconds between folder scans. Default: 5")
+    parser.add_argument("--stream", action="store_true",
+                        help="Transcribe in fixed windows from an ffmpeg pipe with bounded memory, writing the "
+                             "transcript to <name>_transcript/ as it goes (for multi-hour recordings)")
+    parser.add_argument("--once", action="store_true",
+                        help="Watch mode: process what is there (and anything left from last time), then exit")
+    return parser.parse_args(argv)
+
+def run_watch(inputs, args):
+    """
+    --watch: hands new/changed files to the worker pool, tracked in a manifest.
+    """
+    manifest = args.manifest or os.path.join(args.output_dir or os.getcwd(), ".call_manifest.sqlite")
+    counts = watch_folder.watch(
+        list_files=lambda: collect_audio_files(inputs)[0],
+        process_fn=functools.partial(process_file, output_dir=args.output_dir, fresh=args.fresh),
+        manifest_path=manifest,
+        workers=max(1, args.workers),
+        initializer=_init_worker,
+        initargs=(args.whisper_model, False),
+        interval_s=args.interval,
+        once=args.once,
+    )
+    print(f"📋 Manifest: {counts.get(watch_folder.DONE, 0)} done, {counts.get(watch_folder.FAILED, 0)} failed, "
+          f"{counts.get(watch_folder.PENDING, 0)} pending")
+    return 1 if counts.get(watch_folder.FAILED) else 0
 
+def analyze_single(audio_path, fresh=False):
+    """
+    Original single-file flow: prints the full report to the console.
+    """
     try:
-        # Step 1: Transcribe
-        transcript = transcribe_audio(audio_path)
-        print("\n📝 Transcript generated successfully.")
-        # print(f"Preview: {transcript[:200]}...")
+        # Step 1 + 2: Transcribe, Analyze
+        report = _transcribe_and_analyze(audio_path, {}, fresh=fresh)
 
-        # Step 2: Analyze
-        analysis = analyze_with_huggingface(transcript)
-        
         print("\n" + "="*40)
         print("✨ DESIGN THINKING ANALYSIS REPORT ✨")
         print("="*40 + "\n")
-        print(analysis)
-        
-        print(f"DEBUG: Response length: {len(analysis)}")
-        
+        print(report)
+
+        print(f"DEBUG: Response length: {len(report)}")
+
         # Save to file
-        base_name = os.path.basename(audio_path)
-        file_root, _ = os.path.splitext(base_name)
-        output_file = f"{file_root}_report.txt"
-        
-        abs_path = os.path.abspath(output_file)
-        print(f"DEBUG: Saving to absolute path: {abs_path}")
-
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(analysis)
+        output_file = save_report(audio_path, report)
         print(f"\n✅ Analysis saved to '{output_file}'")
+        return True
 
     except Exception as e:
         print(f"\n❌ An error occurred: {e}")
+        return False
+
+def main(argv=None):
+    print("=== AI Customer Support Analyzer (Whisper + Hugging Face) ===")
+
+    args = parse_args(argv)
+    if args.trace:
+        os.environ["CALL_ANALYZER_TRACE"] = "1"  # picked up by batch workers too
+        metrics.configure_logging()
+    if args.backend:
+        os.environ["CALL_ANALYZER_BACKEND"] = args.backend  # batch workers inherit it
+    if args.stream:
+        global _stream
+        os.environ["CALL_ANALYZER_STREAM"] = "1"  # batch workers inherit it
+        _stream = True
+    if args.parallel_sections:
+        os.environ["CALL_ANALYZER_PARALLEL_SECTIONS"] = "1"
+        analysis.PARALLEL_SECTIONS = True
+    # Whisper settings travel the same way
+    if args.whisper_engine:
+        os.environ["CALL_ANALYZER_WHISPER_ENGINE"] = args.whisper_engine
+    if args.whisper_precision:
+        os.environ["CALL_ANALYZER_WHISPER_PRECISION"] = args.whisper_precision
+    if args.threads:
+        os.environ["CALL_ANALYZER_WHISPER_THREADS"] = str(args.threads)
+    elif args.workers > 1 and not os.getenv("CALL_ANALYZER_WHISPER_THREADS"):
+        # One share of the cores per worker instead of every worker using all of them
+        os.environ["CALL_ANALYZER_WHISPER_THREADS"] = str(max(1, (os.cpu_count() or 1) // args.workers))
+
+    inputs = args.inputs
+    if not inputs:
+        inputs = [input("Enter the path to the audio file (e.g., call.mp3): ").strip()]
+
+    if args.watch:
+        # Folders may be empty (or not exist yet) when watching starts
+        status = run_watch(inputs, args)
+        if args.metrics_file:
+            metrics.dump(args.metrics_file)
+        return status
+
+    files, missing = collect_audio_files(inputs)
+    for item in missing:
+        print(f"❌ Error: No audio files found at {item}")
+    if not files:
+        return 1
+
+    # A single plain file keeps the original interactive output
+    if len(files) == 1 and args.workers <= 1 and not args.output_dir and not args.pipeline:
+        print(f"\n🎧 Loading Whisper model (this may take a moment first time)...")
+        _init_worker(args.whisper_model)
+        ok = analyze_single(files[0], fresh=args.fresh)
+        if args.metrics_file:
+            metrics.dump(args.metrics_file)
+        return 0 if ok else 1
+
+    started = time.perf_counter()
+    if args.pipeline:
+        if args.stream:
+            print("⚠️ --stream is not used with --pipeline; transcripts are kept in memory.")
+        print(f"📂 Pipelining {len(files)} file(s): {args.transcribe_workers} transcribe / "
+              f"{args.analyze_workers} analyze worker(s), queue size {args.queue_size}...")
+        records = run_pipelined(
+            files, output_dir=args.output_dir, model_name=args.whisper_model, fresh=args.fresh,
+            transcribe_workers=args.transcribe_workers, analyze_workers=args.analyze_workers,
+            queue_size=args.queue_size,
+        )
+    else:
+        workers = max(1, min(args.workers, len(files)))
+        print(f"📂 Processing {len(files)} file(s) with {workers} worker(s)...")
+        records = run_batch(files, workers=workers, output_dir=args.output_dir, model_name=args.whisper_model, fresh=args.fresh)
+    print_summary(records, time.perf_counter() - started)
+    if args.metrics_file:
+        # Batch workers keep their own stage metrics; the per-file timings above cover them
+        metrics.dump(args.metrics_file)
+
+    return 0 if all(r["ok"] for r in records) and not missing else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
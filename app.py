@@ -1,9 +1,17 @@
 import streamlit as st
 import os
-import whisper
-from huggingface_hub import InferenceClient
 from dotenv import load_dotenv
-import tempfile
+import time
+import shutil
+
+import audio_ingest
+import transcription
+import analysis
+import analysis_backends
+import metrics
+import startup
+import stream_transcription
+from disk_cache import default_cache_root
 
 # Page Configuration
 st.set_page_config(page_title="AI Call Analyzer", page_icon="🎧", layout="wide")
@@ -18,8 +26,17 @@ This tool provides deep insights into Founder Context, Emotional State, and more
 # Load Environment Variables
 load_dotenv()
 
+# Observability: span logs, /metrics (CALL_ANALYZER_METRICS_PORT) or a periodic
+# dump (CALL_ANALYZER_METRICS_FILE). All three are no-ops on script reruns.
+metrics.configure_logging()
+metrics.start_metrics_server()
+metrics.start_periodic_dump()
+# Model weights load on a background thread (once per process, not per rerun)
+startup.start_preload("base")
+
 # Sidebar for API Key
 st.sidebar.header("Configuration")
+st.sidebar.caption(startup.describe())
 api_key = st.sidebar.text_input("Hugging Face API Key", type="password", help="Enter your HF Token here if not set in Secrets/Env")
 
 # Helper: Get API Key
@@ -33,154 +50,138 @@ def get_api_key():
         return os.getenv("HUGGINGFACE_API_KEY")
     return None
 
-# System Prompt (Same as before)
-SYSTEM_PROMPT = """
-You are not a chatbot.
-You are a Design Thinking Fellow analyzing a real conversation between a team member and a business founder.
-
-Your job is NOT to summarize the conversation.
-Your job is to deeply understand what was FELT, not just what was SAID.
-
-Analyze the conversation using the following mindset:
-
-1. Founder Context Awareness
-   - Assume the founder is busy, risk-aware, and mentally filtering noise.
-   - Identify what pressure, hesitation, or expectation the founder might be carrying at each moment.
-
-2. Emotional State Mapping
-   - Track how the founder’s emotional state shifts during the conversation
-     (curious → guarded → disengaged / open → rushed → skeptical, etc.).
-   - Explain WHY those shifts happened.
-
-3. Control & Power Balance
-   - Identify who had control of the conversation at different points.
-   - Explain moments where control was lost or forcefully taken.
-
-4. Trust & Risk Perception
-   - Analyze how each statement either reduced or increased the founder’s perceived risk.
-   - Focus on clarity, time respect, and relevance — not politeness.
-
-5. Discomfort & Exit Signals
-   - Identify subtle discomfort signals such as pauses, vague affirmations,
-     topic changes, or suggestions to “email later.”
-   - Explain what these signals actually mean in a real business context.
-
-6. Pressure Response of the Caller
-   - Identify how the caller behaved under pressure
-     (over-explaining, justifying, selling, rushing, or grounding the conversation).
-   - Explain what this reveals about the caller’s maturity.
-
-7. How I Would Speak Differently
-   - Do NOT write a full script.
-   - Instead, explain what you would remove, reduce, or reframe to give
-     the founder more control and mental comfort.
-
-8. My Conversation Analysis Framework
-   - Build a short, original framework that analyzes conversations based on:
-     emotion, control, risk, energy exchange, and exit signals.
-   - Focus on understanding human behavior, not communication theory.
-
-Important:
-- Avoid generic advice, soft language, or textbook communication tips.
-- Write like a thoughtful human who understands business pressure.
-- Prioritize empathy, clarity, and respect for mental space.
-- The goal is insight, not perfection.
-
-End the analysis with one reflective line about what this conversation teaches
-about trust, maturity, or human interaction in real-world business settings.
-"""
-
-# Cached Whisper Function
-@st.cache_resource
-def load_whisper_model():
-    return whisper.load_model("base")
-
-def transcribe_audio(audio_path):
-    model = load_whisper_model()
-    result = model.transcribe(audio_path)
-    return result["text"]
-
-def analyze_with_llama(transcript, token, language="English"):
-    client = InferenceClient(token=token)
-    model_id = "meta-llama/Meta-Llama-3-8B-Instruct"
-    
-    # Language specific instruction
-    lang_instruction = ""
-    if language == "Hinglish":
-        lang_instruction = "5. OUTPUT LANGUAGE: Generate the ENTIRE analysis in HINGLISH (Natural mix of Hindi and English). Keep technical headers in English, but explain the insights in Hinglish (e.g., 'Founder kaafi guarded lag raha tha')."
-    else:
-        lang_instruction = "5. OUTPUT LANGUAGE: Generate the analysis in standard professional ENGLISH."
-
-    user_message = f"""
-Here is the raw transcript of a real call. 
-Your task is to analyze it using the Design Thinking framework provided in the system prompt.
-
-RULES:
-1. Do NOT generate any new dialogue or conversation.
-2. Do NOT repeat the transcript.
-3. OUTPUT ONLY the analysis sections (1-8).
-4. If the transcript is empty or unclear, say "Transcript is unclear".
-{lang_instruction}
-
---- TRANSCRIPT BEGINS ---
-{transcript}
---- TRANSCRIPT ENDS ---
-
-Analyze the transcript now:
-"""
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_message}
-    ]
-    
-    response = client.chat_completion(
-        model=model_id,
-        messages=messages,
-        max_tokens=2500,
-        temperature=0.3
-    )
-    return response.choices[0].message.content
+# Whisper: the model is shared process-wide via whisper_registry
+def transcribe_audio(audio, on_progress=None):
+    # Cached by audio content + model, so switching report language skips Whisper
+    return transcription.transcribe(audio, model_name="base", on_progress=on_progress)["text"]
+
+# Uploads above this size are transcribed in bounded memory (stream_transcription.py)
+STREAM_UPLOAD_MB = float(os.getenv("CALL_ANALYZER_STREAM_UPLOAD_MB", "100"))
+
+def stream_transcribe_upload(uploaded_file, on_progress=None):
+    # Spooled to disk in 1 MB blocks (no extra in-memory copy of the upload).
+    # The output folder is keyed on the content hash, so only the same
+    # recording resumes/reuses an earlier run's output
+    digest = audio_ingest.source_digest(uploaded_file.getbuffer())
+    output_dir = os.path.join(default_cache_root(), "streams", digest)
+    os.makedirs(output_dir, exist_ok=True)
+    upload_path = os.path.join(output_dir, "upload")
+    if not os.path.exists(upload_path):
+        uploaded_file.seek(0)
+        with open(f"{upload_path}.tmp", "wb") as f:
+            shutil.copyfileobj(uploaded_file, f, 1024 * 1024)
+        os.replace(f"{upload_path}.tmp", upload_path)
+    result = stream_transcription.transcribe_stream(upload_path, output_dir, model_name="base", on_progress=on_progress)
+    return result["text_path"]
+
+def stream_with_llama(transcript, token, language="English", fresh=False):
+    # Yields report text chunks as they are generated; identical requests come
+    # back in one chunk from the result cache
+    return analysis.stream_analyze(transcript, token, language, fresh=fresh)
 
 # Main UI
 uploaded_file = st.file_uploader("Upload Audio File", type=["mp3", "wav", "m4a", "awb", "ogg", "aac", "flac", "amr", "wma", "mp4"])
 
 # Language Selection
 language = st.radio("Select Report Language:", ["English", "Hinglish"], horizontal=True)
+fresh = st.checkbox("Force fresh analysis (skip cached result)", value=False)
 
-if uploaded_file is not None:
-    # Save temp file
-    temp_dir = tempfile.mkdtemp()
-    file_path = os.path.join(temp_dir, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+if uploaded_file is not None and uploaded_file.size > STREAM_UPLOAD_MB * 1024 * 1024:
+    # Multi-hour recording: no in-memory copy, no player, windowed transcription
+    st.caption(f"📼 Long recording ({uploaded_file.size / 1024 / 1024:.0f} MB): it will be transcribed in "
+               f"windows with bounded memory; the audio preview is skipped.")
+
+    if st.button("Analyze Call"):
+        token = get_api_key()
+        if not token and analysis_backends.get_backend().requires_token:
+            st.error("Please provide a Hugging Face API Key in the sidebar or env variables.")
+        else:
+            with metrics.span("request", app="streamlit", language=language, stream=True) as request_span:
+                try:
+                    progress = st.empty()
+
+                    def show_stream_progress(update):
+                        progress.caption(f"🎧 Transcribed {update['audio_seconds'] / 60:.0f} min: {update['text']}")
+
+                    with st.spinner(f"🎧 Transcribing & Analyzing in {language}..."):
+                        text_path = stream_transcribe_upload(uploaded_file, on_progress=show_stream_progress)
+                        progress.empty()
+                        with st.expander("View Transcript (beginning)"):
+                            with open(text_path, encoding="utf-8") as f:
+                                st.text(f.read(20000))
+                        report = analysis.analyze_file(text_path, token, language, fresh=fresh)
+
+                    st.subheader("✨ Design Thinking Analysis Report")
+                    st.markdown(report)
+                    st.download_button(
+                        label="Download Report as Text",
+                        data=report,
+                        file_name=f"{uploaded_file.name}_analysis.txt",
+                        mime="text/plain"
+                    )
+                except Exception as e:
+                    request_span.set(error=f"{type(e).__name__}: {e}")
+                    st.error(f"An error occurred: {e}")
+
+elif uploaded_file is not None:
+    # Work on the uploaded bytes directly: audio_ingest decodes them once
+    # (keyed by content hash), so no temp copy is written on every rerun
+    audio_bytes = uploaded_file.getvalue()
     
-    st.audio(file_path, format="audio/wav")
+    st.audio(audio_bytes, format=uploaded_file.type or "audio/wav")
     
     if st.button("Analyze Call"):
         token = get_api_key()
-        if not token:
+        if not token and analysis_backends.get_backend().requires_token:
             st.error("Please provide a Hugging Face API Key in the sidebar or env variables.")
         else:
-            try:
-                with st.spinner(f"🎧 Transcribing & Analyzing in {language}..."):
-                    transcript = transcribe_audio(file_path)
+            with metrics.span("request", app="streamlit", language=language) as request_span:
+                try:
+                    progress = st.empty()
+
+                    def show_progress(update):
+                        # Long recordings are decoded in parallel chunks; show what's done so far
+                        progress.caption(f"🎧 Transcribed {update['done']}/{update['total']} segments: "
+                                         f"{update['text'][-300:]}")
+
+                    with st.spinner(f"🎧 Transcribing & Analyzing in {language}..."):
+                        transcript = transcribe_audio(audio_bytes, on_progress=show_progress)
+                    progress.empty()
+                
+                    with st.expander("View Transcript"):
+                        st.text(transcript)
                 
-                with st.expander("View Transcript"):
-                    st.text(transcript)
+                    st.subheader("✨ Design Thinking Analysis Report")
+                    status = st.caption("🧠 Generating Analysis...")
+                    report_placeholder = st.empty()
                 
-                with st.spinner("🧠 Generating Analysis..."):
-                    analysis = analyze_with_llama(transcript, token, language)
+                    started = time.perf_counter()
+                    first_token_s = None
+                    report = ""
+                    for chunk in stream_with_llama(transcript, token, language, fresh=fresh):
+                        if chunk is analysis.RESTART:
+                            # Degenerate output was cut off; the report is being regenerated
+                            report = ""
+                            status.caption("🔁 Output went off the rails; regenerating...")
+                            continue
+                        if first_token_s is None:
+                            first_token_s = time.perf_counter() - started
+                            status.caption(f"🧠 Generating Analysis... (first token after {first_token_s:.1f}s)")
+                        report += chunk
+                        report_placeholder.markdown(report + "▌")
+                    report_placeholder.markdown(report)
                 
-                st.subheader("✨ Design Thinking Analysis Report")
-                st.markdown(analysis)
+                    ttft = f"{first_token_s:.1f}s" if first_token_s is not None else "n/a"
+                    status.caption(f"✅ Done in {time.perf_counter() - started:.1f}s (time to first token: {ttft})")
                 
-                # Download Button
-                st.download_button(
-                    label="Download Report as Text",
-                    data=analysis,
-                    file_name=f"{uploaded_file.name}_analysis.txt",
-                    mime="text/plain"
-                )
+                    # Download Button
+                    st.download_button(
+                        label="Download Report as Text",
+                        data=report,
+                        file_name=f"{uploaded_file.name}_analysis.txt",
+                        mime="text/plain"
+                    )
                 
-            except Exception as e:
-                st.error(f"An error occurred: {e}")
+                except Exception as e:
+                    request_span.set(error=f"{type(e).__name__}: {e}")
+                    st.error(f"An error occurred: {e}")
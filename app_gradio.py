@@ -1,71 +1,17 @@
-import gradio as gr
 import os
-import whisper
-from huggingface_hub import InferenceClient
 from dotenv import load_dotenv
-import tempfile
-import shutil
+import threading
+
+import transcription
+import analysis
+import analysis_backends
+import metrics
+import jobs
+import startup
 
 # Load Environment Variables
 load_dotenv()
 
-# System Prompt
-SYSTEM_PROMPT = """
-You are not a chatbot.
-You are a Design Thinking Fellow analyzing a real conversation between a team member and a business founder.
-
-Your job is NOT to summarize the conversation.
-Your job is to deeply understand what was FELT, not just what was SAID.
-
-Analyze the conversation using the following mindset:
-
-1. Founder Context Awareness
-   - Assume the founder is busy, risk-aware, and mentally filtering noise.
-   - Identify what pressure, hesitation, or expectation the founder might be carrying at each moment.
-
-2. Emotional State Mapping
-   - Track how the founder’s emotional state shifts during the conversation
-     (curious → guarded → disengaged / open → rushed → skeptical, etc.).
-   - Explain WHY those shifts happened.
-
-3. Control & Power Balance
-   - Identify who had control of the conversation at different points.
-   - Explain moments where control was lost or forcefully taken.
-
-4. Trust & Risk Perception
-   - Analyze how each statement either reduced or increased the founder’s perceived risk.
-   - Focus on clarity, time respect, and relevance — not politeness.
-
-5. Discomfort & Exit Signals
-   - Identify subtle discomfort signals such as pauses, vague affirmations,
-     topic changes, or suggestions to “email later.”
-   - Explain what these signals actually mean in a real business context.
-
-6. Pressure Response of the Caller
-   - Identify how the caller behaved under pressure
-     (over-explaining, justifying, selling, rushing, or grounding the conversation).
-   - Explain what this reveals about the caller’s maturity.
-
-7. How I Would Speak Differently
-   - Do NOT write a full script.
-   - Instead, explain what you would remove, reduce, or reframe to give
-     the founder more control and mental comfort.
-
-8. My Conversation Analysis Framework
-   - Build a short, original framework that analyzes conversations based on:
-     emotion, control, risk, energy exchange, and exit signals.
-   - Focus on understanding human behavior, not communication theory.
-
-Important:
-- Avoid generic advice, soft language, or textbook communication tips.
-- Write like a thoughtful human who understands business pressure.
-- Prioritize empathy, clarity, and respect for mental space.
-- The goal is insight, not perfection.
-
-End the analysis with one reflective line about what this conversation teaches
-about trust, maturity, or human interaction in real-world business settings.
-"""
-
 # Helper/Logic Functions (Reused from app.py)
 def get_api_key(user_input_key):
     # Priority: 1. User Input, 2. Local Env
@@ -73,120 +19,152 @@ def get_api_key(user_input_key):
         return user_input_key.strip()
     return os.getenv("HUGGINGFACE_API_KEY")
 
-def load_whisper_model():
-    # In Gradio, we can load this globally or cache it if we want custom caching,
-    # but for simplicity we rely on whisper's own caching or just load it.
-    # To avoid reloading every time, we can load it once globally if memory permits,
-    # or just call it inside the function.
-    return whisper.load_model("base")
-
-def transcribe_audio(audio_path):
+def transcribe_audio(audio_path, on_progress=None):
+    # The Whisper model is shared process-wide (whisper_registry), loaded once
+    # at launch or on first click instead of re-reading weights per request.
     if not audio_path:
         return ""
-    model = load_whisper_model()
-    result = model.transcribe(audio_path)
-    return result["text"]
-
-def analyze_with_llama(transcript, token, language="English"):
-    if not token:
-        raise ValueError("No API Key provided.")
-        
-    client = InferenceClient(token=token)
-    model_id = "meta-llama/Meta-Llama-3-8B-Instruct"
-    
-    # Language specific instruction
-    lang_instruction = ""
-    if language == "Hinglish":
-        lang_instruction = "5. OUTPUT LANGUAGE: Generate the ENTIRE analysis in HINGLISH (Natural mix of Hindi and English). Keep technical headers in English, but explain the insights in Hinglish (e.g., 'Founder kaafi guarded lag raha tha')."
-    else:
-        lang_instruction = "5. OUTPUT LANGUAGE: Generate the analysis in standard professional ENGLISH."
-
-    user_message = f"""
-Here is the raw transcript of a real call. 
-Your task is to analyze it using the Design Thinking framework provided in the system prompt.
-
-RULES:
-1. Do NOT generate any new dialogue or conversation.
-2. Do NOT repeat the transcript.
-3. OUTPUT ONLY the analysis sections (1-8).
-4. If the transcript is empty or unclear, say "Transcript is unclear".
-{lang_instruction}
-
---- TRANSCRIPT BEGINS ---
-{transcript}
---- TRANSCRIPT ENDS ---
-
-Analyze the transcript now:
-"""
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_message}
-    ]
-    
-    response = client.chat_completion(
-        model=model_id,
-        messages=messages,
-        max_tokens=2500,
-        temperature=0.3
-    )
-    return response.choices[0].message.content
-
-def process_call(audio_file, language, api_key_input):
+    # Cached by audio content + model, so switching report language skips Whisper
+    return transcription.transcribe(audio_path, model_name="base", on_progress=on_progress)["text"]
+
+def analyze_with_llama(transcript, token, language="English", fresh=False):
+    # Identical transcript + prompt + model + sampling is served from the result cache
+    return analysis.analyze(transcript, token, language, fresh=fresh)
+
+# Heavy work runs in the shared job pool (jobs.py), not in the request handler
+_jobs = None
+_jobs_lock = threading.Lock()
+
+def get_jobs():
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = jobs.JobQueue()
+        return _jobs
+
+def _job_outputs(snapshot):
+    # (transcript, report, file, status) for one job snapshot
+    label = f"Job `{snapshot['id']}`"
+    if snapshot["subscribers"] > 1:
+        label += f" (shared by {snapshot['subscribers']} identical requests)"
+    if snapshot["status"] == jobs.FAILED:
+        return f"Error: {snapshot['error']}", "", None, f"{label} · ❌ Failed"
+    if snapshot["status"] == jobs.QUEUED:
+        return "", "", None, f"{label} · ⏳ Queued ({get_jobs().stats()['queued']} waiting)..."
+    return snapshot["transcript"], snapshot["report"], snapshot["output_path"], f"{label} · {snapshot['progress']}"
+
+def process_call(audio_file, language, api_key_input, fresh=False):
+    # Generator: Gradio re-renders (transcript, report, file, status) on every yield.
+    # The request span isn't attached to the context since Gradio may resume
+    # the generator from different worker threads.
+    with metrics.span("request", attach=False, app="gradio", language=language):
+        yield from _process_call(audio_file, language, api_key_input, fresh)
+
+def _process_call(audio_file, language, api_key_input, fresh=False):
     try:
         if audio_file is None:
-            return "Please upload an audio file.", "", None
+            yield "Please upload an audio file.", "", None, ""
+            return
         
         token = get_api_key(api_key_input)
-        if not token:
-            return "Error: Please provide a Hugging Face API Key.", "", None
-        
-        # 1. Transcribe
-        transcript = transcribe_audio(audio_file)
+        if not token and analysis_backends.get_backend().requires_token:
+            yield "Error: Please provide a Hugging Face API Key.", "", None, ""
+            return
         
-        # 2. Analyze
-        analysis = analyze_with_llama(transcript, token, language)
-        
-        # 3. Create a downloadable file
-        output_file = "analysis_report.txt"
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(analysis)
-            
-        return transcript, analysis, output_file
+        # Queue the call (or join an identical one in flight) and stream its progress
+        job = get_jobs().submit(audio_file, language, token, fresh=fresh)
+        for snapshot in get_jobs().watch(job.id):
+            yield _job_outputs(snapshot)
 
     except Exception as e:
-        return f"Error: {str(e)}", "", None
-
-# Gradio UI
-with gr.Blocks(title="AI Call Analyzer", theme=gr.themes.Soft()) as demo:
-    gr.Markdown("# 🎧 AI Call Analyzer (Design Thinking)")
-    gr.Markdown("""
-    Upload a call recording (Audio) to analyze it using **Whisper** (Transcription) and **Llama-3** (Analysis).
-    This tool provides deep insights into Founder Context, Emotional State, and more.
-    """)
+        yield f"Error: {str(e)}", "", None, ""
+
+def readiness():
+    # Polled by the UI timer until the background preload has finished
+    import gradio as gr
+
+    return startup.describe(), gr.Timer(active=bool(startup.status()) and not startup.done())
+
+def check_job(job_id):
+    # Poll a job by id (e.g. after the page was reloaded)
+    snapshot = get_jobs().get((job_id or "").strip().strip("`"))
+    if snapshot is None:
+        return "", "", None, f"❓ No job with id `{job_id}` (finished jobs are kept for {jobs.JOB_RETENTION_S / 60:.0f} min)."
+    return _job_outputs(snapshot)
+
+# Gradio UI, built at launch: gradio alone takes seconds to import
+def build_ui():
+    import gradio as gr
+
+    with gr.Blocks(title="AI Call Analyzer", theme=gr.themes.Soft()) as demo:
+        gr.Markdown("# 🎧 AI Call Analyzer (Design Thinking)")
+        gr.Markdown("""
+        Upload a call recording (Audio) to analyze it using **Whisper** (Transcription) and **Llama-3** (Analysis).
+        This tool provides deep insights into Founder Context, Emotional State, and more.
+        """)
+        ready_output = gr.Markdown()
+        ready_timer = gr.Timer(1.0)
     
-    with gr.Row():
-        with gr.Column():
-            audio_input = gr.Audio(type="filepath", label="Upload Audio File")
-            language_input = gr.Radio(choices=["English", "Hinglish"], value="English", label="Select Report Language")
-            api_key_input = gr.Textbox(
-                label="Hugging Face API Key", 
-                type="password", 
-                placeholder="Enter HF Token if not in env",
-                info="Required if HUGGINGFACE_API_KEY is not set in environment."
-            )
-            analyze_btn = gr.Button("Analyze Call", variant="primary")
+        with gr.Row():
+            with gr.Column():
+                audio_input = gr.Audio(type="filepath", label="Upload Audio File")
+                language_input = gr.Radio(choices=["English", "Hinglish"], value="English", label="Select Report Language")
+                api_key_input = gr.Textbox(
+                    label="Hugging Face API Key", 
+                    type="password", 
+                    placeholder="Enter HF Token if not in env",
+                    info="Required if HUGGINGFACE_API_KEY is not set in environment."
+                )
+                fresh_input = gr.Checkbox(label="Force fresh analysis (skip cached result)", value=False)
+                analyze_btn = gr.Button("Analyze Call", variant="primary")
         
-        with gr.Column():
-            transcript_output = gr.Textbox(label="Transcript", lines=10, interactive=False)
-            analysis_output = gr.Markdown(label="Analysis Report")
-            download_output = gr.File(label="Download Report")
-
-    analyze_btn.click(
-        fn=process_call,
-        inputs=[audio_input, language_input, api_key_input],
-        outputs=[transcript_output, analysis_output, download_output]
-    )
+            with gr.Column():
+                transcript_output = gr.Textbox(label="Transcript", lines=10, interactive=False)
+                status_output = gr.Markdown()
+                analysis_output = gr.Markdown(label="Analysis Report")
+                download_output = gr.File(label="Download Report")
+                with gr.Row():
+                    job_id_input = gr.Textbox(label="Job ID", placeholder="Check on an earlier job", scale=3)
+                    check_btn = gr.Button("Check Job", scale=1)
+
+        analyze_btn.click(
+            fn=process_call,
+            inputs=[audio_input, language_input, api_key_input, fresh_input],
+            outputs=[transcript_output, analysis_output, download_output, status_output]
+        )
+        check_btn.click(
+            fn=check_job,
+            inputs=[job_id_input],
+            outputs=[transcript_output, analysis_output, download_output, status_output]
+        )
+        demo.load(fn=readiness, outputs=[ready_output, ready_timer])
+        ready_timer.tick(fn=readiness, outputs=[ready_output, ready_timer])
+    return demo
+
+_demo = None
+
+def __getattr__(name):
+    # `app_gradio.demo` (gradio's reload mode, other importers) builds the UI
+    # on first access, so a plain import still doesn't pay for gradio
+    global _demo
+    if name == "demo":
+        if _demo is None:
+            _demo = build_ui()
+        return _demo
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
+    # Structured span logs + /metrics (CALL_ANALYZER_METRICS_PORT) or a
+    # periodic dump (CALL_ANALYZER_METRICS_FILE)
+    metrics.configure_logging()
+    metrics.start_metrics_server()
+    metrics.start_periodic_dump()
+    # Whisper (and a local analysis model) load in the background so the UI
+    # is up right away; requests that come in first wait for the same load
+    startup.start_preload("base")
+    # Handlers only wait on jobs, so many can stream at once; the job pool
+    # (CALL_ANALYZER_JOB_WORKERS) bounds the actual Whisper/LLM work
+    demo = __getattr__("demo")
+    demo.queue(default_concurrency_limit=jobs.JOB_QUEUE_SIZE + jobs.JOB_WORKERS)
     # share=True creates a public link which is great for mobile testing
     demo.launch(share=True)
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import subprocess
+import tempfile
+import uuid
+
+import numpy as np
+
+import metrics
+from disk_cache import DiskCache, default_cache_root
+
+# Decode-once audio ingestion.
+# Every input (file path or uploaded bytes) is decoded by ffmpeg exactly once
+# to 16 kHz mono float32 and kept in a content-addressed PCM cache as a raw
+# .f32 file. Later runs memory-map that file and hand the array straight to
+# Whisper, so slow formats (.awb/.amr) are never decoded twice and nothing is
+# copied into ad-hoc temp folders.
+
+SAMPLE_RATE = 16000
+PCM_CACHE_MB = int(os.getenv("CALL_ANALYZER_PCM_CACHE_MB", "2048"))  # ~230MB per hour of audio
+
+
+class PcmCache(DiskCache):
+    """
+    DiskCache variant holding raw float32 PCM, returned as memory-mapped arrays.
+    """
+
+    suffix = ".f32"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if os.path.getsize(path) == 0:
+                return np.zeros(0, dtype=np.float32)
+            # Copy-on-write map: pages are read lazily from the page cache and
+            # Whisper can treat the array as writable without touching the file
+            audio = np.memmap(path, dtype=np.float32, mode="c")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return audio
+
+    def put_decoded(self, key, source):
+        """
+        Decodes source with ffmpeg directly into the cache file (streamed to
+        disk, never held in memory as a whole) and returns the mapped array.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            with open(tmp_path, "wb") as out:
+                _decode_to(source, out)
+            os.replace(tmp_path, path)
+        finally:
+            self._remove(tmp_path)
+        self.evict()
+        return self.get(key)
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = PcmCache(os.path.join(default_cache_root(), "pcm"), max_bytes=PCM_CACHE_MB * 1024 * 1024)
+    return _cache
+
+
+def _ffmpeg_cmd(input_arg):
+    return [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", input_arg,
+        "-f", "f32le", "-ac", "1", "-acodec", "pcm_f32le", "-ar", str(SAMPLE_RATE),
+        "-loglevel", "error",
+        "-",
+    ]
+
+
+def _run_ffmpeg(cmd, out, stdin_bytes=None):
+    try:
+        subprocess.run(
+            cmd,
+            input=stdin_bytes,
+            stdout=out,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg was not found on PATH. Install it (see README) to decode audio.")
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='replace').strip()}") from e
+
+
+def _decode_to(source, out):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        data = bytes(source)
+        try:
+            # Most formats decode fine from a pipe
+            cmd = _ffmpeg_cmd("pipe:0")
+            cmd.remove("-nostdin")
+            _run_ffmpeg(cmd, out, stdin_bytes=data)
+            return
+        except RuntimeError:
+            # MP4/M4A with the index at the end need a seekable file
+            out.seek(0)
+            out.truncate()
+        with tempfile.TemporaryDirectory(prefix="call-analyzer-") as tmp_dir:
+            tmp_path = os.path.join(tmp_dir, "upload")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            _run_ffmpeg(_ffmpeg_cmd(tmp_path), out)
+    else:
+        _run_ffmpeg(_ffmpeg_cmd(os.fspath(source)), out)
+
+
+def source_digest(source, chunk_size=1024 * 1024):
+    """
+    SHA-256 of a file path's contents or of raw bytes.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load(source, digest=None):
+    """
+    Returns the 16 kHz mono float32 waveform for source (path or bytes),
+    decoding it only if this content has never been seen before.
+    """
+    digest = digest or source_digest(source)
+    cache = get_cache()
+    audio = cache.get(digest)
+    if audio is None:
+        with metrics.span("decode") as span:
+            audio = cache.put_decoded(digest, source)
+            span.set(audio_seconds=round(duration_seconds(audio), 2))
+    return audio
+
+
+def duration_seconds(audio):
+    return len(audio) / SAMPLE_RATE
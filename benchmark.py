@@ -0,0 +1,541 @@
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+# End-to-end benchmark for the call pipeline.
+# Runs the sample recordings in the repo plus synthetic audio of several
+# lengths through decode -> Whisper -> analysis, with the LLM replaced by the
+# deterministic local stub (stub_server.py), and reports:
+#   - per-stage latency percentiles (decode, transcribe, analyze, total)
+#   - Whisper real-time factor (transcribe seconds / audio seconds)
+#   - peak RSS
+#   - calls per minute at several concurrency levels
+#   - import time of the entry points (python -X importtime), with the
+#     heaviest dependencies, so startup cost doesn't creep back
+#   - with --engines: speed vs. accuracy of each Whisper engine/precision
+#     (load time, weights size, RTF, word error rate)
+# Results are written as JSON; --compare flags regressions against an older run.
+#
+#   python benchmark.py --synthetic 30,120 --concurrency 1,2,4 --output bench.json
+#   python benchmark.py --compare bench.json
+#   python benchmark.py --synthetic "" --concurrency "" \
+#       --engines openai:fp32,openai:int8,faster-whisper:int8 --engine-models tiny,base
+#
+# WER is measured against <recording>.txt in --references when there is one,
+# otherwise against the first configuration (so it is the accuracy lost
+# relative to that baseline).
+
+SAMPLE_RATE = 16000
+DEFAULT_IMPORTS = "analyze_call,app_gradio,transcription,analysis"
+REGRESSION_THRESHOLD = 0.20  # 20% slower than the baseline counts as a regression
+
+# What the analyze stage sends to the stub. Whisper's output for synthetic
+# audio is a few words at most, which the pre-flight check answers locally
+# without any request, so the LLM stage always gets a call-sized transcript.
+BENCH_TRANSCRIPT = """
+Caller: Hi, thanks for taking the time today. I know you're busy, so I'll keep this short.
+Founder: Sure. I have about fifteen minutes before my next meeting, so let's see where this goes.
+Caller: We work with early-stage teams on their customer support operations, mostly around call quality.
+Founder: Okay. We already have a small team handling that, and honestly it's working fine for now.
+Caller: That makes sense. Can I ask how you currently review the calls your team takes?
+Founder: We listen to a few every week. Not many, to be fair. There isn't a lot of time for it.
+Caller: Most founders we speak with say the same. What happens when a customer escalates?
+Founder: Then I get pulled in, which is exactly what I'm trying to avoid. It eats my whole afternoon.
+Caller: Right. What we do is flag those calls early, before they turn into escalations.
+Founder: I've heard pitches like this before. How is it different from the tools we tried last year?
+Caller: Fair question. We don't replace your team, we give them a short summary of where each call went wrong.
+Founder: Hmm. And what does it cost? Because we are watching every rupee right now.
+Caller: It depends on volume. For a team your size it would be a small monthly fee with a free first month.
+Founder: Send me something on email and I'll look at it later this week. I can't promise anything.
+Caller: Of course. Would it help if I shared two examples from companies at your stage?
+Founder: Maybe. Keep it short though. If it looks useful I'll loop in my operations lead.
+Caller: Perfect. I'll send it today, and I'll follow up on Friday if that works for you.
+Founder: Friday is fine. Thanks, talk soon.
+""".strip()
+
+
+def synthetic_audio(seconds, seed=0):
+    """
+    Speech-like test signal: harmonic "voiced" bursts at a syllable rate,
+    separated by pauses, over a low noise floor. Returns WAV bytes.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) ** 2
+    # ~3s of talking, ~1s pause
+    talking = ((t % 4.0) < 3.0).astype(np.float32)
+    signal = 0.2 * voiced * syllables * talking + rng.normal(0, 0.003, n)
+    pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+    except ImportError:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / 1024 / 1024, 1)
+        except (ImportError, AttributeError):
+            return None
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    arr = np.asarray(values, dtype=float)
+    return {
+        "n": len(values),
+        "mean": round(float(arr.mean()), 4),
+        "p50": round(float(np.percentile(arr, 50)), 4),
+        "p90": round(float(np.percentile(arr, 90)), 4),
+        "p95": round(float(np.percentile(arr, 95)), 4),
+        "max": round(float(arr.max()), 4),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_inputs(paths, synthetic_lengths):
+    """
+    Returns [(name, source)] where source is a path or WAV bytes.
+    """
+    import analyze_call
+
+    inputs = []
+    if paths:
+        files, _ = analyze_call.collect_audio_files(paths)
+        inputs.extend((os.path.basename(f), f) for f in files)
+    for seconds in synthetic_lengths:
+        inputs.append((f"synthetic_{seconds:g}s", synthetic_audio(seconds, seed=int(seconds))))
+    return inputs
+
+
+def run_call(source, model_name):
+    """
+    One call through every stage with caches bypassed. Returns a timing record.
+    """
+    import audio_ingest
+    import analysis
+    import transcription
+
+    record = {}
+    started = time.perf_counter()
+    audio = audio_ingest.load(source)
+    record["decode_s"] = time.perf_counter() - started
+    record["audio_s"] = audio_ingest.duration_seconds(audio)
+
+    # The PCM cache is warm now, so this measures Whisper itself
+    started = time.perf_counter()
+    result = transcription.transcribe(source, model_name=model_name, use_cache=False)
+    record["transcribe_s"] = time.perf_counter() - started
+    record["rtf"] = record["transcribe_s"] / record["audio_s"] if record["audio_s"] else None
+    record["transcript_chars"] = len(result["text"])
+
+    started = time.perf_counter()
+    report = analysis.analyze(BENCH_TRANSCRIPT, "stub-token", fresh=True, backend="hf")
+    record["analyze_s"] = time.perf_counter() - started
+    record["report_chars"] = len(report)
+
+    record["total_s"] = record["decode_s"] + record["transcribe_s"] + record["analyze_s"]
+    return record
+
+
+def run_throughput(inputs, model_name, concurrency):
+    """
+    Pushes every input through the overlapped pipeline with `concurrency`
+    workers per stage and returns calls per minute. The transcribe workers
+    share one registry model; with openai-whisper their decodes take turns,
+    so higher levels mostly gain from overlapping the analysis.
+    """
+    import analysis
+    import pipeline
+    import transcription
+
+    sources = {name: source for name, source in inputs}
+
+    def transcribe_fn(name):
+        return transcription.transcribe(sources[name], model_name=model_name, use_cache=False)["text"]
+
+    def analyze_fn(name, transcript):
+        return analysis.analyze(BENCH_TRANSCRIPT, "stub-token", fresh=True, backend="hf")
+
+    started = time.perf_counter()
+    records = pipeline.run_pipeline(
+        list(sources), transcribe_fn, analyze_fn,
+        transcribe_workers=concurrency, analyze_workers=concurrency, queue_size=concurrency,
+    )
+    wall = time.perf_counter() - started
+    ok = sum(1 for r in records if r["ok"])
+    return {
+        "concurrency": concurrency,
+        "calls": len(records),
+        "failed": len(records) - ok,
+        "wall_s": round(wall, 3),
+        "calls_per_min": round(ok / wall * 60, 2) if wall > 0 else None,
+    }
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word-level edit distance / reference length, ignoring case and punctuation.
+    """
+    ref = re.findall(r"\w+", reference.lower())
+    hyp = re.findall(r"\w+", hypothesis.lower())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def parse_engines(spec):
+    """
+    "openai:fp32,faster-whisper:int8" -> [("openai", "fp32"), ("faster-whisper", "int8")]
+    """
+    configs = []
+    for item in spec.split(","):
+        item = item.strip()
+        if item:
+            engine, _, precision = item.partition(":")
+            configs.append((engine, precision or None))
+    return configs
+
+
+def run_engine_matrix(inputs, model_names, configs, reference_dir=None):
+    """
+    Transcribes every input with every (model, engine, precision) and returns
+    one summary row per configuration. The first configuration is the speed
+    and accuracy baseline.
+    """
+    import audio_ingest
+    import transcription
+    import whisper_registry
+
+    durations = {name: audio_ingest.duration_seconds(audio_ingest.load(source)) for name, source in inputs}
+    references = {}
+    for name, _ in inputs:
+        path = os.path.join(reference_dir, os.path.splitext(name)[0] + ".txt") if reference_dir else None
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                references[name] = f.read()
+
+    rows = []
+    baseline = {}  # input -> transcript of the first configuration
+    for model_name in model_names:
+        for engine, precision in configs:
+            label = f"{model_name}/{engine}:{precision or 'default'}"
+            row = {"config": label, "model": model_name, "engine": engine, "precision": precision}
+            try:
+                entry = whisper_registry.get_model(model_name, precision=precision, engine=engine)
+            except Exception as e:
+                row["error"] = f"{type(e).__name__}: {e}"
+                print(f"  ❌ {label}: {row['error']}")
+                rows.append(row)
+                continue
+            row.update(entry.stats())
+            row["config"] = label
+
+            rtfs, wers, transcribe_total = [], [], 0.0
+            try:
+                for name, source in inputs:
+                    started = time.perf_counter()
+                    result = transcription.transcribe(source, model_name=model_name, use_cache=False,
+                                                      parallel=False, engine=entry.engine, precision=entry.precision)
+                    elapsed = time.perf_counter() - started
+                    transcribe_total += elapsed
+                    if durations[name]:
+                        rtfs.append(elapsed / durations[name])
+                    if name not in baseline:
+                        baseline[name] = result["text"]
+                    reference = references.get(name, baseline[name])
+                    wers.append(word_error_rate(reference, result["text"]))
+            except Exception as e:
+                row["error"] = f"{type(e).__name__}: {e}"
+                print(f"  ❌ {row['config']}: {row['error']}")
+                rows.append(row)
+                whisper_registry.unload(model_name, entry.device, entry.precision, entry.engine)
+                continue
+
+            row["transcribe_s"] = round(transcribe_total, 3)
+            row["rtf"] = percentiles(rtfs)
+            row["wer"] = round(float(np.mean(wers)), 4) if wers else None
+            row["wer_reference"] = "files" if references else "baseline"
+            rows.append(row)
+            print(f"  🎧 {label}: load {row['load_seconds']}s | {row['param_mb'] or '?'}MB weights | "
+                  f"RTF p50 {row['rtf'].get('p50', float('nan')):.3f} | WER {row['wer']:.1%}")
+            whisper_registry.unload(model_name, entry.device, entry.precision, entry.engine)
+
+    ok_rows = [r for r in rows if "error" not in r]
+    if ok_rows:
+        base_s = ok_rows[0]["transcribe_s"]
+        for r in ok_rows:
+            r["speedup"] = round(base_s / r["transcribe_s"], 2) if r["transcribe_s"] else None
+    return rows
+
+
+def engines_markdown(rows):
+    lines = ["| Config | Load (s) | Weights (MB) | Threads | RTF p50 | Speedup | WER |",
+             "| :--- | ---: | ---: | ---: | ---: | ---: | ---: |"]
+    for r in rows:
+        if "error" in r:
+            lines.append(f"| {r['config']} | ❌ {r['error']} | | | | | |")
+            continue
+        lines.append(f"| {r['config']} | {r['load_seconds']} | {r['param_mb'] or '—'} | {r['threads'] or 'all'} | "
+                     f"{r['rtf'].get('p50', '—')} | {r['speedup']}x | {r['wer']:.1%} |")
+    return "\n".join(lines) + "\n"
+
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def import_profile(module, repeat=3, top=8):
+    """
+    Imports module in fresh interpreters under -X importtime. Returns the
+    import time percentiles (seconds) and the heaviest top-level packages
+    it pulled in.
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [repo_dir, os.getenv("PYTHONPATH")])))
+    times = []
+    heaviest = {}
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              capture_output=True, text=True, cwd=repo_dir, env=env)
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"}
+        for line in proc.stderr.splitlines():
+            match = _IMPORTTIME_RE.match(line)
+            if not match:
+                continue
+            cumulative_s = int(match.group(2)) / 1e6
+            depth = (len(match.group(3)) - 1) // 2
+            name = match.group(4)
+            if name == module and depth == 0:
+                times.append(cumulative_s)
+            elif "." not in name and name != module:
+                heaviest[name] = max(heaviest.get(name, 0.0), cumulative_s)
+    ranked = sorted(heaviest.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "seconds": percentiles(times),
+        "heaviest": [{"module": name, "seconds": round(seconds, 4)} for name, seconds in ranked],
+    }
+
+
+def compare(current, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints stage-by-stage changes vs. a previous result file and returns the
+    list of regressions (p50 slower by more than threshold).
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f"\n📉 Compared with {baseline_path} (rev {baseline.get('revision')}):")
+    for stage, stats in current["stages"].items():
+        old = baseline.get("stages", {}).get(stage, {}).get("p50")
+        new = stats.get("p50")
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        flag = "❌" if change > threshold else "✅"
+        print(f"  {flag} {stage:<14} p50 {old:.3f} -> {new:.3f} ({change:+.0%})")
+        if change > threshold:
+            regressions.append(stage)
+    old_levels = {t["concurrency"]: t.get("calls_per_min") for t in baseline.get("throughput", [])}
+    for item in current.get("throughput", []):
+        old, new = old_levels.get(item["concurrency"]), item.get("calls_per_min")
+        if not old or new is None:
+            continue
+        change = (old - new) / old
+        flag = "❌" if change > threshold else "✅"
+        print(f"  {flag} {'x' + str(item['concurrency']) + ' calls/min':<14} {old:.1f} -> {new:.1f} ({-change:+.0%})")
+        if change > threshold:
+            regressions.append(f"throughput x{item['concurrency']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end benchmark (Whisper + stubbed LLM)")
+    parser.add_argument("inputs", nargs="*", default=None,
+                        help="Audio files/dirs/globs. Default: the sample recordings in the repo root")
+    parser.add_argument("--synthetic", default="30,120,600",
+                        help="Comma-separated synthetic audio lengths in seconds ('' for none)")
+    parser.add_argument("--concurrency", default="1,2,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--repeat", type=int, default=1, help="Latency runs per input")
+    parser.add_argument("--whisper-model", default="base")
+    parser.add_argument("--stub-ttft", type=float, default=0.3, help="Stub LLM time to first token (s)")
+    parser.add_argument("--stub-tps", type=float, default=200.0, help="Stub LLM tokens per second")
+    parser.add_argument("--stub-tokens", type=int, default=600, help="Stub LLM completion tokens")
+    parser.add_argument("--imports", default=DEFAULT_IMPORTS,
+                        help=f"Comma-separated modules to profile import time for ('' for none). Default: {DEFAULT_IMPORTS}")
+    parser.add_argument("--import-repeat", type=int, default=3, help="Fresh interpreters per import profile")
+    parser.add_argument("--engines", default=None,
+                        help="Comma-separated engine:precision configs to compare, e.g. "
+                             "openai:fp32,openai:int8,faster-whisper:int8 (first one is the baseline)")
+    parser.add_argument("--engine-models", default=None,
+                        help="Comma-separated Whisper sizes for --engines. Default: --whisper-model")
+    parser.add_argument("--references", default=None,
+                        help="Directory of <recording>.txt reference transcripts for WER")
+    parser.add_argument("--threads", type=int, default=None, help="Whisper CPU threads. Default: all cores")
+    parser.add_argument("--output", default=None, help="Where to write results JSON")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to check for regressions")
+    args = parser.parse_args(argv)
+
+    # Startup first, in clean subprocesses
+    imports = {}
+    for module in [m.strip() for m in args.imports.split(",") if m.strip()]:
+        imports[module] = import_profile(module, args.import_repeat)
+        if "error" in imports[module]:
+            print(f"  ❌ import {module}: {imports[module]['error']}")
+            continue
+        heavy = ", ".join(f"{h['module']} {h['seconds']:.2f}s" for h in imports[module]["heaviest"][:3])
+        print(f"  📦 import {module}: p50 {imports[module]['seconds']['p50']:.3f}s (heaviest: {heavy})")
+
+    # Benchmark against empty caches so decode/transcribe/analyze are all measured
+    os.environ["CALL_ANALYZER_CACHE_DIR"] = tempfile.mkdtemp(prefix="call-analyzer-bench-")
+    if args.threads:
+        os.environ["CALL_ANALYZER_WHISPER_THREADS"] = str(args.threads)
+
+    import stub_server
+    import inference_client
+    import whisper_registry
+
+    server, url = stub_server.start_server(
+        ttft_s=args.stub_ttft, tokens_per_second=args.stub_tps, completion_tokens=args.stub_tokens
+    )
+    inference_client.INFERENCE_URL = url
+
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    paths = args.inputs or [repo_dir]
+    synthetic = [float(x) for x in args.synthetic.split(",") if x.strip()]
+    inputs = load_inputs(paths, synthetic)
+    if not inputs:
+        print("❌ No inputs to benchmark.")
+        return 1
+
+    print(f"⏱️ Benchmarking {len(inputs)} input(s) with Whisper '{args.whisper_model}' and a stub LLM at {url}")
+    model_entry = whisper_registry.preload(args.whisper_model)
+
+    calls = []
+    for name, source in inputs:
+        for _ in range(args.repeat):
+            try:
+                record = run_call(source, args.whisper_model)
+            except Exception as e:
+                print(f"  ❌ {name}: {type(e).__name__}: {e}")
+                calls.append({"input": name, "error": f"{type(e).__name__}: {e}"})
+                continue
+            record["input"] = name
+            calls.append(record)
+            print(f"  ✅ {name}: {record['audio_s']:.0f}s audio | decode {record['decode_s']:.2f}s | "
+                  f"transcribe {record['transcribe_s']:.2f}s (RTF {record['rtf']:.3f}) | "
+                  f"analyze {record['analyze_s']:.2f}s")
+
+    ok_calls = [c for c in calls if "error" not in c]
+    stages = {
+        stage: percentiles([c[stage] for c in ok_calls])
+        for stage in ("decode_s", "transcribe_s", "analyze_s", "total_s")
+    }
+    stages["rtf"] = percentiles([c["rtf"] for c in ok_calls if c["rtf"] is not None])
+    # Import times go through the same regression check as the stages
+    for module, profile in imports.items():
+        if "seconds" in profile:
+            stages[f"import:{module}"] = profile["seconds"]
+
+    throughput = []
+    for level in [int(x) for x in args.concurrency.split(",") if x.strip()]:
+        result = run_throughput(inputs, args.whisper_model, level)
+        throughput.append(result)
+        print(f"  🚀 concurrency {level}: {result['calls_per_min']} calls/min "
+              f"({result['calls']} calls in {result['wall_s']}s, {result['failed']} failed)")
+
+    engines = []
+    if args.engines:
+        model_names = [m.strip() for m in (args.engine_models or args.whisper_model).split(",") if m.strip()]
+        print(f"\n⚖️ Comparing Whisper engines on {len(inputs)} input(s)...")
+        engines = run_engine_matrix(inputs, model_names, parse_engines(args.engines), args.references)
+
+    server.shutdown()
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "whisper": model_entry.stats(),
+        "stub": {"ttft_s": args.stub_ttft, "tokens_per_second": args.stub_tps, "completion_tokens": args.stub_tokens},
+        "stages": stages,
+        "throughput": throughput,
+        "engines": engines,
+        "imports": imports,
+        "peak_rss_mb": peak_rss_mb(),
+        "calls": calls,
+    }
+
+    print("\n📊 Stage latency (seconds):")
+    for stage, stats in stages.items():
+        if stats:
+            print(f"  {stage:<14} p50 {stats['p50']:.3f} | p90 {stats['p90']:.3f} | "
+                  f"p95 {stats['p95']:.3f} | max {stats['max']:.3f}")
+    print(f"  peak RSS: {results['peak_rss_mb']} MB")
+
+    output = args.output or f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results saved to '{output}'")
+    if engines:
+        table = engines_markdown(engines)
+        markdown_path = os.path.splitext(output)[0] + "_engines.md"
+        with open(markdown_path, "w", encoding="utf-8") as f:
+            f.write(table)
+        print(f"\n⚖️ Whisper engines:\n{table}✅ Engine comparison saved to '{markdown_path}'")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        if regressions:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from disk_cache import default_cache_root
+
+# Columnar store of Whisper segments across every processed call.
+# Each column is one flat binary file of fixed-width values that grows by
+# appending; scans memory-map the columns, so questions like "every segment
+# that follows a silence of more than 3s" run as one vectorized pass over
+# thousands of calls without loading any transcript.
+#
+#   <root>/calls.jsonl        one line per call (source, model, rows it owns)
+#   <root>/<column>.bin       segment columns, row i of every file = segment i
+#   <root>/text.bin           UTF-8 segment texts, addressed by text_offset/text_len
+#
+# calls.jsonl is written last, so a crash mid-append leaves rows that no call
+# owns; they are ignored by readers and truncated by the next append.
+
+COLUMNS = {
+    "call": np.int32,            # index into calls.jsonl
+    "seg_id": np.int32,
+    "start": np.float32,
+    "end": np.float32,
+    "gap_before": np.float32,    # silence since the previous segment of the same call (0 for the first)
+    "avg_logprob": np.float32,
+    "compression_ratio": np.float32,
+    "no_speech_prob": np.float32,
+    "text_offset": np.int64,
+    "text_len": np.int32,
+}
+
+ENABLED = os.getenv("CALL_ANALYZER_CALL_STORE", "1") != "0"
+
+
+def default_root():
+    return os.path.join(default_cache_root(), "call_store")
+
+
+class _Lock:
+    # Cross-process lock on an open file (flock, or msvcrt on Windows). The OS
+    # releases it when the holder exits or crashes, so there is no stale lock
+    # file to clean up (and no race between two cleaners)
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if os.name == "nt":
+            import msvcrt
+
+            while True:
+                try:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+        else:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+        return False
+
+
+class CallStore:
+    """
+    Append-only columnar segment store. Safe to share between processes.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or default_root()
+        os.makedirs(self.root, exist_ok=True)
+        self._calls = []
+        self._calls_size = 0
+        self._keys = set()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def calls(self):
+        """
+        All committed calls; only lines added since the last look are parsed.
+        """
+        path = self._path("calls.jsonl")
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            size = 0
+        if size > self._calls_size:
+            with open(path, "rb") as f:
+                f.seek(self._calls_size)
+                for line in f.read(size - self._calls_size).splitlines(keepends=True):
+                    if not line.endswith(b"\n"):
+                        break  # being written right now
+                    call = json.loads(line)
+                    self._calls.append(call)
+                    self._keys.add((call["digest"], call["model"]))
+                    self._calls_size += len(line)
+        return self._calls
+
+    def row_count(self):
+        calls = self.calls()
+        return calls[-1]["row_offset"] + calls[-1]["rows"] if calls else 0
+
+    def has(self, digest, model):
+        self.calls()
+        return (digest, model) in self._keys
+
+    def append(self, digest, segments, model=None, source=None, language=None, duration_s=None):
+        """
+        Adds one call's segments. A call (digest + model) is stored only once.
+        Returns the call's index.
+        """
+        with _Lock(self._path(".lock")):
+            calls = self.calls()
+            if (digest, model) in self._keys:
+                return next(c["index"] for c in calls if c["digest"] == digest and c["model"] == model)
+
+            rows = self.row_count()
+            text_bytes = self._truncate(rows)
+            index = len(calls)
+
+            encoded = [(s.get("text") or "").strip().encode("utf-8") for s in segments]
+            lengths = np.array([len(t) for t in encoded], dtype=np.int64)
+            starts = np.array([s.get("start", 0.0) for s in segments], dtype=np.float32)
+            ends = np.array([s.get("end", 0.0) for s in segments], dtype=np.float32)
+            gaps = starts - np.concatenate(([starts[0]], ends[:-1])).astype(np.float32) if len(segments) else starts
+            values = {
+                "call": np.full(len(segments), index, dtype=np.int32),
+                "seg_id": np.array([s.get("id", i) for i, s in enumerate(segments)], dtype=np.int32),
+                "start": starts,
+                "end": ends,
+                "gap_before": np.maximum(gaps, 0),
+                "avg_logprob": np.array([s.get("avg_logprob", 0.0) for s in segments], dtype=np.float32),
+                "compression_ratio": np.array([s.get("compression_ratio", 0.0) for s in segments], dtype=np.float32),
+                "no_speech_prob": np.array([s.get("no_speech_prob", 0.0) for s in segments], dtype=np.float32),
+                "text_offset": text_bytes + np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+                if len(segments) else np.zeros(0, dtype=np.int64),
+                "text_len": lengths.astype(np.int32),
+            }
+            for name, dtype in COLUMNS.items():
+                with open(self._path(f"{name}.bin"), "ab") as f:
+                    f.write(values[name].astype(dtype, copy=False).tobytes())
+            with open(self._path("text.bin"), "ab") as f:
+                f.write(b"".join(encoded))
+
+            call = {
+                "index": index,
+                "digest": digest,
+                "model": model,
+                "source": source,
+                "language": language,
+                "duration_s": round(duration_s, 2) if duration_s is not None else None,
+                "row_offset": rows,
+                "rows": len(segments),
+                "added": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            # Commit point
+            with open(self._path("calls.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(call, ensure_ascii=False) + "\n")
+            return index
+
+    def _truncate(self, rows):
+        # Drop rows/text left over from an append that never committed;
+        # returns the committed size of text.bin
+        text_bytes = 0
+        for name, dtype in COLUMNS.items():
+            path = self._path(f"{name}.bin")
+            committed = rows * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > committed:
+                os.truncate(path, committed)
+        if rows:
+            # Read the last row directly; a live memmap would block truncation on Windows
+            offset = np.fromfile(self._path("text_offset.bin"), dtype=COLUMNS["text_offset"], count=1,
+                                 offset=(rows - 1) * np.dtype(COLUMNS["text_offset"]).itemsize)
+            length = np.fromfile(self._path("text_len.bin"), dtype=COLUMNS["text_len"], count=1,
+                                 offset=(rows - 1) * np.dtype(COLUMNS["text_len"]).itemsize)
+            text_bytes = int(offset[0]) + int(length[0])
+        path = self._path("text.bin")
+        if os.path.exists(path) and os.path.getsize(path) > text_bytes:
+            os.truncate(path, text_bytes)
+        return text_bytes
+
+    def column(self, name, rows=None):
+        """
+        Memory-mapped view of one column (committed rows only).
+        """
+        rows = self.row_count() if rows is None else rows
+        if rows == 0:
+            return np.zeros(0, dtype=COLUMNS[name])
+        return np.memmap(self._path(f"{name}.bin"), dtype=COLUMNS[name], mode="r", shape=(rows,))
+
+    def texts(self, rows):
+        """
+        Segment texts for the given row indices.
+        """
+        offsets = self.column("text_offset")
+        lengths = self.column("text_len")
+        result = []
+        with open(self._path("text.bin"), "rb") as f:
+            for row in rows:
+                f.seek(int(offsets[row]))
+                result.append(f.read(int(lengths[row])).decode("utf-8", errors="replace"))
+        return result
+
+    def rows_to_dicts(self, rows):
+        calls = self.calls()
+        call_col = self.column("call")
+        start = self.column("start")
+        end = self.column("end")
+        gap = self.column("gap_before")
+        texts = self.texts(rows)
+        return [
+            {
+                "source": calls[int(call_col[row])]["source"] or calls[int(call_col[row])]["digest"][:12],
+                "start": round(float(start[row]), 2),
+                "end": round(float(end[row]), 2),
+                "gap_before": round(float(gap[row]), 2),
+                "text": text,
+            }
+            for row, text in zip(rows, texts)
+        ]
+
+    def long_pauses(self, min_gap_s=3.0, limit=None):
+        """
+        Segments that follow a silence longer than min_gap_s, across all calls.
+        """
+        rows = np.flatnonzero(self.column("gap_before") > min_gap_s)
+        if limit is not None:
+            rows = rows[:limit]
+        return self.rows_to_dicts(rows)
+
+    def stats(self):
+        rows = self.row_count()
+        size = sum(
+            os.path.getsize(self._path(f"{name}.bin"))
+            for name in list(COLUMNS) + ["text"]
+            if os.path.exists(self._path(f"{name}.bin"))
+        )
+        return {"calls": len(self.calls()), "segments": rows, "bytes": size}
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = CallStore(os.getenv("CALL_ANALYZER_CALL_STORE_DIR") or default_root())
+    return _store
+
+
+def record(digest, model, transcript, source=None, duration_s=None):
+    """
+    Appends a transcription result to the shared store (once per call + model).
+    Never raises: the store is a by-product of transcription.
+    """
+    if not ENABLED:
+        return
+    try:
+        store = get_store()
+        if store.has(digest, model):
+            return
+        segments = transcript.get("segments") or []
+        if duration_s is None and segments:
+            duration_s = segments[-1].get("end")
+        store.append(digest, segments, model=model, source=source,
+                     language=transcript.get("language"), duration_s=duration_s)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not add segments to the call store: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the columnar segment store")
+    parser.add_argument("--root", default=None, help="Store directory. Default: CALL_ANALYZER_CALL_STORE_DIR or the cache dir")
+    sub = parser.add_subparsers(dest="command", required=True)
+    pauses = sub.add_parser("pauses", help="Segments that follow a long silence")
+    pauses.add_argument("--min-gap", type=float, default=3.0, help="Seconds of silence. Default: 3")
+    pauses.add_argument("--limit", type=int, default=50)
+    sub.add_parser("stats", help="Calls, segments and size on disk")
+    args = parser.parse_args(argv)
+
+    store = CallStore(args.root) if args.root else get_store()
+    if args.command == "stats":
+        print(json.dumps(store.stats(), indent=2))
+        return 0
+
+    started = time.perf_counter()
+    hits = store.long_pauses(args.min_gap, limit=args.limit)
+    elapsed = time.perf_counter() - started
+    for hit in hits:
+        print(f"{hit['source']} @ {hit['start']:.1f}s (after {hit['gap_before']:.1f}s silence): {hit['text']}")
+    print(f"\n🔎 {len(hits)} segment(s) shown, scanned {store.row_count()} segments in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+import analysis
+import token_budget
+import transcription
+
+# Model comparison runner (what model_comparison_insights.md was built from).
+# Transcribes each call once, sends the transcript to every model at the same
+# time and records per model: time to first token, total latency, completion
+# tokens, tokens/s and report length. Writes one report per model
+# (<call>_report_<alias>.txt, same names as the reports in the repo root),
+# a side-by-side markdown table per section and a JSON summary.
+#
+#   python compare_models.py ramandeep.wav --models llama3,mistral,zephyr
+#
+# Wall time is roughly the slowest model, not the sum of all of them.
+
+MODEL_ALIASES = {
+    "llama3": "meta-llama/Meta-Llama-3-8B-Instruct",
+    "mistral": "mistralai/Mistral-7B-Instruct-v0.2",
+    "zephyr": "HuggingFaceH4/zephyr-7b-beta",
+}
+DEFAULT_MODELS = "llama3,mistral"
+
+def resolve_models(spec):
+    """
+    "llama3,some/model" -> [(alias, model_id)]
+    """
+    models = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if item in MODEL_ALIASES:
+            models.append((item, MODEL_ALIASES[item]))
+        else:
+            alias = re.sub(r"[^A-Za-z0-9]+", "-", item.split("/")[-1]).strip("-").lower()
+            models.append((alias, item))
+    return models
+
+
+def run_model(transcript, token, alias, model_id, language, fresh):
+    """
+    Streams one model's report and returns its timing record.
+    """
+    record = {
+        "alias": alias,
+        "model": model_id,
+        "ok": False,
+        "error": None,
+        "cached": False,
+        "restarts": 0,
+        "ttft_s": None,
+        "total_s": None,
+        "completion_tokens": 0,
+        "tokens_per_s": None,
+        "report_chars": 0,
+        "report": "",
+    }
+    if not fresh and analysis.cached(transcript, language, model_id=model_id) is not None:
+        record["cached"] = True  # timings below are then just the cache read
+
+    started = time.perf_counter()
+    parts = []
+    try:
+        for chunk in analysis.stream_analyze(transcript, token, language, model_id=model_id, fresh=fresh):
+            if chunk is analysis.RESTART:
+                # Generation guard stopped a loop/echo and asked again
+                record["restarts"] += 1
+                parts = []
+                continue
+            if record["ttft_s"] is None:
+                record["ttft_s"] = round(time.perf_counter() - started, 3)
+            parts.append(chunk)
+        record["ok"] = True
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["total_s"] = round(time.perf_counter() - started, 3)
+
+    report = "".join(parts)
+    record["report"] = report
+    record["report_chars"] = len(report)
+    record["completion_tokens"] = token_budget.count_tokens(report, model_id)
+    generation_s = record["total_s"] - (record["ttft_s"] or 0)
+    if record["completion_tokens"] and generation_s > 0 and not record["cached"]:
+        record["tokens_per_s"] = round(record["completion_tokens"] / generation_s, 1)
+    return record
+
+
+def _cell(text):
+    return text.replace("|", "\\|").replace("\n", "<br>") or "—"
+
+
+def side_by_side(call_name, records, transcribe_s, wall_s):
+    """
+    Markdown: a metrics table, then one row per report section with every
+    model's text next to each other.
+    """
+    lines = [f"# Model comparison: `{call_name}`", ""]
+    lines.append(f"Transcription: {transcribe_s:.1f}s (shared) | analysis wall time: {wall_s:.1f}s "
+                 f"(sum of model times: {sum(r['total_s'] or 0 for r in records):.1f}s)")
+    lines.append("")
+    lines.append("| Model | Status | First token (s) | Total (s) | Tokens | Tokens/s | Chars | Guard restarts |")
+    lines.append("| :--- | :--- | ---: | ---: | ---: | ---: | ---: | ---: |")
+    for r in records:
+        status = "✅" if r["ok"] else f"❌ {_cell(r['error'] or '')}"
+        if r["cached"]:
+            status += " (cached)"
+        lines.append(f"| **{r['alias']}** (`{r['model']}`) | {status} | {r['ttft_s'] if r['ttft_s'] is not None else '—'} | "
+                     f"{r['total_s']} | {r['completion_tokens']} | {r['tokens_per_s'] or '—'} | {r['report_chars']} | {r['restarts']} |")
+
+    sections = [analysis.split_sections(r["report"]) for r in records]
+    numbers = sorted({n for s in sections for n in s})
+    lines.extend(["", "## Side by side", ""])
+    lines.append("| Section | " + " | ".join(f"**{r['alias']}**" for r in records) + " |")
+    lines.append("| :--- |" + " :--- |" * len(records))
+    for number in numbers:
+        label = "Preamble" if number == 0 else str(number)
+        lines.append(f"| {label} | " + " | ".join(_cell(s.get(number, "")) for s in sections) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def compare_call(audio_path, models, token, language=None, output_dir=None, fresh=False):
+    """
+    One transcription, every model in parallel. Returns the summary dict.
+    """
+    stem = os.path.splitext(os.path.basename(audio_path))[0]
+    output_dir = output_dir or os.path.dirname(os.path.abspath(audio_path))
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"🎧 Transcribing '{audio_path}' once for {len(models)} model(s)...")
+    started = time.perf_counter()
+    result = transcription.transcribe(audio_path)
+    transcribe_s = time.perf_counter() - started
+    transcript = result["text"]
+    print(f"📝 Transcript ready ({len(transcript)} chars{', cached' if result['cached'] else ''}) "
+          f"in {transcribe_s:.1f}s")
+
+    print(f"🧠 Analyzing with {', '.join(alias for alias, _ in models)} concurrently...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(models)) as pool:
+        futures = [
+            pool.submit(run_model, transcript, token, alias, model_id, language, fresh)
+            for alias, model_id in models
+        ]
+        records = [f.result() for f in futures]
+    wall_s = time.perf_counter() - started
+
+    for r in records:
+        if r["ok"]:
+            r["output"] = os.path.join(output_dir, f"{stem}_report_{r['alias']}.txt")
+            with open(r["output"], "w", encoding="utf-8") as f:
+                f.write(r["report"])
+            rate = f"{r['tokens_per_s']} tok/s" if r["tokens_per_s"] else "cached"
+            print(f"  ✅ {r['alias']:<10} {r['total_s']:6.1f}s | first token {r['ttft_s']}s | "
+                  f"{r['completion_tokens']} tokens ({rate}) -> {r['output']}")
+        else:
+            print(f"  ❌ {r['alias']:<10} {r['error']}")
+
+    markdown_path = os.path.join(output_dir, f"{stem}_comparison.md")
+    with open(markdown_path, "w", encoding="utf-8") as f:
+        f.write(side_by_side(os.path.basename(audio_path), records, transcribe_s, wall_s))
+
+    summary = {
+        "call": os.path.basename(audio_path),
+        "language": language,
+        "transcript_chars": len(transcript),
+        "transcribe_s": round(transcribe_s, 3),
+        "analysis_wall_s": round(wall_s, 3),
+        "sum_model_s": round(sum(r["total_s"] or 0 for r in records), 3),
+        "models": [{k: v for k, v in r.items() if k != "report"} for r in records],
+    }
+    json_path = os.path.join(output_dir, f"{stem}_comparison.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    print(f"⏱️ Analysis wall time {wall_s:.1f}s vs. {summary['sum_model_s']:.1f}s one model at a time")
+    print(f"✅ Side-by-side report: '{markdown_path}' | summary: '{json_path}'")
+    return summary
+
+
+def main(argv=None):
+    import analyze_call
+
+    parser = argparse.ArgumentParser(description="Compare analysis models on the same call(s)")
+    parser.add_argument("inputs", nargs="+", help="Audio files, directories or glob patterns")
+    parser.add_argument("--models", default=DEFAULT_MODELS,
+                        help=f"Comma-separated model ids or aliases ({', '.join(MODEL_ALIASES)}). "
+                             f"Default: {DEFAULT_MODELS}")
+    parser.add_argument("--language", choices=sorted(analysis.LANGUAGE_INSTRUCTIONS), default=None,
+                        help="Report language rule. Default: none (the CLI prompt)")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Where to write reports. Default: next to each audio file")
+    parser.add_argument("--fresh", action="store_true", help="Skip cached reports and regenerate every model")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    token = os.getenv("HUGGINGFACE_API_KEY")
+    models = resolve_models(args.models)
+    if not models:
+        print("❌ No models given.")
+        return 1
+
+    files, missing = analyze_call.collect_audio_files(args.inputs)
+    for item in missing:
+        print(f"❌ Error: No audio files found at {item}")
+    if not files:
+        return 1
+
+    failed = 0
+    for path in files:
+        try:
+            summary = compare_call(path, models, token, args.language, args.output_dir, args.fresh)
+            failed += sum(1 for m in summary["models"] if not m["ok"])
+        except Exception as e:
+            print(f"❌ {path}: {type(e).__name__}: {e}")
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
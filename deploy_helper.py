@@ -1,49 +1,269 @@
 
+import argparse
+import hashlib
+import json
 import os
-from huggingface_hub import HfApi, create_repo
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+from huggingface_hub import CommitOperationAdd, HfApi
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def deploy():
+# Deploys are delta-aware: local files are hashed the way git does (blob sha1,
+# or sha256 for LFS files) and compared with the Space's current tree, and only
+# the files that changed go up, together, in a single commit. A failed deploy
+# leaves the Space on its previous version instead of half-updated.
+#
+#   python deploy_helper.py                     # deploy to the Hub
+#   python deploy_helper.py --dry-run           # only show what would be sent
+#   python deploy_helper.py --local hub_copy/   # deploy to a local stand-in (LocalHub)
+
+
+def git_blob_sha1(path):
+    """
+    The git object id of a file (what the Hub reports as blob_id).
+    """
+    digest = hashlib.sha1(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def remote_tree(api, repo_id):
+    """
+    {path: {"blob_id", "sha256", "size"}} for every file in the Space (sha256
+    only for LFS files).
+    """
+    tree = {}
+    for item in api.list_repo_tree(repo_id, recursive=True, repo_type="space"):
+        if not hasattr(item, "blob_id"):
+            continue  # folder
+        lfs = getattr(item, "lfs", None)
+        tree[item.path] = {"blob_id": item.blob_id, "sha256": lfs.sha256 if lfs else None, "size": item.size}
+    return tree
+
+
+def is_unchanged(path, remote):
+    if remote is None or remote["size"] != os.path.getsize(path):
+        return False
+    if remote["sha256"]:
+        return file_sha256(path) == remote["sha256"]
+    return git_blob_sha1(path) == remote["blob_id"]
+
+
+def plan_upload(files, remote):
+    """
+    Splits the local files into (changed, unchanged) against the remote tree.
+    """
+    changed, unchanged = [], []
+    for path in files:
+        (unchanged if is_unchanged(path, remote.get(path)) else changed).append(path)
+    return changed, unchanged
+
+
+def push(api, repo_id, files, dry_run=False):
+    """
+    Uploads the files that differ from the Space in one commit and returns
+    a summary: uploaded/skipped files and bytes, seconds taken and the
+    (estimated) seconds saved by not re-sending unchanged files.
+    """
+    started = time.perf_counter()
+    if dry_run and not api.repo_exists(repo_id, repo_type="space"):
+        parent, remote = None, {}  # a real deploy would create it and send everything
+    else:
+        parent = api.repo_info(repo_id, repo_type="space").sha
+        remote = remote_tree(api, repo_id)
+    changed, unchanged = plan_upload(files, remote)
+    summary = {
+        "uploaded": changed,
+        "skipped": unchanged,
+        "uploaded_bytes": sum(os.path.getsize(path) for path in changed),
+        "skipped_bytes": sum(os.path.getsize(path) for path in unchanged),
+        "commit": None,
+    }
+    diff_s = time.perf_counter() - started
+    if changed and not dry_run:
+        operations = [CommitOperationAdd(path_in_repo=path, path_or_fileobj=path) for path in changed]
+        # parent_commit: fail instead of overwriting a deploy that landed meanwhile
+        info = api.create_commit(
+            repo_id=repo_id,
+            repo_type="space",
+            operations=operations,
+            commit_message=f"Deploy {len(changed)} changed file(s)",
+            parent_commit=parent,
+        )
+        summary["commit"] = getattr(info, "oid", None)
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 2)
+    upload_s = elapsed - diff_s
+    # At this deploy's own upload rate; unknown if nothing was sent
+    rate = summary["uploaded_bytes"] / upload_s if changed and not dry_run and upload_s > 0 else None
+    summary["saved_seconds"] = round(summary["skipped_bytes"] / rate, 2) if rate else None
+    return summary
+
+
+def print_summary(summary, dry_run=False):
+    verb = "Would upload" if dry_run else "Uploaded"
+    for path in summary["uploaded"]:
+        print(f"  - {verb} {path}")
+    saved = f", ~{summary['saved_seconds']}s" if summary["saved_seconds"] is not None else ""
+    print(f"📦 {verb} {len(summary['uploaded'])} file(s), {summary['uploaded_bytes'] / 1024:.1f} KB "
+          f"in {summary['seconds']}s; skipped {len(summary['skipped'])} unchanged "
+          f"({summary['skipped_bytes'] / 1024:.1f} KB{saved} saved)")
+
+
+class LocalHub:
+    """
+    Stand-in for HfApi backed by a directory (<root>/<repo_id>/), with the
+    calls deploy() makes: whoami, create_repo, repo_exists, repo_info,
+    list_repo_tree, create_commit (all-or-nothing, honours parent_commit) and add_space_secret.
+    """
+
+    def __init__(self, root, user="local"):
+        self.root = root
+        self.user = user
+
+    def _repo(self, repo_id):
+        return os.path.join(self.root, repo_id)
+
+    def _log(self, repo_id):
+        return os.path.join(self._repo(repo_id), ".commits.jsonl")
+
+    def whoami(self):
+        return {"name": self.user}
+
+    def create_repo(self, repo_id, exist_ok=False, **kwargs):
+        if os.path.isdir(self._repo(repo_id)) and not exist_ok:
+            raise FileExistsError(repo_id)
+        os.makedirs(self._repo(repo_id), exist_ok=True)
+        return f"file://{os.path.abspath(self._repo(repo_id))}"
+
+    def repo_exists(self, repo_id, **kwargs):
+        return os.path.isdir(self._repo(repo_id))
+
+    def repo_info(self, repo_id, **kwargs):
+        sha = None
+        if os.path.exists(self._log(repo_id)):
+            with open(self._log(repo_id)) as f:
+                for line in f:
+                    sha = json.loads(line)["oid"]
+        return SimpleNamespace(id=repo_id, sha=sha)
+
+    def list_repo_tree(self, repo_id, recursive=False, **kwargs):
+        base = self._repo(repo_id)
+        for folder, dirs, names in os.walk(base):
+            for name in names:
+                path = os.path.join(folder, name)
+                rel = os.path.relpath(path, base).replace(os.sep, "/")
+                if rel == ".commits.jsonl" or rel == "secrets.json":
+                    continue
+                yield SimpleNamespace(path=rel, blob_id=git_blob_sha1(path), size=os.path.getsize(path), lfs=None)
+
+    def create_commit(self, repo_id, operations, commit_message, parent_commit=None, **kwargs):
+        head = self.repo_info(repo_id).sha
+        if parent_commit is not None and parent_commit != head:
+            raise RuntimeError(f"{repo_id} moved from {parent_commit} to {head}")
+        base = self._repo(repo_id)
+        # Copy everything first, then move into place, so a failed copy changes nothing
+        staging = tempfile.mkdtemp(dir=base, prefix=".staging-")
+        try:
+            staged = []
+            for op in operations:
+                target = os.path.join(staging, str(len(staged)))
+                shutil.copyfile(op.path_or_fileobj, target)
+                staged.append((target, os.path.join(base, op.path_in_repo)))
+            for source, destination in staged:
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                os.replace(source, destination)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        oid = hashlib.sha1(f"{head}{commit_message}{time.time()}".encode()).hexdigest()
+        with open(self._log(repo_id), "a") as f:
+            f.write(json.dumps({"oid": oid, "message": commit_message,
+                                "files": [op.path_in_repo for op in operations]}) + "\n")
+        return SimpleNamespace(oid=oid)
+
+    def add_space_secret(self, repo_id, key, value, **kwargs):
+        path = os.path.join(self._repo(repo_id), "secrets.json")
+        secrets = json.load(open(path)) if os.path.exists(path) else {}
+        secrets[key] = value
+        with open(path, "w") as f:
+            json.dump(secrets, f)
+
+
+def deploy(api=None, dry_run=False, repo_name="ai-call-analyzer-gradio"):
     print("🚀 Deploying to Hugging Face Spaces...")
     
     # 1. Get Token
     token = os.getenv("HUGGINGFACE_API_KEY")
-    if not token:
+    if not token and api is None:
         print("❌ Error: HUGGINGFACE_API_KEY not found in environment.")
         print("Please set it in your .env file or environment variables.")
         return
 
-    api = HfApi(token=token)
+    api = api or HfApi(token=token)
     
     # 2. Define Space Name
     # Extract user name from token usually, but here we ask or generate
     user = api.whoami()["name"]
-    repo_name = "ai-call-analyzer-gradio"
     repo_id = f"{user}/{repo_name}"
     
     print(f"Target Space: {repo_id}")
     
-    # 3. Create Repo (if not exists)
-    try:
-        url = create_repo(
-            repo_id=repo_id,
-            token=token,
-            repo_type="space",
-            space_sdk="gradio",
-            exist_ok=True,
-            private=False 
-        )
-        print(f"✅ Repo exists/created at: {url}")
-    except Exception as e:
-        print(f"❌ Error creating repo: {e}")
-        return
+    # 3. Create Repo (if not exists); a dry run only looks, it never creates
+    if dry_run:
+        if api.repo_exists(repo_id, repo_type="space"):
+            print("✅ Repo exists")
+        else:
+            print("ℹ️ Repo does not exist yet; a real deploy would create it")
+    else:
+        try:
+            url = api.create_repo(
+                repo_id=repo_id,
+                repo_type="space",
+                space_sdk="gradio",
+                exist_ok=True,
+                private=False
+            )
+            print(f"✅ Repo exists/created at: {url}")
+        except Exception as e:
+            print(f"❌ Error creating repo: {e}")
+            return
 
     # 4. Upload Files
     # We upload only necessary files
     files_to_upload = [
         "app_gradio.py",
+        "startup.py",
+        "whisper_registry.py",
+        "metrics.py",
+        "disk_cache.py",
+        "audio_ingest.py",
+        "transcription.py",
+        "call_store.py",
+        "search_index.py",
+        "vad_transcription.py",
+        "analysis.py",
+        "report_sections.py",
+        "analysis_backends.py",
+        "generation_guard.py",
+        "jobs.py",
+        "inference_client.py",
+        "token_budget.py",
+        "long_call.py",
         "requirements.txt",
         "packages.txt",
         "README.md",
@@ -52,26 +272,23 @@ def deploy():
                # Better approach: Set secret programmatically.
     ]
     
-    print("📤 Uploading files...")
+    print("📤 Comparing with the Space and uploading changed files...")
+    # .env is never uploaded: the token is set as a Space secret below
+    files = [file for file in files_to_upload if file != ".env" and os.path.exists(file)]
     try:
-        for file in files_to_upload:
-            if file == ".env":
-                continue # Skip .env file upload for security
-                
-            if os.path.exists(file):
-                print(f"  - Uploading {file}...")
-                api.upload_file(
-                    path_or_fileobj=file,
-                    path_in_repo=file,
-                    repo_id=repo_id,
-                    repo_type="space"
-                )
+        summary = push(api, repo_id, files, dry_run=dry_run)
     except Exception as e:
-         print(f"❌ Error uploading files: {e}")
+        print(f"❌ Error uploading files (the Space was left unchanged): {e}")
+        return
+    print_summary(summary, dry_run)
+    if dry_run:
+        return summary
          
     # 5. Set Secret
     print("🔑 Setting Secrets...")
     try:
+        if not token:
+            raise ValueError("HUGGINGFACE_API_KEY is not set")
         api.add_space_secret(
             repo_id=repo_id,
             key="HUGGINGFACE_API_KEY",
@@ -83,6 +300,12 @@ def deploy():
 
     print("\n🎉 Deployment Triggered!")
     print(f"👉 View your app here: https://huggingface.co/spaces/{repo_id}")
+    return summary
 
 if __name__ == "__main__":
-    deploy()
+    parser = argparse.ArgumentParser(description="Deploy the Gradio app to a Hugging Face Space.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the files that would be uploaded")
+    parser.add_argument("--local", metavar="DIR", help="Deploy to a local stand-in for the Hub (for testing)")
+    parser.add_argument("--repo-name", default="ai-call-analyzer-gradio", help="Space name")
+    args = parser.parse_args()
+    deploy(api=LocalHub(args.local) if args.local else None, dry_run=args.dry_run, repo_name=args.repo_name)
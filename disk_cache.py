@@ -0,0 +1,127 @@
+import json
+import os
+import time
+import uuid
+
+# Small JSON-on-disk cache shared by the CLI, the web apps and any number of
+# worker processes.
+# - Writes go to a temp file and are moved into place with os.replace, so a
+#   reader never sees a half-written entry.
+# - A hit bumps the file's mtime; eviction removes the least recently used
+#   entries until the directory is back under max_bytes.
+# - Concurrent evictions are harmless: a file deleted by someone else is skipped.
+# - Entries older than ttl_seconds (if set) are treated as misses and removed.
+
+
+def default_cache_root():
+    return os.getenv("CALL_ANALYZER_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "call-analyzer"
+    )
+
+
+class DiskCache:
+    """
+    Content-addressed JSON cache with size-bounded LRU eviction and optional TTL.
+    Subclasses can store other payloads by overriding suffix, get and put.
+    """
+
+    suffix = ".json"
+
+    def __init__(self, directory, max_bytes, ttl_seconds=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        # Shard by prefix so a large cache doesn't put 100k files in one folder
+        return os.path.join(self.directory, key[:2], f"{key}{self.suffix}")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                envelope = json.load(f)
+            created = envelope["created"]
+            value = envelope["value"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            # Corrupt or unreadable entry: drop it and treat as a miss
+            self._remove(path)
+            return None
+
+        if self.ttl_seconds is not None and time.time() - created > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "value": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        finally:
+            self._remove(tmp_path)
+        self.evict()
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def _entries(self):
+        entries = []
+        now = time.time()
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if ".tmp-" in name:
+                    # Leftover from a crashed writer
+                    if now - st.st_mtime > 3600:
+                        self._remove(path)
+                    continue
+                if name.endswith(self.suffix):
+                    entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Windows may refuse while another process has it open; retry next time
+            pass
@@ -0,0 +1,129 @@
+import os
+import re
+
+# Streaming guard for the analysis step.
+# Watches the report as it is generated and trips on:
+#   - "loop":  a long stretch of output that only repeats what was already
+#              written (Mistral's "She seems mentally filtering noise, as she
+#              asks..." spiral). A quote used a few times is not a loop.
+#   - "echo":  a long verbatim run copied from the transcript (rule 2 of the prompt)
+#   - "role":  chat-template / role tokens leaking into the text ([/USER], <|im_end|>)
+# The caller stops the stream as soon as feed() returns a reason and retries
+# once with adjusted sampling (see analysis.py).
+
+ENABLED = os.getenv("CALL_ANALYZER_GUARD", "1") != "0"
+
+LOOP_NGRAM = 6          # words per n-gram
+LOOP_MIN_WORDS = 40     # consecutive already-written words that count as a loop
+ECHO_NGRAM = 8
+ECHO_MIN_WORDS = 40     # verbatim transcript run that counts as echoing it
+MIN_ECHO_TRANSCRIPT_WORDS = 60  # shorter transcripts can't be echoed meaningfully
+
+ROLE_TOKEN_RE = re.compile(
+    r"\[/?(?:USER|INST|ASSISTANT|SYS)\]"
+    r"|<\|(?:im_start|im_end|eot_id|start_header_id|end_header_id|user|assistant|system|endoftext)\|>"
+    r"|</?s>"
+    r"|<<SYS>>",
+    re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"\S+")
+
+# Sampling for the retry: a bit more randomness and a penalty on repeats
+RETRY_TEMPERATURE_STEP = 0.2
+RETRY_FREQUENCY_PENALTY = 0.6
+
+REASONS = {
+    "loop": "repetition loop",
+    "echo": "transcript echo",
+    "role": "stray role tokens",
+}
+
+
+def _normalize(word):
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+class GenerationGuard:
+    """
+    Feed the streamed text with feed(delta); it returns a reason ("loop",
+    "echo", "role") once the output goes bad, else None. clean_text() is the
+    output up to where the problem started.
+    """
+
+    def __init__(self, transcript=""):
+        self.text = ""
+        self.reason = None
+        self.cut_index = None
+        self._scanned = 0        # chars of self.text already split into words
+        self._words = []         # (normalized word, start offset)
+        self._written = set()    # every n-gram of the output so far
+        self._loop_run = 0
+        self._echo_run = 0
+        self._echo_ngrams = None
+        words = [_normalize(w) for w in transcript.split()]
+        words = [w for w in words if w]
+        if len(words) >= MIN_ECHO_TRANSCRIPT_WORDS:
+            self._echo_ngrams = {
+                tuple(words[i:i + ECHO_NGRAM]) for i in range(len(words) - ECHO_NGRAM + 1)
+            }
+
+    def feed(self, delta):
+        if self.reason is not None:
+            return self.reason
+        start = max(0, len(self.text) - 32)  # role tokens can straddle chunks
+        self.text += delta
+
+        match = ROLE_TOKEN_RE.search(self.text, start)
+        if match:
+            return self._trip("role", match.start())
+
+        # Only whole words: the last one may still be growing
+        for match in _WORD_RE.finditer(self.text, self._scanned):
+            if match.end() == len(self.text):
+                break
+            self._scanned = match.end()
+            word = _normalize(match.group())
+            if not word:
+                continue
+            self._words.append((word, match.start()))
+            reason = self._check_word()
+            if reason:
+                return reason
+        return None
+
+    def _check_word(self):
+        words = self._words
+        if len(words) >= LOOP_NGRAM:
+            gram = tuple(w for w, _ in words[-LOOP_NGRAM:])
+            self._loop_run = self._loop_run + 1 if gram in self._written else 0
+            self._written.add(gram)
+            if self._loop_run + LOOP_NGRAM - 1 >= LOOP_MIN_WORDS:
+                # Keep the first pass, cut where the repetition began
+                return self._trip("loop", words[-(self._loop_run + LOOP_NGRAM - 1)][1])
+
+        if self._echo_ngrams is not None and len(words) >= ECHO_NGRAM:
+            gram = tuple(w for w, _ in words[-ECHO_NGRAM:])
+            self._echo_run = self._echo_run + 1 if gram in self._echo_ngrams else 0
+            if self._echo_run + ECHO_NGRAM - 1 >= ECHO_MIN_WORDS:
+                return self._trip("echo", words[-(self._echo_run + ECHO_NGRAM - 1)][1])
+        return None
+
+    def _trip(self, reason, cut_index):
+        self.reason = reason
+        self.cut_index = cut_index
+        return reason
+
+    def clean_text(self):
+        if self.cut_index is None:
+            return self.text
+        return self.text[:self.cut_index].rstrip()
+
+
+def retry_sampling(temperature):
+    """
+    Sampling parameters for the single retry after a tripped guard.
+    """
+    return {
+        "temperature": min(1.0, temperature + RETRY_TEMPERATURE_STEP),
+        "frequency_penalty": RETRY_FREQUENCY_PENALTY,
+    }
@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import threading
+import time
+
+import metrics
+
+# Async inference layer shared by every entry point.
+# - One AsyncInferenceClient per (token, base_url), reused across requests
+#   instead of building a new client for every analysis.
+# - A per-model semaphore caps in-flight requests so a burst of clicks can't
+#   flood the provider (and get 429'd).
+# - 429/5xx/timeouts are retried with jittered exponential backoff; a
+#   Retry-After header from the server wins over our own backoff.
+# - Every call has a deadline that covers all of its retries; it starts once
+#   the call has a slot, so queueing behind the per-model limit is free.
+# Sync callers (Gradio/Streamlit handlers, worker processes) go through a
+# background event loop thread, so one slow response never blocks others.
+
+INFERENCE_URL = os.getenv("CALL_ANALYZER_INFERENCE_URL")  # e.g. http://127.0.0.1:8008 for stub_server.py
+MAX_IN_FLIGHT_PER_MODEL = int(os.getenv("CALL_ANALYZER_MAX_IN_FLIGHT", "4"))
+REQUEST_TIMEOUT_S = float(os.getenv("CALL_ANALYZER_REQUEST_TIMEOUT", "120"))
+DEADLINE_S = float(os.getenv("CALL_ANALYZER_DEADLINE", "300"))
+MAX_RETRIES = int(os.getenv("CALL_ANALYZER_MAX_RETRIES", "4"))
+BACKOFF_BASE_S = 1.0
+BACKOFF_CAP_S = 30.0
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class InferenceDeadlineExceeded(TimeoutError):
+    pass
+
+
+class _State:
+    # Everything tied to the event loop. Rebuilt after fork, since a child
+    # process inherits the globals but not the loop thread.
+    def __init__(self):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self.clients = {}
+        self.semaphores = {}
+        self.counters = {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0}
+        self.thread = threading.Thread(target=self.loop.run_forever, name="inference-loop", daemon=True)
+        self.thread.start()
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def _get_state():
+    global _state
+    with _state_lock:
+        if _state is None or _state.pid != os.getpid():
+            _state = _State()
+        return _state
+
+
+def get_client(token, base_url=None):
+    state = _get_state()
+    base_url = base_url or INFERENCE_URL
+    key = (token, base_url)
+    client = state.clients.get(key)
+    if client is None:
+        # Imported on first use: huggingface_hub alone takes ~0.5s to import
+        from huggingface_hub import AsyncInferenceClient
+
+        if base_url:
+            client = AsyncInferenceClient(token=token, base_url=base_url, timeout=REQUEST_TIMEOUT_S)
+        else:
+            client = AsyncInferenceClient(token=token, timeout=REQUEST_TIMEOUT_S)
+        state.clients[key] = client
+    return client
+
+
+def _semaphore(model):
+    state = _get_state()
+    sem = state.semaphores.get(model)
+    if sem is None:
+        sem = state.semaphores[model] = asyncio.Semaphore(MAX_IN_FLIGHT_PER_MODEL)
+    return sem
+
+
+def _status_and_headers(error):
+    # huggingface_hub raises HfHubHTTPError (requests-style .response) or
+    # aiohttp.ClientResponseError (.status/.headers) depending on the version
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(response, "status", None) or getattr(error, "status", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    return status, headers
+
+
+def _retry_after(headers):
+    for name in ("Retry-After", "retry-after", "X-RateLimit-Reset-After", "RateLimit-Reset"):
+        value = headers.get(name) if hasattr(headers, "get") else None
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            continue
+    return None
+
+
+def _is_retryable(error):
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in ("ClientConnectionError", "ClientConnectorError", "ServerDisconnectedError", "ClientPayloadError"):
+        return True
+    status, _ = _status_and_headers(error)
+    return status in RETRYABLE_STATUS
+
+
+def _backoff(attempt, error):
+    # Full jitter, but never sooner than the server asked us to wait
+    delay = random.uniform(0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** attempt))
+    _, headers = _status_and_headers(error)
+    retry_after = _retry_after(headers)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+async def _with_retries(make_call, deadline, retry_log):
+    state = _get_state()
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise InferenceDeadlineExceeded("Inference deadline exceeded before the request could complete.")
+        try:
+            return await asyncio.wait_for(make_call(), timeout=min(REQUEST_TIMEOUT_S, remaining))
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not _is_retryable(e):
+                state.counters["failures"] += 1
+                raise
+            delay = _backoff(attempt, e)
+            if time.monotonic() + delay >= deadline:
+                state.counters["failures"] += 1
+                raise
+            attempt += 1
+            state.counters["retries"] += 1
+            metrics.inc("call_analyzer_llm_retries_total")
+            retry_log.append({"attempt": attempt, "error": f"{type(e).__name__}: {e}", "delay_s": round(delay, 2)})
+            await asyncio.sleep(delay)
+
+
+async def achat_completion(token, model, messages, deadline_s=DEADLINE_S, retry_log=None, **kwargs):
+    """
+    Non-streaming chat completion with pooling, concurrency limit, retries and a deadline.
+    Returns the huggingface_hub ChatCompletionOutput.
+    """
+    state = _get_state()
+    client = get_client(token)
+    retry_log = retry_log if retry_log is not None else []
+
+    async with _semaphore(model):
+        # The deadline covers the request, not the wait for a free slot
+        deadline = time.monotonic() + deadline_s
+        state.counters["requests"] += 1
+        state.counters["in_flight"] += 1
+        try:
+            return await _with_retries(
+                lambda: client.chat_completion(model=model, messages=messages, **kwargs),
+                deadline,
+                retry_log,
+            )
+        finally:
+            state.counters["in_flight"] -= 1
+
+
+async def astream_chat_completion(token, model, messages, deadline_s=DEADLINE_S, retry_log=None, **kwargs):
+    """
+    Streaming chat completion yielding text deltas. Retries only happen before
+    the first token; once text has been yielded a failure is raised to the caller.
+    """
+    state = _get_state()
+    client = get_client(token)
+    retry_log = retry_log if retry_log is not None else []
+
+    async def open_stream():
+        stream = await client.chat_completion(model=model, messages=messages, stream=True, **kwargs)
+        iterator = stream.__aiter__()
+        # Pull the first chunk inside the retry window so a 429 surfaces here
+        try:
+            first = await iterator.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            await _close(iterator)
+            raise
+        return iterator, first
+
+    iterator = None
+    async with _semaphore(model):
+        deadline = time.monotonic() + deadline_s  # started once a slot is free
+        state.counters["requests"] += 1
+        state.counters["in_flight"] += 1
+        try:
+            iterator, chunk = await _with_retries(open_stream, deadline, retry_log)
+            while chunk is not None:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise InferenceDeadlineExceeded("Inference deadline exceeded while streaming.")
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=min(REQUEST_TIMEOUT_S, remaining))
+                except StopAsyncIteration:
+                    chunk = None
+        finally:
+            # Closing the stream drops the HTTP response, which stops the
+            # provider when the caller (e.g. the generation guard) quits early
+            if iterator is not None:
+                await _close(iterator)
+            state.counters["in_flight"] -= 1
+
+
+async def _close(iterator):
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is None:
+        return
+    try:
+        await aclose()
+    except Exception:
+        pass  # already broken; nothing left to stop
+
+
+def run(coro, timeout=None):
+    """
+    Runs a coroutine on the shared inference loop from synchronous code.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_state().loop).result(timeout)
+
+
+def chat_completion(token, model, messages, **kwargs):
+    """
+    Synchronous wrapper around achat_completion.
+    """
+    return run(achat_completion(token, model, messages, **kwargs))
+
+
+def stream_chat_completion(token, model, messages, **kwargs):
+    """
+    Synchronous generator wrapper around astream_chat_completion.
+    """
+    loop = _get_state().loop
+    agen = astream_chat_completion(token, model, messages, **kwargs)
+    try:
+        while True:
+            try:
+                delta = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            yield delta
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+
+
+def stats():
+    return dict(_get_state().counters)
+
+
+# --- Offline load test (pair with stub_server.py) ---
+
+async def _load_test(total, concurrency, model, token, max_tokens):
+    messages = [{"role": "user", "content": "Load test request."}]
+    latencies = []
+    errors = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            started = time.perf_counter()
+            try:
+                await achat_completion(token, model, messages, max_tokens=max_tokens)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def main(argv=None):
+    global INFERENCE_URL, MAX_IN_FLIGHT_PER_MODEL
+
+    parser = argparse.ArgumentParser(description="Load-test the inference layer against a local stub server")
+    parser.add_argument("--base-url", default=INFERENCE_URL or "http://127.0.0.1:8008")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--model", default="stub-model")
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT_PER_MODEL,
+                        help="Per-model in-flight cap of the client layer")
+    args = parser.parse_args(argv)
+
+    INFERENCE_URL = args.base_url
+    MAX_IN_FLIGHT_PER_MODEL = args.max_in_flight
+
+    latencies, errors, wall = run(_load_test(args.requests, args.concurrency, args.model, "stub-token", args.max_tokens))
+    print(f"Requests: {args.requests} | OK: {len(latencies)} | Failed: {len(errors)} | Wall: {wall:.2f}s")
+    if latencies:
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"Throughput: {len(latencies) / wall:.2f} req/s | "
+              f"p50 {statistics.median(latencies):.2f}s | p95 {p95:.2f}s")
+    print(f"Client counters: {stats()}")
+    for error in errors[:5]:
+        print(f"  ❌ {error}")
+
+
+if __name__ == "__main__":
+    main()
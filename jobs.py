@@ -0,0 +1,247 @@
+import os
+import hashlib
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import analysis
+import analysis_backends
+import audio_ingest
+import metrics
+import transcription
+
+# Job subsystem for the web app.
+# A click no longer runs Whisper + the LLM inside the request handler:
+#   submit() -> job id -> bounded queue -> fixed pool of worker threads
+# The workers live in the app process, so they share the Whisper registry,
+# the VAD pool and the inference client (Whisper decodes on the shared model
+# take turns, see whisper_registry.LoadedModel; the analysis streams overlap).
+# Identical uploads (same audio content, language, settings, API token and
+# model) that are still queued or running are merged into one job. Handlers
+# stream a job's progress with watch() or poll it by id with get(); every job
+# writes its report into its own directory.
+
+JOB_WORKERS = int(os.getenv("CALL_ANALYZER_JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("CALL_ANALYZER_JOB_QUEUE", "16"))
+JOB_RETENTION_S = float(os.getenv("CALL_ANALYZER_JOB_RETENTION_S", "3600"))  # finished jobs (and files) kept this long
+
+QUEUED = "queued"
+TRANSCRIBING = "transcribing"
+ANALYZING = "analyzing"
+DONE = "done"
+FAILED = "failed"
+FINISHED = (DONE, FAILED)
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    """
+    One analysis request. Workers update it through JobQueue.update();
+    readers should use snapshot() rather than the live attributes.
+    """
+
+    def __init__(self, key, audio_path, language, token, fresh):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.audio_path = audio_path
+        self.language = language
+        self.token = token
+        self.fresh = fresh
+        self.status = QUEUED
+        self.progress = ""
+        self.transcript = ""
+        self.report = ""
+        self.output_path = None
+        self.error = None
+        self.subscribers = 1
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.first_token_s = None
+        self.version = 0
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "transcript": self.transcript,
+            "report": self.report,
+            "output_path": self.output_path,
+            "error": self.error,
+            "subscribers": self.subscribers,
+            "queued_s": (self.started or time.time()) - self.created,
+            "run_s": ((self.finished or time.time()) - self.started) if self.started else 0.0,
+            "first_token_s": self.first_token_s,
+            "version": self.version,
+        }
+
+
+def run_job(jobs, job):
+    """
+    Default worker: transcribe (with partial progress), stream the analysis
+    and write the report to the job's own directory.
+    """
+    jobs.update(job, status=TRANSCRIBING, progress="🎧 Transcribing...")
+
+    def on_progress(update):
+        jobs.update(job, transcript=update["text"],
+                    progress=f"🎧 Transcribing... ({update['done']}/{update['total']} segments)")
+
+    transcript = transcription.transcribe(job.audio_path, model_name="base", on_progress=on_progress)["text"]
+    jobs.update(job, status=ANALYZING, transcript=transcript, progress="🧠 Generating analysis...")
+
+    started = time.perf_counter()
+    report = ""
+    for chunk in analysis.stream_analyze(transcript, job.token, job.language, fresh=job.fresh):
+        if chunk is analysis.RESTART:
+            # The generation guard cut off a looping/echoing report and retries
+            report = ""
+            jobs.update(job, report=report, progress="🔁 Output went off the rails; regenerating...")
+            continue
+        if job.first_token_s is None:
+            job.first_token_s = time.perf_counter() - started
+        report += chunk
+        jobs.update(job, report=report,
+                    progress=f"🧠 Generating analysis... (first token after {job.first_token_s:.1f}s)")
+
+    output_path = os.path.join(jobs.job_dir(job), "analysis_report.txt")
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(report)
+    ttft = f"{job.first_token_s:.1f}s" if job.first_token_s is not None else "n/a"
+    jobs.update(job, output_path=output_path,
+                progress=f"✅ Done in {time.perf_counter() - started:.1f}s (time to first token: {ttft})")
+
+
+class JobQueue:
+    """
+    Bounded queue of jobs served by a fixed pool of worker threads.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, output_root=None,
+                 handler=run_job, retention_s=JOB_RETENTION_S):
+        self.output_root = output_root or tempfile.mkdtemp(prefix="call-analyzer-jobs-")
+        self.handler = handler
+        self.retention_s = retention_s
+        self._queue = queue.Queue(maxsize=max(1, max_queued))
+        self._jobs = {}        # id -> Job
+        self._in_flight = {}   # dedupe key -> Job (queued or running)
+        self._changed = threading.Condition()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def job_dir(self, job):
+        path = os.path.join(self.output_root, job.id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def submit(self, audio_path, language="English", token=None, fresh=False):
+        """
+        Queues an analysis and returns its Job. An identical request that is
+        still queued or running is returned instead of starting a new one.
+        Raises JobQueueFull when the queue is at capacity.
+        """
+        # Same content + the settings that change the report + the same caller
+        # (token hash, so one user's job never runs on or reports to another) = same job
+        backend = analysis_backends.get_backend()
+        token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest() if token else None
+        key = (audio_ingest.source_digest(audio_path), language, bool(fresh), token_hash,
+               backend.name, backend.default_model_id)
+        with self._changed:
+            self._prune()
+            job = self._in_flight.get(key)
+            if job is not None:
+                job.subscribers += 1
+                metrics.inc("call_analyzer_jobs_deduplicated_total")
+                return job
+
+            job = Job(key, audio_path, language, token, fresh)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise JobQueueFull(f"Too many calls waiting ({self._queue.maxsize}). Please try again shortly.")
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            metrics.gauge_add("call_analyzer_jobs_queued", 1)
+            return job
+
+    def get(self, job_id):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def update(self, job, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def watch(self, job_id, timeout=None):
+        """
+        Yields a snapshot of the job every time it changes, ending with the
+        finished state. timeout bounds the total wait.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        seen = -1
+        while True:
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                while job.version == seen:
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        return
+                    self._changed.wait(remaining)
+                snapshot = job.snapshot()
+            seen = snapshot["version"]
+            yield snapshot
+            if snapshot["status"] in FINISHED:
+                return
+
+    def stats(self):
+        with self._changed:
+            by_status = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {"workers": len(self._workers), "queued": self._queue.qsize(), "jobs": by_status}
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            metrics.gauge_add("call_analyzer_jobs_queued", -1)
+            self.update(job, started=time.time())
+            with metrics.span("job", app="gradio", job_id=job.id, language=job.language) as span:
+                try:
+                    self.handler(self, job)
+                    status, error = DONE, None
+                except Exception as e:
+                    status, error = FAILED, f"{type(e).__name__}: {e}"
+                    span.set(error=error)
+                span.set(subscribers=job.subscribers)
+            with self._changed:
+                self._in_flight.pop(job.key, None)
+            self.update(job, status=status, error=error, finished=time.time())
+
+    def _prune(self):
+        # Drop finished jobs (and their report files) past the retention window
+        cutoff = time.time() - self.retention_s
+        for job_id, job in list(self._jobs.items()):
+            if job.status in FINISHED and job.finished < cutoff:
+                del self._jobs[job_id]
+                shutil.rmtree(os.path.join(self.output_root, job_id), ignore_errors=True)
+
+
+metrics.describe("call_analyzer_jobs_queued", "Jobs waiting for a worker")
+metrics.describe("call_analyzer_jobs_deduplicated_total", "Submissions merged into an identical in-flight job")
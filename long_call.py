@@ -0,0 +1,221 @@
+import analysis_backends
+import metrics
+import token_budget
+
+# Map-reduce analysis for calls too long for one prompt.
+#   map:    the transcript is cut into overlapping, token-budgeted windows and
+#           every window is turned into section-by-section notes concurrently
+#           (sequentially on a local backend)
+#   reduce: the notes (not the raw transcript) go into the normal SYSTEM_PROMPT
+#           request, which writes the usual 8-section report
+# If the notes themselves are still too large, they are condensed in groups
+# first (same map step, one level up).
+
+WINDOW_TOKENS = 3000
+OVERLAP_TOKENS = 200
+MAP_MAX_TOKENS = 700
+MAP_TEMPERATURE = 0.2
+MAP_BATCH = 8  # windows in flight at once when streaming a transcript from disk
+
+MAP_SYSTEM_PROMPT = """
+You are preparing notes for a Design Thinking analysis of a long business call
+between a team member (the caller) and a founder.
+You will see ONE PART of the transcript. Do not write a final report.
+
+For this part only, write short evidence notes under these headings:
+1. Founder Context  2. Emotional State  3. Control & Power  4. Trust & Risk
+5. Discomfort & Exit Signals  6. Caller Pressure Response  7. What to Reframe
+
+Rules:
+- Quote or closely paraphrase the moments that support each note.
+- Note where in this part things happen (start / middle / end).
+- Write "nothing notable" for headings with no evidence.
+- Do NOT repeat the transcript and do NOT invent dialogue.
+"""
+
+CONDENSE_SYSTEM_PROMPT = """
+You are merging notes written for consecutive parts of one long business call.
+Combine them into one set of notes under the same 7 headings, in call order.
+Keep the concrete evidence and any shifts over time; drop duplicates.
+"""
+
+
+def split_windows(transcript, model_id, window_tokens=WINDOW_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    """
+    Cuts the transcript into word-aligned windows of about window_tokens,
+    each repeating the last overlap_tokens of the previous one so a moment at
+    a boundary is seen in full by at least one window.
+    """
+    words = transcript.split()
+    if not words:
+        return []
+
+    total_tokens = token_budget.count_tokens(transcript, model_id)
+    tokens_per_word = max(total_tokens / len(words), 0.1)
+    window_words = max(1, int(window_tokens / tokens_per_word))
+    overlap_words = min(int(overlap_tokens / tokens_per_word), window_words // 2)
+    step = max(1, window_words - overlap_words)
+
+    # A window starting within the last overlap_words would only repeat the
+    # end of the previous one
+    return [
+        " ".join(words[start:start + window_words])
+        for start in range(0, max(1, len(words) - overlap_words), step)
+    ]
+
+
+def read_blocks(path, block_chars=64 * 1024):
+    """
+    Yields a transcript file in blocks of about block_chars, cut at line ends.
+    """
+    with open(path, encoding="utf-8") as f:
+        block = []
+        size = 0
+        for line in f:
+            block.append(line)
+            size += len(line)
+            if size >= block_chars:
+                yield "".join(block)
+                block, size = [], 0
+        if block:
+            yield "".join(block)
+
+
+def iter_windows(blocks, model_id, window_tokens=WINDOW_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    """
+    split_windows() over an iterable of text blocks (e.g. a transcript file
+    read a block at a time), holding only about one window of words. The
+    tokens-per-word ratio is measured on the first block.
+    """
+    words = []
+    sent = 0  # leading words already sent as the previous window's overlap
+    window_words = overlap_words = None
+    for block in blocks:
+        if window_words is None and block.split():
+            tokens_per_word = max(token_budget.count_tokens(block, model_id) / len(block.split()), 0.1)
+            window_words = max(1, int(window_tokens / tokens_per_word))
+            overlap_words = min(int(overlap_tokens / tokens_per_word), window_words // 2)
+        words.extend(block.split())
+        while window_words is not None and len(words) > window_words:
+            yield " ".join(words[:window_words])
+            step = max(1, window_words - overlap_words)
+            words = words[step:]
+            sent = window_words - step
+    if len(words) > sent:
+        yield " ".join(words)
+
+
+def _map_messages(window, index, total):
+    user_message = f"""
+--- TRANSCRIPT PART {index} OF {total} BEGINS ---
+{window}
+--- TRANSCRIPT PART {index} OF {total} ENDS ---
+
+Write the notes for part {index} now:
+"""
+    return [
+        {"role": "system", "content": MAP_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message}
+    ]
+
+
+def _condense_messages(notes, first_index):
+    blocks = "\n\n".join(
+        f"### Notes for part {first_index + i}\n{note}" for i, note in enumerate(notes)
+    )
+    return [
+        {"role": "system", "content": CONDENSE_SYSTEM_PROMPT},
+        {"role": "user", "content": blocks}
+    ]
+
+
+def _complete_parts(backend, token, model_id, message_lists, labels):
+    # complete_many() where a failed part degrades to a placeholder note
+    # instead of discarding every other part; fails only if all of them did
+    results = backend.complete_many(token, model_id, message_lists, MAP_MAX_TOKENS, MAP_TEMPERATURE,
+                                    return_exceptions=True)
+    failures = [r for r in results if isinstance(r, BaseException)]
+    if failures and len(failures) == len(results):
+        raise failures[0]
+    notes = []
+    for label, result in zip(labels, results):
+        if isinstance(result, BaseException):
+            print(f"⚠️ Notes for part {label} failed ({type(result).__name__}: {result}); continuing without them.")
+            metrics.inc("call_analyzer_long_call_failed_parts_total")
+            result = f"(notes unavailable for part {label})"
+        notes.append(result)
+    return notes
+
+
+def map_notes(transcript, token, model_id, reduce_budget_tokens, backend=None):
+    """
+    Runs the map step (and condensing rounds if needed) and returns a list of
+    notes whose combined size fits in reduce_budget_tokens.
+    """
+    backend = backend or analysis_backends.get_backend()
+    windows = split_windows(transcript, model_id)
+    total = len(windows)
+    print(f"🧩 Long call: analyzing {total} overlapping windows...")
+    notes = _complete_parts(
+        backend, token, model_id,
+        [_map_messages(w, i, total) for i, w in enumerate(windows, 1)],
+        list(range(1, total + 1)),
+    )
+    return _condense(notes, token, model_id, reduce_budget_tokens, backend)
+
+
+def map_blocks_notes(open_blocks, token, model_id, reduce_budget_tokens, backend=None):
+    """
+    map_notes() for a transcript that is not held in memory: open_blocks()
+    returns a fresh iterator of its text blocks (it is read twice, once to
+    count the windows). Windows are sent MAP_BATCH at a time.
+    """
+    backend = backend or analysis_backends.get_backend()
+    total = sum(1 for _ in iter_windows(open_blocks(), model_id))
+    print(f"🧩 Long call: analyzing {total} overlapping windows (streamed from disk)...")
+    notes = []
+    batch = []
+    for index, window in enumerate(iter_windows(open_blocks(), model_id), 1):
+        batch.append(_map_messages(window, index, total))
+        if len(batch) == MAP_BATCH or index == total:
+            labels = list(range(index - len(batch) + 1, index + 1))
+            notes.extend(_complete_parts(backend, token, model_id, batch, labels))
+            batch = []
+    return _condense(notes, token, model_id, reduce_budget_tokens, backend)
+
+
+def _condense(notes, token, model_id, reduce_budget_tokens, backend):
+    # Condense in groups until the notes fit next to the reduce prompt
+    while len(notes) > 1 and token_budget.count_tokens("\n\n".join(notes), model_id) > reduce_budget_tokens:
+        group_size = max(2, WINDOW_TOKENS // MAP_MAX_TOKENS)
+        groups = [notes[i:i + group_size] for i in range(0, len(notes), group_size)]
+        notes = _complete_parts(
+            backend, token, model_id,
+            [_condense_messages(g, i * group_size + 1) for i, g in enumerate(groups)],
+            [f"{i * group_size + 1}-{i * group_size + len(g)}" for i, g in enumerate(groups)],
+        )
+    return notes
+
+
+def build_reduce_user_message(notes, lang_instruction=""):
+    blocks = "\n\n".join(f"### Notes for part {i}\n{note}" for i, note in enumerate(notes, 1))
+    return f"""
+This call was too long to read in one pass. Below are evidence notes taken from
+consecutive, overlapping parts of the transcript, in call order.
+Your task is to analyze the whole call using the Design Thinking framework provided in the system prompt.
+
+RULES:
+1. Do NOT generate any new dialogue or conversation.
+2. Do NOT repeat the notes.
+3. OUTPUT ONLY the analysis sections (1-8).
+4. Treat the notes as one continuous conversation and track how it shifts over time.
+{lang_instruction}
+--- NOTES BEGIN ---
+{blocks}
+--- NOTES END ---
+
+Analyze the call now:
+"""
+
+
+metrics.describe("call_analyzer_long_call_failed_parts_total", "Long-call map/condense parts that failed and were left out")
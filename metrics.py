@@ -0,0 +1,268 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lightweight tracing + Prometheus metrics for the hot path.
+# - span("transcribe", audio_seconds=...) times a stage, tracks it as in flight,
+#   feeds a latency histogram and logs one structured JSON line per span
+#   (logger "call_analyzer.trace") with trace/parent ids so the stages of one
+#   call can be stitched together.
+# - counters/gauges/histograms are exposed in Prometheus text format, either
+#   over HTTP (start_metrics_server) or dumped to a file periodically.
+# No dependency on prometheus_client; everything is in-process and thread-safe.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+logger = logging.getLogger("call_analyzer.trace")
+
+_lock = threading.Lock()
+_counters = {}     # (name, labels) -> value
+_gauges = {}       # (name, labels) -> value
+_histograms = {}   # (name, labels) -> [bucket counts..., +Inf count, sum]
+_help = {}
+
+_current_span = contextvars.ContextVar("call_analyzer_span", default=None)
+
+_server = None
+_dump_thread = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def inc(name, value=1, **labels):
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def gauge_add(name, value, **labels):
+    with _lock:
+        key = _key(name, labels)
+        _gauges[key] = _gauges.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    with _lock:
+        key = _key(name, labels)
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                hist[i] += 1
+        hist[len(LATENCY_BUCKETS)] += 1
+        hist[-1] += value
+
+
+class Span:
+    """
+    One timed stage. Add attributes while it runs with span.set(key=value).
+    """
+
+    def __init__(self, name, attrs, attach=True):
+        parent = _current_span.get()
+        # attach=False keeps the span out of the context: needed inside
+        # generators that may be resumed from different threads (Gradio)
+        self._attach = attach
+        self.name = name
+        self.attrs = dict(attrs)
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.duration_s = None
+        self.error = None
+        self._token = None
+        self._started = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        if self._attach:
+            self._token = _current_span.set(self)
+        gauge_add("call_analyzer_in_flight", 1, stage=self.name)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_s = time.perf_counter() - self._started
+        if self._token is not None:
+            _current_span.reset(self._token)
+        gauge_add("call_analyzer_in_flight", -1, stage=self.name)
+
+        status = "ok" if exc_type is None else "error"
+        if exc_type is GeneratorExit:
+            status = "cancelled"  # streaming client went away
+        elif exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        observe("call_analyzer_stage_seconds", self.duration_s, stage=self.name)
+        inc("call_analyzer_stage_total", stage=self.name, status=status)
+
+        record = {
+            "span": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_s": round(self.duration_s, 4),
+            "status": status,
+        }
+        record.update(self.attrs)
+        if self.error:
+            record["error"] = self.error
+        logger.info(json.dumps(record, default=str, ensure_ascii=False))
+        return False
+
+
+def span(name, attach=True, **attrs):
+    return Span(name, attrs, attach=attach)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def render_prometheus():
+    """
+    All metrics in Prometheus text exposition format.
+    """
+    def fmt_labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    for kind, series in (("counter", counters), ("gauge", gauges)):
+        for name in sorted({n for n, _ in series}):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (n, labels), value in sorted(series.items()):
+                if n == name:
+                    lines.append(f"{name}{fmt_labels(labels)} {value}")
+
+    for name in sorted({n for n, _ in histograms}):
+        if name in _help:
+            lines.append(f"# HELP {name} {_help[name]}")
+        lines.append(f"# TYPE {name} histogram")
+        for (n, labels), hist in sorted(histograms.items()):
+            if n != name:
+                continue
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                lines.append(f"{name}_bucket{fmt_labels(labels, [('le', bound)])} {hist[i]}")
+            lines.append(f"{name}_bucket{fmt_labels(labels, [('le', '+Inf')])} {hist[len(LATENCY_BUCKETS)]}")
+            lines.append(f"{name}_sum{fmt_labels(labels)} {round(hist[-1], 6)}")
+            lines.append(f"{name}_count{fmt_labels(labels)} {hist[len(LATENCY_BUCKETS)]}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("/metrics", ""):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """
+    Serves /metrics on a background thread (once per process). port defaults
+    to CALL_ANALYZER_METRICS_PORT; returns None if no port is configured.
+    """
+    global _server
+    port = port if port is not None else os.getenv("CALL_ANALYZER_METRICS_PORT")
+    if not port:
+        return None
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"📈 Metrics at http://{host}:{_server.server_address[1]}/metrics")
+    return _server
+
+
+def dump(path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+def start_periodic_dump(path=None, interval_s=60):
+    """
+    Writes the metrics to path every interval_s seconds (for environments
+    where nothing can scrape an HTTP port). path defaults to CALL_ANALYZER_METRICS_FILE.
+    """
+    global _dump_thread
+    path = path or os.getenv("CALL_ANALYZER_METRICS_FILE")
+    if not path or _dump_thread is not None:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval_s)
+            try:
+                dump(path)
+            except OSError:
+                pass
+
+    _dump_thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+    _dump_thread.start()
+    return _dump_thread
+
+
+def configure_logging(level=logging.INFO):
+    """
+    Sends span records to stderr unless logging is already configured.
+    CALL_ANALYZER_TRACE=0 silences them.
+    """
+    if os.getenv("CALL_ANALYZER_TRACE", "1") == "0":
+        logger.setLevel(logging.WARNING)
+        return
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(level)
+
+
+describe("call_analyzer_stage_seconds", "Latency of each pipeline stage")
+describe("call_analyzer_stage_total", "Completed stage runs by status")
+describe("call_analyzer_in_flight", "Stage runs currently executing")
+describe("call_analyzer_llm_tokens_total", "LLM tokens by kind (prompt/completion)")
+describe("call_analyzer_llm_retries_total", "LLM request retries")
+describe("call_analyzer_audio_seconds_total", "Seconds of audio transcribed")
+describe("call_analyzer_llm_ttft_seconds", "Time to first streamed LLM token")
+describe("call_analyzer_llm_prefix_cached_tokens_total", "Prompt tokens served from a cached system-prompt KV prefix")
+describe("call_analyzer_guard_trips_total", "Generations stopped by the guard (loop/echo/role)")
+describe("call_analyzer_guard_saved_tokens_total", "Completion tokens not generated thanks to the guard")
+describe("call_analyzer_guard_saved_seconds_total", "Estimated generation seconds saved by the guard")
+describe("call_analyzer_preflight_total", "Analyses by pre-flight route (local/single/map_reduce)")
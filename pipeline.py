@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+
+# Two-stage pipeline: Whisper (CPU-bound) for call N+1 runs while the LLM
+# request (network-bound) for call N is in flight.
+#
+#   files -> [transcribe workers] -> bounded queue -> [analyze workers] -> records
+#
+# The bounded queue between the stages gives backpressure: if the LLM stage
+# falls behind, transcription pauses instead of piling up transcripts in memory.
+#
+# Transcribe workers are threads sharing one registry model. openai-whisper
+# decodes on it are serialized (whisper_registry.LoadedModel), so more than
+# one transcribe worker only adds throughput with faster-whisper; use batch
+# mode (processes) to decode openai-whisper in parallel.
+
+_DONE = object()
+
+
+def _record(path):
+    return {
+        "path": path,
+        "ok": False,
+        "error": None,
+        "output": None,
+        "transcribe_s": 0.0,
+        "analyze_s": 0.0,
+    }
+
+
+def run_pipeline(paths, transcribe_fn, analyze_fn, transcribe_workers=1, analyze_workers=2,
+                 queue_size=2, on_record=None):
+    """
+    Runs transcribe_fn(path) -> transcript and analyze_fn(path, transcript) -> output
+    as overlapping stages, each with its own thread count.
+    Returns one record per path (in input order); failures are recorded, never raised.
+    on_record(record) is called as each path finishes.
+    """
+    transcribe_workers = max(1, transcribe_workers)
+    analyze_workers = max(1, analyze_workers)
+
+    todo = queue.Queue()
+    transcribed = queue.Queue(maxsize=max(1, queue_size))
+    records = []
+    records_lock = threading.Lock()
+    remaining_transcribers = [transcribe_workers]
+
+    for path in paths:
+        todo.put(path)
+    for _ in range(transcribe_workers):
+        todo.put(_DONE)
+
+    def finish(record):
+        with records_lock:
+            records.append(record)
+        if on_record is not None:
+            on_record(record)
+
+    def transcribe_stage():
+        try:
+            while True:
+                path = todo.get()
+                if path is _DONE:
+                    break
+                record = _record(path)
+                started = time.perf_counter()
+                try:
+                    transcript = transcribe_fn(path)
+                except Exception as e:
+                    record["transcribe_s"] = time.perf_counter() - started
+                    record["error"] = f"{type(e).__name__}: {e}"
+                    finish(record)
+                    continue
+                record["transcribe_s"] = time.perf_counter() - started
+                # Blocks when the analyze stage is behind (backpressure)
+                transcribed.put((record, transcript))
+        finally:
+            with records_lock:
+                remaining_transcribers[0] -= 1
+                last = remaining_transcribers[0] == 0
+            if last:
+                for _ in range(analyze_workers):
+                    transcribed.put(_DONE)
+
+    def analyze_stage():
+        while True:
+            item = transcribed.get()
+            if item is _DONE:
+                break
+            record, transcript = item
+            started = time.perf_counter()
+            try:
+                record["output"] = analyze_fn(record["path"], transcript)
+                record["ok"] = True
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+            record["analyze_s"] = time.perf_counter() - started
+            finish(record)
+
+    threads = [threading.Thread(target=transcribe_stage, name=f"transcribe-{i}", daemon=True)
+               for i in range(transcribe_workers)]
+    threads += [threading.Thread(target=analyze_stage, name=f"analyze-{i}", daemon=True)
+                for i in range(analyze_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    order = {path: i for i, path in enumerate(paths)}
+    records.sort(key=lambda r: order[r["path"]])
+    return records
@@ -0,0 +1,37 @@
+import re
+
+# The 8-section layout of a report: headings and a parser. Shared by
+# analysis.py, search_index.py and compare_models.py without importing the
+# analysis step itself.
+
+# Section headings of the report, in SYSTEM_PROMPT order
+SECTION_TITLES = {
+    1: "Founder Context Awareness",
+    2: "Emotional State Mapping",
+    3: "Control & Power Balance",
+    4: "Trust & Risk Perception",
+    5: "Discomfort & Exit Signals",
+    6: "Pressure Response of the Caller",
+    7: "How I Would Speak Differently",
+    8: "My Conversation Analysis Framework",
+}
+
+# "**1. Founder Context Awareness**", "## 2. Emotional State", "3. Control & Power Balance:"
+_SECTION_RE = re.compile(r"^\W*([1-8])\.\s*(.*?)[\s*:#]*$")
+
+
+def split_sections(report):
+    """
+    {section number: text} for reports that follow the 8-section layout;
+    text before the first heading goes under 0.
+    """
+    sections = {}
+    current = 0
+    for line in report.splitlines():
+        match = _SECTION_RE.match(line)
+        if match and int(match.group(1)) not in sections:
+            current = int(match.group(1))
+            sections[current] = ""
+            continue
+        sections[current] = sections.get(current, "") + line + "\n"
+    return {number: text.strip() for number, text in sections.items() if text.strip() or number}
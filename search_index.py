@@ -0,0 +1,250 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import report_sections
+from disk_cache import default_cache_root
+
+# Full-text index over transcripts and report sections (SQLite FTS5).
+# transcription.py and analysis.py add documents as they are produced; every
+# document has a stable key, so re-running a call replaces its entries
+# instead of duplicating them. A transcript and the reports written from it
+# share a "call" id (hash of the transcript text), which is how report hits
+# find their audio file.
+#
+#   python search_index.py search "email later" --kind transcript
+#   python search_index.py add-reports "*_report*.txt"      # backfill old reports
+
+ENABLED = os.getenv("CALL_ANALYZER_SEARCH_INDEX", "1") != "0"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    doc_key TEXT UNIQUE NOT NULL,
+    call TEXT NOT NULL,
+    kind TEXT NOT NULL,          -- 'transcript' or 'section'
+    section INTEGER,
+    source TEXT,
+    model TEXT,
+    language TEXT,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_call ON docs(call);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(body, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+
+def default_path():
+    return os.getenv("CALL_ANALYZER_SEARCH_DB") or os.path.join(default_cache_root(), "search.db")
+
+
+def call_id(transcript):
+    return hashlib.sha256(transcript.strip().encode("utf-8")).hexdigest()[:16]
+
+
+class SearchIndex:
+    """
+    FTS5 index with one connection per thread; safe across processes (WAL).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._local = threading.local()
+        try:
+            self._conn().executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"This Python's SQLite has no FTS5 support: {e}")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _put(self, conn, doc_key, body, call, kind, section=None, source=None, model=None, language=None,
+             replace=True):
+        created = time.strftime("%Y-%m-%dT%H:%M:%S")
+        row = conn.execute("SELECT id FROM docs WHERE doc_key = ?", (doc_key,)).fetchone()
+        if row is None:
+            doc_id = conn.execute(
+                "INSERT INTO docs (doc_key, call, kind, section, source, model, language, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (doc_key, call, kind, section, source, model, language, created),
+            ).lastrowid
+        else:
+            doc_id = row["id"]
+            if not replace:
+                # Same key means same text (transcripts): just fill in missing metadata
+                conn.execute("UPDATE docs SET source = COALESCE(source, ?) WHERE id = ?", (source, doc_id))
+                return
+            conn.execute(
+                "UPDATE docs SET source = COALESCE(?, source), model = ?, language = ?, created = ? WHERE id = ?",
+                (source, model, language, created, doc_id),
+            )
+            conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+        conn.execute("INSERT INTO docs_fts (rowid, body) VALUES (?, ?)", (doc_id, body))
+
+    def add_transcript(self, transcript, source=None, model=None, language=None):
+        if not transcript.strip():
+            return
+        call = call_id(transcript)
+        with self._conn() as conn:
+            self._put(conn, f"transcript:{call}:{model}", transcript, call, "transcript",
+                      source=source, model=model, language=language, replace=False)
+
+    def add_report(self, transcript, report, model=None, language=None, source=None):
+        """
+        Indexes each section of a report separately, so hits point at the section.
+        """
+        call = call_id(transcript) if transcript else call_id(report)
+        with self._conn() as conn:
+            for number, text in report_sections.split_sections(report).items():
+                if text:
+                    self._put(conn, f"section:{call}:{model}:{language}:{number}", text, call, "section",
+                              section=number, source=source, model=model, language=language)
+
+    def search(self, query, kind=None, model=None, language=None, limit=20):
+        """
+        Ranked hits (best first) with a highlighted snippet. query uses FTS5
+        syntax; if it doesn't parse it is searched as a plain phrase.
+        """
+        filters = []
+        params = []
+        for column, value in (("kind", kind), ("model", model), ("language", language)):
+            if value:
+                filters.append(f"d.{column} = ?")
+                params.append(value)
+        where = "".join(f" AND {f}" for f in filters)
+        sql = f"""
+            SELECT d.call, d.kind, d.section, d.model, d.language, d.created,
+                   COALESCE(d.source, (SELECT t.source FROM docs t
+                                       WHERE t.call = d.call AND t.source IS NOT NULL LIMIT 1)) AS source,
+                   snippet(docs_fts, 0, '[', ']', '…', 16) AS snippet,
+                   bm25(docs_fts) AS score
+            FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid
+            WHERE docs_fts MATCH ?{where}
+            ORDER BY score
+            LIMIT ?
+        """
+        conn = self._conn()
+        try:
+            rows = conn.execute(sql, [query] + params + [limit]).fetchall()
+        except sqlite3.OperationalError:
+            phrase = '"' + query.replace('"', '""') + '"'
+            rows = conn.execute(sql, [phrase] + params + [limit]).fetchall()
+        hits = []
+        for row in rows:
+            hit = dict(row)
+            if hit["section"]:
+                hit["section_title"] = report_sections.SECTION_TITLES.get(hit["section"])
+            hits.append(hit)
+        return hits
+
+    def stats(self):
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT kind, COUNT(*) FROM docs GROUP BY kind").fetchall())
+        counts["calls"] = conn.execute("SELECT COUNT(DISTINCT call) FROM docs").fetchone()[0]
+        counts["bytes"] = os.path.getsize(self.path)
+        return counts
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
+
+
+def index_transcript(transcript, source=None, model=None, language=None):
+    """
+    Adds a transcript to the shared index. Never raises: indexing is a by-product.
+    """
+    if not ENABLED:
+        return
+    try:
+        get_index().add_transcript(transcript, source=source, model=model, language=language)
+    except (sqlite3.Error, OSError, RuntimeError) as e:
+        print(f"⚠️ Could not index transcript: {e}")
+
+
+def index_report(transcript, report, model=None, language=None, source=None):
+    if not ENABLED:
+        return
+    try:
+        get_index().add_report(transcript, report, model=model, language=language, source=source)
+    except (sqlite3.Error, OSError, RuntimeError) as e:
+        print(f"⚠️ Could not index report: {e}")
+
+
+def _report_model(path):
+    # "<call>_report_llama3.txt" -> "llama3"; "<call>_report.txt" -> None
+    match = re.search(r"_report_([^_.]+)\.txt$", os.path.basename(path))
+    return match.group(1) if match else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search transcripts and reports")
+    parser.add_argument("--db", default=None, help="Index file. Default: CALL_ANALYZER_SEARCH_DB or the cache dir")
+    sub = parser.add_subparsers(dest="command", required=True)
+    search = sub.add_parser("search", help="Ranked full-text search")
+    search.add_argument("query", help='FTS5 query, e.g. "email later" or founder NEAR(busy guarded)')
+    search.add_argument("--kind", choices=["transcript", "section"], default=None)
+    search.add_argument("--model", default=None)
+    search.add_argument("--language", default=None)
+    search.add_argument("--limit", type=int, default=20)
+    add = sub.add_parser("add-reports", help="Index existing *_report*.txt files")
+    add.add_argument("paths", nargs="+", help="Report files or glob patterns")
+    sub.add_parser("stats", help="Document counts and index size")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.db) if args.db else get_index()
+
+    if args.command == "stats":
+        print(index.stats())
+        return 0
+
+    if args.command == "add-reports":
+        count = 0
+        for pattern in args.paths:
+            for path in sorted(glob.glob(pattern)) or [pattern]:
+                if not os.path.isfile(path):
+                    print(f"❌ Not found: {path}")
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    report = f.read()
+                source = re.sub(r"_report(_[^_.]+)?\.txt$", "", os.path.basename(path))
+                # No transcript to link to: the report file itself identifies the call
+                index.add_report("", report, model=_report_model(path), source=source)
+                count += 1
+        print(f"✅ Indexed {count} report(s)")
+        return 0
+
+    started = time.perf_counter()
+    hits = index.search(args.query, kind=args.kind, model=args.model, language=args.language, limit=args.limit)
+    elapsed = time.perf_counter() - started
+    for hit in hits:
+        where = hit["kind"] if not hit["section"] else f"§{hit['section']} {hit.get('section_title') or ''}".strip()
+        meta = ", ".join(v for v in (hit["model"], hit["language"], hit["created"][:10]) if v)
+        print(f"📄 {hit['source'] or hit['call']} | {where} | {meta}\n   {hit['snippet']}")
+    print(f"\n🔎 {len(hits)} hit(s) in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
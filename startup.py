@@ -0,0 +1,126 @@
+import threading
+import time
+
+import metrics
+
+# Background model preload for the apps.
+# The heavy libraries (whisper + torch, huggingface_hub, llama.cpp) are only
+# imported by the code that needs them, so the UIs come up in well under a
+# second; the model weights are then loaded here on a daemon thread. A request
+# that arrives first just waits for the same load (whisper_registry loads
+# each model once), and describe() tells the user what is still loading.
+#
+#   startup.start_preload("base")   # returns immediately
+#   startup.describe()              # "⏳ Loading models in the background: whisper..." / "✅ Models ready ..."
+
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+_lock = threading.Lock()
+_thread = None
+_done = threading.Event()
+_status = {}  # component -> {"state", "seconds", "error"}
+
+
+def _load_whisper(model_name):
+    import whisper_registry
+
+    whisper_registry.preload(model_name)
+
+
+def _warm_analysis():
+    # Local backend: load the GGUF model and cache the system-prompt prefix
+    import analysis
+
+    analysis.warm()
+
+
+def start_preload(whisper_model="base", warm_analysis=True):
+    """
+    Starts loading the models on a daemon thread, once per process (later
+    calls, e.g. Streamlit reruns, return the same thread).
+    """
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return _thread
+        components = [("whisper", lambda: _load_whisper(whisper_model))]
+        if warm_analysis:
+            components.append(("analysis", _warm_analysis))
+        for name, _ in components:
+            _status[name] = {"state": LOADING, "seconds": None, "error": None}
+        _thread = threading.Thread(target=_run, args=(components,), name="preload", daemon=True)
+        _thread.start()
+        return _thread
+
+
+def _run(components):
+    started = time.perf_counter()
+    for name, load in components:
+        component_started = time.perf_counter()
+        try:
+            with metrics.span("preload", component=name):
+                load()
+            state, error = READY, None
+            metrics.gauge_add("call_analyzer_ready", 1, component=name)
+        except Exception as e:
+            state, error = FAILED, f"{type(e).__name__}: {e}"
+            print(f"⚠️ Preloading {name} failed, it will be loaded on first use instead: {error}")
+        with _lock:
+            _status[name] = {
+                "state": state,
+                "seconds": round(time.perf_counter() - component_started, 2),
+                "error": error,
+            }
+    _done.set()
+    if ready():
+        print(f"✅ Models ready {time.perf_counter() - started:.1f}s after startup")
+
+
+def status():
+    """
+    {component: {"state", "seconds", "error"}} for everything being preloaded.
+    """
+    with _lock:
+        return {name: dict(item) for name, item in _status.items()}
+
+
+def ready():
+    current = status()
+    return bool(current) and all(item["state"] == READY for item in current.values())
+
+
+def done():
+    return _done.is_set()
+
+
+def wait(timeout=None):
+    """
+    Blocks until the preload finished (or failed). Returns ready().
+    """
+    if _thread is None:
+        return False
+    _done.wait(timeout)
+    return ready()
+
+
+def describe():
+    """
+    One line for the UI.
+    """
+    current = status()
+    if not current:
+        return ""
+    loading = [name for name, item in current.items() if item["state"] == LOADING]
+    failed = [f"{name} ({item['error']})" for name, item in current.items() if item["state"] == FAILED]
+    if loading:
+        return (f"⏳ Loading models in the background: {', '.join(loading)}... "
+                f"You can upload now; analysis starts once they are ready.")
+    if failed:
+        return f"⚠️ Preload failed for {', '.join(failed)}; it will be retried on the first request."
+    timings = ", ".join(f"{name} {item['seconds']}s" for name, item in current.items())
+    return f"✅ Models ready ({timings})"
+
+
+metrics.describe("call_analyzer_ready", "1 once a preloaded component (whisper, analysis) is ready")
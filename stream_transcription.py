@@ -0,0 +1,214 @@
+import json
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+import audio_ingest
+import metrics
+import transcription
+import vad_transcription
+import whisper_registry
+
+# Bounded-memory transcription for multi-hour recordings (all-day conference lines).
+# Instead of decoding the whole recording and handing Whisper one huge array,
+# ffmpeg's PCM output is read from a pipe in fixed windows:
+#   1. each window is cut at the quietest moment near its end (the rest is
+#      carried into the next window, so words aren't split),
+#   2. windows without speech are skipped,
+#   3. Whisper's segments are shifted to their position in the recording and
+#      appended to <output_dir>/segments.jsonl and transcript.txt right away.
+# Peak memory is one window of audio plus the model, whatever the length.
+# state.json records how far it got, so an interrupted run resumes there.
+#
+#   result = stream_transcription.transcribe_stream("day.mp3", "day_transcript")
+#   analysis.analyze_file(result["text_path"], token)   # reads it back lazily
+
+WINDOW_S = float(os.getenv("CALL_ANALYZER_STREAM_WINDOW_S", "30"))
+CUT_SEARCH_S = 3.0     # look for a pause in the last seconds of each window
+PROMPT_CHARS = 200     # previous text given to Whisper as context for the next window
+
+SAMPLE_RATE = audio_ingest.SAMPLE_RATE
+TEXT_FILE = "transcript.txt"
+SEGMENTS_FILE = "segments.jsonl"
+STATE_FILE = "state.json"
+
+
+def _pcm_reader(path, start_s=0.0):
+    cmd = audio_ingest._ffmpeg_cmd(path)
+    if start_s:
+        cmd[cmd.index("-i"):cmd.index("-i")] = ["-ss", f"{start_s:.3f}"]
+    try:
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg was not found on PATH. Install it (see README) to decode audio.")
+
+
+def read_windows(path, window_s=WINDOW_S, start_s=0.0):
+    """
+    Yields the recording as consecutive float32 arrays of window_s seconds
+    (the last one shorter), straight from an ffmpeg pipe.
+    """
+    process = _pcm_reader(path, start_s)
+    window_bytes = int(window_s * SAMPLE_RATE) * 4
+    finished = False
+    try:
+        while True:
+            data = process.stdout.read(window_bytes)
+            if not data:
+                finished = True
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+    finally:
+        # Stopped early (consumer failed or closed the generator): just end ffmpeg
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        if process.wait() != 0 and finished:
+            raise RuntimeError(f"Failed to decode audio: {stderr.decode(errors='replace').strip()}")
+
+
+def cut_point(audio):
+    """
+    Sample index of the quietest 30 ms frame within the last CUT_SEARCH_S
+    seconds of audio (where the window should end).
+    """
+    frame_len = SAMPLE_RATE * vad_transcription.FRAME_MS // 1000
+    search = min(len(audio), int(CUT_SEARCH_S * SAMPLE_RATE)) // frame_len * frame_len
+    if search < frame_len:
+        return len(audio)
+    tail = audio[len(audio) - search:].reshape(-1, frame_len)
+    quietest = int(np.argmin(np.sqrt(np.mean(tail ** 2, axis=1))))
+    return len(audio) - search + (quietest + 1) * frame_len
+
+
+def _windows(path, window_s, start_s):
+    # (offset_s, audio) with each window ending at a pause; the remainder
+    # is carried into the next window
+    carry = np.zeros(0, dtype=np.float32)
+    offset_s = start_s
+    pending = None
+    for block in read_windows(path, window_s, start_s):
+        if pending is not None:
+            audio = np.concatenate([carry, pending])
+            cut = cut_point(audio)
+            yield offset_s, audio[:cut]
+            offset_s += cut / SAMPLE_RATE
+            carry = audio[cut:].copy()
+        pending = block
+    if pending is not None:
+        yield offset_s, np.concatenate([carry, pending])
+
+
+def _read_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _truncate(path, size):
+    # Drops a window that was half-written when the last run stopped
+    with open(path, "ab") as f:
+        f.truncate(size)
+
+
+def transcribe_stream(source, output_dir, model_name="base", window_s=WINDOW_S, resume=True, on_progress=None,
+                      engine=None, precision=None, **decode_options):
+    """
+    Transcribes source (a path, or the raw bytes of an upload) window by
+    window into output_dir and returns {"text_path", "segments_path",
+    "language", "audio_seconds", "segments", "text_bytes", "resumed"} (the text
+    itself stays on disk). on_progress gets {"audio_seconds", "text"} after
+    every window.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        # ffmpeg needs a seekable file for some containers (and to resume)
+        with tempfile.TemporaryDirectory(prefix="call-analyzer-") as tmp_dir:
+            path = os.path.join(tmp_dir, "upload")
+            with open(path, "wb") as f:
+                f.write(source)
+            return transcribe_stream(path, output_dir, model_name, window_s, resume, on_progress, engine,
+                                     precision, **decode_options)
+
+    os.makedirs(output_dir, exist_ok=True)
+    text_path = os.path.join(output_dir, TEXT_FILE)
+    segments_path = os.path.join(output_dir, SEGMENTS_FILE)
+    digest = audio_ingest.source_digest(source)
+    device, precision, engine = whisper_registry.resolve(precision=precision, engine=engine)
+    options = dict(decode_options, model=model_name, device=device, precision=precision, engine=engine,
+                   window_s=window_s)
+
+    state = _read_state(output_dir) if resume else None
+    if not state or state["source"] != digest or state["options"] != options:
+        state = {"source": digest, "options": options, "offset_s": 0.0, "text_bytes": 0, "segments_bytes": 0,
+                 "segments": 0, "language": None, "prompt": "", "done": False}
+    resumed = state["offset_s"] > 0
+    result = {"text_path": text_path, "segments_path": segments_path, "resumed": resumed}
+    if state["done"]:
+        print("⚡ Streamed transcript already complete.")
+        return dict(result, language=state["language"], audio_seconds=state["offset_s"],
+                    segments=state["segments"], text_bytes=state["text_bytes"])
+
+    _truncate(text_path, state["text_bytes"])
+    _truncate(segments_path, state["segments_bytes"])
+    if resumed:
+        print(f"⏩ Resuming streamed transcription at {state['offset_s'] / 60:.1f} min.")
+
+    with metrics.span("transcribe", model=model_name, stream=True, engine=engine, precision=precision,
+                      resumed=resumed) as span:
+        entry = whisper_registry.get_model(model_name, device, precision, engine)
+        with open(text_path, "a", encoding="utf-8") as text_out, \
+                open(segments_path, "a", encoding="utf-8") as segments_out:
+            for offset_s, audio in _windows(source, window_s, state["offset_s"]):
+                duration_s = len(audio) / SAMPLE_RATE
+                if vad_transcription.speech_regions(audio):
+                    window_options = dict(decode_options)
+                    if state["prompt"]:
+                        window_options["initial_prompt"] = state["prompt"]
+                    window = entry.transcribe(audio, **window_options)
+                    text = window["text"].strip()
+                    for segment in transcription._clean_segments(window.get("segments", [])):
+                        segment["id"] = state["segments"]
+                        segment["start"] = round(segment.get("start", 0.0) + offset_s, 2)
+                        segment["end"] = round(segment.get("end", 0.0) + offset_s, 2)
+                        segments_out.write(json.dumps(segment, ensure_ascii=False) + "\n")
+                        state["segments"] += 1
+                    if text:
+                        text_out.write(text + "\n")
+                        state["prompt"] = text[-PROMPT_CHARS:]
+                    state["language"] = state["language"] or window.get("language")
+                    text_out.flush()
+                    segments_out.flush()
+                metrics.inc("call_analyzer_audio_seconds_total", duration_s)
+                state["offset_s"] = round(offset_s + duration_s, 3)
+                state["text_bytes"] = text_out.tell()
+                state["segments_bytes"] = segments_out.tell()
+                _write_state(output_dir, state)
+                if on_progress is not None:
+                    on_progress({"audio_seconds": state["offset_s"], "text": state["prompt"]})
+        state["done"] = True
+        _write_state(output_dir, state)
+        span.set(audio_seconds=state["offset_s"], segments=state["segments"], transcript_bytes=state["text_bytes"])
+
+    return dict(result, language=state["language"], audio_seconds=state["offset_s"], segments=state["segments"],
+                text_bytes=state["text_bytes"])
+
+
+def iter_segments(segments_path):
+    """
+    Yields the segments of a streamed transcript one at a time.
+    """
+    with open(segments_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local OpenAI/HF-compatible chat completion stub for offline load tests.
+# Answers POST .../v1/chat/completions (plain JSON or SSE streaming) with a
+# deterministic fake report, after a configurable delay, and can inject
+# 429/503 errors with Retry-After to exercise client retries.
+#
+#   python stub_server.py --port 8008 --ttft 0.5 --tokens-per-second 40 --error-rate 0.1
+#   CALL_ANALYZER_INFERENCE_URL=http://127.0.0.1:8008 python analyze_call.py calls/
+
+SECTIONS = [
+    "Founder Context Awareness",
+    "Emotional State Mapping",
+    "Control & Power Balance",
+    "Trust & Risk Perception",
+    "Discomfort & Exit Signals",
+    "Pressure Response of the Caller",
+    "How I Would Speak Differently",
+    "My Conversation Analysis Framework",
+]
+
+WORDS = ("founder caller trust risk control pressure guarded open curious rushed time "
+         "clarity signal pause relevance energy exit respect space maturity").split()
+
+
+def fake_report(seed_text, completion_tokens):
+    """
+    Deterministic 8-section report of roughly completion_tokens words.
+    The same request always gets the same answer.
+    """
+    rng = random.Random(hashlib.sha256(seed_text.encode("utf-8")).hexdigest())
+    per_section = max(1, completion_tokens // (len(SECTIONS) + 1))
+    parts = []
+    for i, title in enumerate(SECTIONS, 1):
+        body = " ".join(rng.choice(WORDS) for _ in range(per_section))
+        parts.append(f"**{i}. {title}**\n\n{body.capitalize()}.\n")
+    parts.append("Trust is earned by respecting the other person's time.")
+    return "\n".join(parts)
+
+
+class StubConfig:
+    ttft_s = 0.3
+    tokens_per_second = 50.0
+    completion_tokens = 400
+    error_rate = 0.0
+    retry_after_s = 1
+    lock = threading.Lock()
+    served = 0
+    rejected = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass  # keep load-test output readable
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/health", "/stats"):
+            self._send_json(200, {"served": StubConfig.served, "rejected": StubConfig.rejected})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": f"unknown route {self.path}"})
+            return
+
+        if random.random() < StubConfig.error_rate:
+            with StubConfig.lock:
+                StubConfig.rejected += 1
+            status = random.choice((429, 503))
+            self._send_json(status, {"error": "stub overloaded"},
+                            headers={"Retry-After": str(StubConfig.retry_after_s)})
+            return
+
+        model = request.get("model") or "stub-model"
+        max_tokens = int(request.get("max_tokens") or StubConfig.completion_tokens)
+        n_tokens = min(max_tokens, StubConfig.completion_tokens)
+        prompt_text = json.dumps(request.get("messages", []), sort_keys=True)
+        words = fake_report(prompt_text, n_tokens).split(" ")
+        prompt_tokens = len(prompt_text) // 4
+
+        time.sleep(StubConfig.ttft_s)
+        if request.get("stream"):
+            self._stream(model, words, prompt_tokens)
+        else:
+            time.sleep(len(words) / StubConfig.tokens_per_second)
+            self._send_json(200, {
+                "id": "stub-completion",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                          "total_tokens": prompt_tokens + len(words)},
+            })
+        with StubConfig.lock:
+            StubConfig.served += 1
+
+    def _stream(self, model, words, prompt_tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        delay = 1.0 / StubConfig.tokens_per_second
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "stub-completion",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": word if i == 0 else " " + word},
+                    "finish_reason": None,
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(delay)
+        final = {
+            "id": "stub-completion",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                      "total_tokens": prompt_tokens + len(words)},
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def start_server(host="127.0.0.1", port=0, ttft_s=None, tokens_per_second=None,
+                 completion_tokens=None, error_rate=None):
+    """
+    Starts the stub in a background thread and returns (server, base_url).
+    port=0 picks a free port. Call server.shutdown() when done.
+    """
+    if ttft_s is not None:
+        StubConfig.ttft_s = ttft_s
+    if tokens_per_second is not None:
+        StubConfig.tokens_per_second = tokens_per_second
+    if completion_tokens is not None:
+        StubConfig.completion_tokens = completion_tokens
+    if error_rate is not None:
+        StubConfig.error_rate = error_rate
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI/HF-compatible chat completion stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--ttft", type=float, default=StubConfig.ttft_s, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=StubConfig.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=StubConfig.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/503")
+    parser.add_argument("--retry-after", type=int, default=StubConfig.retry_after_s)
+    args = parser.parse_args(argv)
+
+    StubConfig.retry_after_s = args.retry_after
+    server, url = start_server(args.host, args.port, args.ttft, args.tokens_per_second,
+                               args.completion_tokens, args.error_rate)
+    print(f"🧪 Stub inference server listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Tests import the flat top-level modules and keep every cache in a scratch dir
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CALL_ANALYZER_CACHE_DIR", tempfile.mkdtemp(prefix="call-analyzer-tests-"))
+os.environ.setdefault("CALL_ANALYZER_TOKEN_LOG", "0")
+
+
+class FakeBackend:
+    # Scripted analysis backend: every request takes the next reply, a string
+    # (or callable(messages) -> string); an exception instance is raised instead
+    name = "fake"
+    requires_token = False
+    default_model_id = "fake-model"
+
+    def __init__(self):
+        self.replies = []
+        self.calls = []
+
+    def _reply(self, messages, max_tokens, temperature, sampling):
+        self.calls.append(dict(sampling, messages=messages, max_tokens=max_tokens, temperature=temperature))
+        reply = self.replies.pop(0) if self.replies else "Transcript is unclear"
+        if callable(reply):
+            reply = reply(messages)
+        if isinstance(reply, BaseException):
+            raise reply
+        return reply
+
+    def complete(self, token, model_id, messages, max_tokens, temperature, retry_log=None, **sampling):
+        return self._reply(messages, max_tokens, temperature, sampling)
+
+    def stream(self, token, model_id, messages, max_tokens, temperature, retry_log=None, **sampling):
+        text = self._reply(messages, max_tokens, temperature, sampling)
+        return (text[i:i + 16] for i in range(0, len(text), 16))
+
+    def complete_many(self, token, model_id, message_lists, max_tokens, temperature, return_exceptions=False):
+        results = []
+        for messages in message_lists:
+            try:
+                results.append(self._reply(messages, max_tokens, temperature, {}))
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    import analysis_backends
+
+    backend = FakeBackend()
+    monkeypatch.setitem(analysis_backends.BACKENDS, "fake", lambda: backend)
+    monkeypatch.setattr(analysis_backends, "_instances", {})
+    return backend
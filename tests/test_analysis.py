@@ -0,0 +1,206 @@
+import re
+import time
+
+import pytest
+
+import analysis
+import generation_guard
+import metrics
+
+TRANSCRIPT = """
+Caller: Hi, thanks for taking the time today, I will keep this short and to the point.
+Founder: Sure, I have about ten minutes before my next meeting, so go ahead.
+Caller: We help early-stage teams review their support calls and flag escalations early.
+Founder: We already listen to a few calls every week, and honestly it works for now.
+"""
+LOOP = "The founder stays guarded and keeps steering the call back to the price before anything else. " * 8
+GOOD = "**1. Founder Context Awareness**\n\nThe founder is busy but willing to listen."
+
+
+def test_a_tripped_guard_restarts_the_report_with_retry_sampling(fake_backend):
+    fake_backend.replies = [LOOP, GOOD]
+
+    report = analysis.analyze(TRANSCRIPT, None, backend="fake", fresh=True, parallel_sections=False)
+
+    assert report == GOOD
+    retry = fake_backend.calls[1]
+    assert retry["temperature"] == generation_guard.retry_sampling(analysis.DEFAULT_TEMPERATURE)["temperature"]
+    assert retry["frequency_penalty"] == generation_guard.RETRY_FREQUENCY_PENALTY
+
+
+def test_stream_analyze_yields_restart_before_the_retried_report(fake_backend):
+    fake_backend.replies = [LOOP, GOOD]
+
+    chunks = list(analysis.stream_analyze(TRANSCRIPT, None, backend="fake", fresh=True, parallel_sections=False))
+
+    restart = chunks.index(analysis.RESTART)
+    assert "".join(chunks[restart + 1:]) == GOOD
+    assert analysis.RESTART not in chunks[restart + 1:]
+
+
+def test_a_second_degenerate_generation_keeps_the_clean_part_and_is_not_cached(fake_backend):
+    fake_backend.replies = [LOOP, LOOP]
+
+    report = analysis.analyze(TRANSCRIPT, None, backend="fake", fresh=True, parallel_sections=False)
+
+    assert report.startswith(LOOP.split(". ")[0])
+    assert report.endswith("_(Generation stopped early: repetition loop.)_")
+    fake_backend.replies = [GOOD]
+    assert analysis.analyze(TRANSCRIPT, None, backend="fake", parallel_sections=False) == GOOD
+
+
+def _group_reply(delays=None, fail=None):
+    # Answers each section group with its own sections (from the
+    # "OUTPUT ONLY the analysis sections (4, 5)" rule), optionally slowed down or failing
+    def reply(messages):
+        numbers = [int(n) for n in re.search(r"analysis sections \(([\d, ]+)\)", messages[1]["content"]).group(1).split(", ")]
+        time.sleep((delays or {}).get(numbers[0], 0))
+        if fail and numbers[0] in fail:
+            return RuntimeError(f"group {numbers[0]} failed")
+        return "\n\n".join(f"**{n}. {analysis.SECTION_TITLES[n]}**\n\nNotes for section {n}." for n in numbers)
+
+    return reply
+
+
+def _headings(report):
+    return [n for n in analysis.split_sections(report) if n]
+
+
+def test_parallel_sections_from_the_stub_come_back_in_report_order(monkeypatch):
+    import inference_client
+    import stub_server
+
+    server, url = stub_server.start_server(ttft_s=0.0, tokens_per_second=100000.0, completion_tokens=300)
+    monkeypatch.setattr(inference_client, "INFERENCE_URL", url)
+    try:
+        served = stub_server.StubConfig.served
+        report = analysis.analyze(TRANSCRIPT, "stub-token", backend="hf", fresh=True, parallel_sections=True)
+    finally:
+        server.shutdown()
+
+    assert stub_server.StubConfig.served == served + len(analysis.SECTION_GROUPS)
+    # Each group answers with all 8 stub sections; only its own are kept, in canonical order
+    assert _headings(report) == list(range(1, 9))
+    assert report.count("**1. Founder Context Awareness**") == 1
+
+
+def test_groups_finishing_out_of_order_are_reassembled_in_order(fake_backend):
+    fake_backend.replies = [_group_reply(delays={1: 0.2, 4: 0.1})] * len(analysis.SECTION_GROUPS)
+
+    report = analysis.analyze(TRANSCRIPT, None, backend="fake", fresh=True, parallel_sections=True)
+
+    assert _headings(report) == list(range(1, 9))
+    assert all(f"Notes for section {n}." in report for n in range(1, 9))
+
+
+def test_stream_yields_each_group_in_report_order(fake_backend):
+    fake_backend.replies = [_group_reply(delays={1: 0.2})] * len(analysis.SECTION_GROUPS)
+
+    chunks = list(analysis.stream_analyze(TRANSCRIPT, None, backend="fake", fresh=True, parallel_sections=True))
+
+    assert [_headings(chunk) for chunk in chunks] == [list(numbers) for _, numbers, _ in analysis.SECTION_GROUPS]
+
+
+def test_a_failed_group_leaves_its_sections_unavailable_and_skips_the_cache(fake_backend):
+    fake_backend.replies = [_group_reply(fail={4})] * len(analysis.SECTION_GROUPS)
+
+    report = analysis.analyze(TRANSCRIPT, None, backend="fake", fresh=True, parallel_sections=True)
+
+    sections = analysis.split_sections(report)
+    assert _headings(report) == list(range(1, 9))
+    assert sections[4] == sections[5] == analysis.SECTION_UNAVAILABLE
+    assert sections[3] == "Notes for section 3."
+    fake_backend.replies = [_group_reply()] * len(analysis.SECTION_GROUPS)
+    again = analysis.analyze(TRANSCRIPT, None, backend="fake", parallel_sections=True)
+    assert analysis.split_sections(again)[4] == "Notes for section 4."
+
+
+def test_the_report_fails_only_if_every_group_failed(fake_backend):
+    fake_backend.replies = [_group_reply(fail={1, 4, 6})] * len(analysis.SECTION_GROUPS)
+
+    with pytest.raises(RuntimeError):
+        analysis.analyze(TRANSCRIPT, None, backend="fake", fresh=True, parallel_sections=True)
+
+
+def test_identical_requests_are_answered_from_the_result_cache(fake_backend):
+    transcript = TRANSCRIPT + "Caller: Understood, I will send a short summary to your email today."
+    fake_backend.replies = [GOOD, GOOD + " (second sample)"]
+
+    first = analysis.analyze(transcript, None, "English", backend="fake", parallel_sections=False)
+    again = analysis.analyze(transcript, None, "English", backend="fake", parallel_sections=False)
+    fresh = analysis.analyze(transcript, None, "English", backend="fake", parallel_sections=False, fresh=True)
+
+    assert first == again == GOOD
+    assert fresh == GOOD + " (second sample)"
+    assert len(fake_backend.calls) == 2
+    # fresh=True replaced the cached sample
+    assert analysis.analyze(transcript, None, "English", backend="fake", parallel_sections=False) == fresh
+
+
+@pytest.mark.parametrize("change", [
+    {"language": "Hinglish"},
+    {"temperature": 0.7},
+    {"max_tokens": 900},
+    {"model_id": "other-model"},
+])
+def test_anything_that_shapes_the_output_is_part_of_the_cache_key(fake_backend, change):
+    transcript = TRANSCRIPT + "Caller: Thanks, I will follow up on Thursday with two examples."
+    request = dict({"language": "English", "backend": "fake", "parallel_sections": False}, **change)
+    baseline = {k: v for k, v in request.items() if k not in change}
+    baseline.setdefault("language", "English")
+    fake_backend.replies = [GOOD, GOOD]
+
+    analysis.analyze(transcript, None, fresh=True, **baseline)
+    analysis.analyze(transcript, None, **request)
+    assert len(fake_backend.calls) == 2
+
+
+def test_the_fingerprint_is_stable_and_covers_the_prompt():
+    messages = analysis.build_messages(TRANSCRIPT, "English")
+
+    assert analysis.fingerprint("m", messages, temperature=0.3) == analysis.fingerprint("m", list(messages), temperature=0.3)
+    assert analysis.fingerprint("m", messages, temperature=0.3) != analysis.fingerprint(
+        "m", analysis.build_messages(TRANSCRIPT + " More.", "English"), temperature=0.3)
+
+
+def _ttft_count():
+    hist = metrics._histograms.get(metrics._key("call_analyzer_llm_ttft_seconds", {"model": "fake-model"}))
+    return hist[len(metrics.LATENCY_BUCKETS)] if hist else 0
+
+
+def test_stream_analyze_yields_the_report_progressively_then_serves_it_from_cache(fake_backend):
+    transcript = TRANSCRIPT + "Caller: Could I send you a two minute demo link after this call?"
+    report = GOOD + "\n\n**2. Emotional Intelligence**\n\nThe caller matches the founder's pace."
+    fake_backend.replies = [report]
+    seen = _ttft_count()
+
+    chunks = list(analysis.stream_analyze(transcript, None, backend="fake", parallel_sections=False))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == report
+    assert _ttft_count() == seen + 1
+    # Cached once the stream completed: one chunk, no second request
+    assert list(analysis.stream_analyze(transcript, None, backend="fake", parallel_sections=False)) == [report]
+    assert len(fake_backend.calls) == 1
+
+
+def test_too_little_speech_is_answered_locally(fake_backend):
+    for transcript in ("", "Hello? Hello, can you hear me?"):
+        plan = analysis.preflight(transcript)
+        report = analysis.analyze(transcript, None, backend="fake", fresh=True)
+
+        assert plan["route"] == "local" and plan["max_tokens"] == 0
+        assert report == analysis.UNCLEAR_REPORT.format(words=plan["words"])
+    assert fake_backend.calls == []
+
+
+def test_max_tokens_shrinks_to_what_the_context_window_leaves(fake_backend, monkeypatch):
+    plan = analysis.preflight(TRANSCRIPT, "English", "fake-model")
+    window = plan["prompt_tokens"] + analysis.token_budget.MIN_COMPLETION_TOKENS + 100
+    monkeypatch.setitem(analysis.token_budget.CONTEXT_WINDOWS, "fake-model", window)
+    fake_backend.replies = [GOOD]
+
+    analysis.analyze(TRANSCRIPT, None, "English", backend="fake", fresh=True, parallel_sections=False)
+
+    assert analysis.preflight(TRANSCRIPT, "English", "fake-model")["route"] == "single"
+    assert fake_backend.calls[0]["max_tokens"] == analysis.token_budget.MIN_COMPLETION_TOKENS + 100
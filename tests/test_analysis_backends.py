@@ -0,0 +1,80 @@
+import sys
+import types
+
+import pytest
+
+import analysis_backends
+
+
+class FakeLlama:
+    # Just enough of llama_cpp.Llama to see what gets evaluated
+    def __init__(self, model_path, n_ctx, n_threads, verbose):
+        self.evaluated = []
+        self.restored = []
+        self.prompts = []
+
+    def tokenize(self, data, add_bos=False, special=True):
+        return list(data)
+
+    def reset(self):
+        pass
+
+    def eval(self, tokens):
+        self.evaluated.append(list(tokens))
+
+    def save_state(self):
+        return len(self.evaluated)
+
+    def load_state(self, state):
+        self.restored.append(state)
+
+    def create_completion(self, prompt, max_tokens, temperature, stop, stream=False, **sampling):
+        self.prompts.append(prompt)
+        if stream:
+            return iter([{"choices": [{"text": "Report"}]}, {"choices": [{"text": " text"}]}])
+        return {"choices": [{"text": "Report text"}], "usage": {"prompt_tokens": len(prompt), "completion_tokens": 2}}
+
+
+@pytest.fixture
+def llama(monkeypatch):
+    monkeypatch.setitem(sys.modules, "llama_cpp", types.SimpleNamespace(Llama=FakeLlama))
+    return analysis_backends.LlamaCppBackend(model_path="models/test.Q4_K_M.gguf", n_ctx=4096, n_threads=2)
+
+
+def _messages(system, transcript):
+    return [{"role": "system", "content": system}, {"role": "user", "content": transcript}]
+
+
+def test_the_system_prompt_is_evaluated_once_and_restored_afterwards(llama):
+    first, usage = llama.complete(None, llama.default_model_id, _messages("Analyze.", "call one"), 100, 0.3)
+    second = "".join(llama.stream(None, llama.default_model_id, _messages("Analyze.", "call two"), 100, 0.3))
+
+    llm = llama._llm
+    prefix = list(llama._system_text("Analyze.").encode("utf-8"))
+    assert first == second == "Report text"
+    assert llm.evaluated == [prefix]
+    assert llm.restored == [1]
+    # Both prompts start with the cached prefix; only the transcript turn differs
+    assert all(p[:len(prefix)] == prefix for p in llm.prompts)
+    assert usage.prompt_tokens == len(llm.prompts[0])
+
+
+def test_the_prefix_cache_keeps_only_the_latest_prompts(llama):
+    for i in range(analysis_backends.MAX_CACHED_PREFIXES + 1):
+        llama.warm(f"System prompt {i}")
+
+    assert len(llama._prefix_states) == analysis_backends.MAX_CACHED_PREFIXES
+    assert "System prompt 0" not in llama._prefix_states
+    llama.warm("System prompt 0")
+    assert len(llama._llm.evaluated) == analysis_backends.MAX_CACHED_PREFIXES + 2
+
+
+def test_backends_are_shared_and_misconfiguration_is_reported(monkeypatch):
+    monkeypatch.setattr(analysis_backends, "_instances", {})
+    monkeypatch.delenv("CALL_ANALYZER_GGUF_PATH", raising=False)
+
+    assert analysis_backends.get_backend("hf") is analysis_backends.get_backend("hf")
+    with pytest.raises(ValueError, match="Unknown analysis backend"):
+        analysis_backends.get_backend("nope")
+    with pytest.raises(ValueError, match="CALL_ANALYZER_GGUF_PATH"):
+        analysis_backends.get_backend("llama-cpp")
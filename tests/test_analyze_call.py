@@ -0,0 +1,54 @@
+import os
+
+import analyze_call
+import whisper_registry
+
+LOADS_ENV = "CALL_ANALYZER_TEST_LOADS"
+
+
+class PidModel:
+    def transcribe(self, audio, fp16=False, **options):
+        return {"text": f"transcript of {audio} from {os.getpid()}", "segments": [], "language": "en"}
+
+
+def _counting_load(name, device, precision, engine, threads):
+    with open(os.environ[LOADS_ENV], "a") as f:
+        f.write(f"{os.getpid()}\n")
+    return PidModel(), None
+
+
+def _transcribe(audio_path):
+    if "bad" in audio_path:
+        raise ValueError("unreadable audio")
+    return whisper_registry.get_model(analyze_call._whisper_model_name).transcribe(audio_path)["text"]
+
+
+def test_inputs_expand_to_a_sorted_unique_list_of_audio_files(tmp_path):
+    for name in ("b.mp3", "a.wav", "notes.txt"):
+        (tmp_path / name).write_bytes(b"x")
+
+    files, missing = analyze_call.collect_audio_files(
+        [str(tmp_path), str(tmp_path / "a.wav"), f'"{tmp_path / "*.mp3"}"', str(tmp_path / "nothing*.mp3")])
+
+    assert files == [str(tmp_path / "a.wav"), str(tmp_path / "b.mp3")]
+    assert missing == [str(tmp_path / "nothing*.mp3")]
+
+
+def test_batch_workers_load_whisper_once_and_keep_input_order(tmp_path, monkeypatch):
+    loads = tmp_path / "loads.txt"
+    monkeypatch.setenv(LOADS_ENV, str(loads))
+    monkeypatch.setattr(whisper_registry, "_models", {})
+    monkeypatch.setattr(whisper_registry, "_load", _counting_load)
+    monkeypatch.setattr(analyze_call, "transcribe_audio", _transcribe)
+    monkeypatch.setattr(analyze_call, "analyze_with_huggingface", lambda transcript, fresh=False: f"report: {transcript}")
+    files = [f"call{i}.wav" for i in range(6)] + ["bad.wav"]
+
+    records = analyze_call.run_batch(files, workers=2, output_dir=str(tmp_path / "reports"))
+
+    assert [r["path"] for r in records] == files
+    assert [r["ok"] for r in records] == [True] * 6 + [False]
+    assert records[-1]["error"] == "ValueError: unreadable audio"
+    worker_pids = {open(r["output"]).read().rsplit(" ", 1)[1] for r in records[:-1]}
+    load_pids = loads.read_text().split()
+    assert len(load_pids) == len(set(load_pids)) <= 2  # one load per worker process
+    assert worker_pids <= set(load_pids)
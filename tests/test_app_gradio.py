@@ -0,0 +1,16 @@
+import sys
+
+import app_gradio
+
+
+def test_importing_the_app_does_not_import_gradio():
+    assert "gradio" not in sys.modules
+
+
+def test_demo_is_built_once_on_first_access(monkeypatch):
+    built = []
+    monkeypatch.setattr(app_gradio, "_demo", None)
+    monkeypatch.setattr(app_gradio, "build_ui", lambda: built.append(object()) or built[-1])
+
+    assert app_gradio.demo is app_gradio.demo
+    assert len(built) == 1
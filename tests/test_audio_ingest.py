@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+import audio_ingest
+
+WAVE = np.linspace(-1, 1, 1600, dtype=np.float32)
+
+
+@pytest.fixture
+def pcm_cache(monkeypatch, tmp_path):
+    cache = audio_ingest.PcmCache(str(tmp_path / "pcm"), max_bytes=10 * 1024 * 1024)
+    monkeypatch.setattr(audio_ingest, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    # Stands in for ffmpeg: every decode writes WAVE and is counted
+    calls = []
+
+    def decode_to(source, out):
+        calls.append(source)
+        out.write(WAVE.tobytes())
+
+    monkeypatch.setattr(audio_ingest, "_decode_to", decode_to)
+    return calls
+
+
+def test_each_recording_is_decoded_once_and_served_memory_mapped(pcm_cache, decodes, tmp_path):
+    path = tmp_path / "call.awb"
+    path.write_bytes(b"fake awb payload")
+
+    first = audio_ingest.load(str(path))
+    again = audio_ingest.load(path.read_bytes())  # same content as an upload
+
+    assert len(decodes) == 1
+    assert isinstance(again, np.memmap)
+    np.testing.assert_array_equal(first, WAVE)
+    np.testing.assert_array_equal(again, WAVE)
+    assert audio_ingest.duration_seconds(again) == pytest.approx(0.1)
+
+
+def test_a_failed_decode_leaves_nothing_behind(pcm_cache, monkeypatch):
+    def broken(source, out):
+        out.write(b"partial")
+        raise RuntimeError("Failed to decode audio: invalid data")
+
+    monkeypatch.setattr(audio_ingest, "_decode_to", broken)
+    with pytest.raises(RuntimeError):
+        audio_ingest.load(b"not audio")
+
+    assert pcm_cache.get(audio_ingest.source_digest(b"not audio")) is None
+    assert [f for _, _, files in os.walk(pcm_cache.directory) for f in files] == []
+
+
+def test_uploads_ffmpeg_cannot_pipe_go_through_a_temp_dir_that_is_removed(pcm_cache, monkeypatch):
+    seen = []
+
+    def run_ffmpeg(cmd, out, stdin_bytes=None):
+        source = cmd[cmd.index("-i") + 1]
+        if source == "pipe:0":
+            out.write(b"garbage")
+            raise RuntimeError("Failed to decode audio: moov atom not found")
+        seen.append(source)
+        with open(source, "rb") as f:
+            assert f.read() == b"m4a with trailing index"
+        out.write(WAVE.tobytes())
+
+    monkeypatch.setattr(audio_ingest, "_run_ffmpeg", run_ffmpeg)
+    audio = audio_ingest.load(b"m4a with trailing index")
+
+    np.testing.assert_array_equal(audio, WAVE)
+    assert len(seen) == 1 and not os.path.exists(os.path.dirname(seen[0]))
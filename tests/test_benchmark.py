@@ -0,0 +1,51 @@
+import analysis
+import benchmark
+import inference_client
+import stub_server
+
+
+def test_benchmark_transcript_takes_the_llm_path():
+    plan = analysis.preflight(benchmark.BENCH_TRANSCRIPT)
+    assert plan["route"] == "single"
+
+
+def test_analyze_stage_reaches_the_stub(monkeypatch):
+    server, url = stub_server.start_server(ttft_s=0.0, tokens_per_second=10000.0, completion_tokens=50)
+    monkeypatch.setattr(inference_client, "INFERENCE_URL", url)
+    try:
+        served = stub_server.StubConfig.served
+        report = analysis.analyze(benchmark.BENCH_TRANSCRIPT, "stub-token", fresh=True, backend="hf")
+    finally:
+        server.shutdown()
+    assert stub_server.StubConfig.served == served + 1
+    assert report and not report.startswith("Transcript is unclear")
+
+
+def test_throughput_pins_the_stub_backend(monkeypatch):
+    import transcription
+
+    backends = []
+    monkeypatch.setenv("CALL_ANALYZER_BACKEND", "llama-cpp")
+    monkeypatch.setattr(transcription, "transcribe", lambda source, **kwargs: {"text": "hello"})
+    monkeypatch.setattr(analysis, "analyze", lambda transcript, token, **kwargs: backends.append(kwargs.get("backend")) or "report")
+
+    result = benchmark.run_throughput([("a", b"a"), ("b", b"b")], "base", 2)
+
+    assert result["failed"] == 0
+    assert backends == ["hf", "hf"]
+
+
+def test_compare_flags_slower_stages_and_lower_throughput(tmp_path):
+    import json
+
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({
+        "stages": {"decode_s": {"p50": 1.0}, "transcribe_s": {"p50": 1.0}},
+        "throughput": [{"concurrency": 2, "calls_per_min": 10.0}],
+    }))
+    current = {
+        "stages": {"decode_s": {"p50": 1.05}, "transcribe_s": {"p50": 2.0}},
+        "throughput": [{"concurrency": 2, "calls_per_min": 5.0}],
+    }
+
+    assert benchmark.compare(current, str(baseline)) == ["transcribe_s", "throughput x2"]
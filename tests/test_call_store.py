@@ -0,0 +1,82 @@
+import multiprocessing
+
+import call_store
+
+
+def _segments(call, count=3):
+    # One second of speech every 4 seconds: a 3s gap before every segment but the first
+    return [{"id": i, "start": 4.0 * i, "end": 4.0 * i + 1.0, "text": f" call {call} segment {i} "}
+            for i in range(count)]
+
+
+def test_appended_calls_are_listed_and_queryable(tmp_path):
+    store = call_store.CallStore(str(tmp_path))
+
+    first = store.append("aaa", _segments("a"), model="base", source="a.wav", language="en", duration_s=9.0)
+    second = store.append("bbb", _segments("b", 2), model="base", source="b.wav")
+
+    assert (first, second) == (0, 1)
+    assert [(c["source"], c["row_offset"], c["rows"]) for c in store.calls()] == [("a.wav", 0, 3), ("b.wav", 3, 2)]
+    assert store.has("aaa", "base") and not store.has("aaa", "small")
+    assert store.texts([0, 4]) == ["call a segment 0", "call b segment 1"]
+    assert [(p["source"], p["start"], p["gap_before"]) for p in store.long_pauses(2.5)] == [
+        ("a.wav", 4.0, 3.0), ("a.wav", 8.0, 3.0), ("b.wav", 4.0, 3.0)]
+    assert store.stats()["calls"] == 2 and store.stats()["segments"] == 5
+
+
+def test_a_call_is_stored_once_per_model(tmp_path):
+    store = call_store.CallStore(str(tmp_path))
+
+    assert store.append("aaa", _segments("a"), model="base") == 0
+    assert store.append("aaa", _segments("a"), model="base") == 0
+    assert store.append("aaa", _segments("a"), model="small") == 1
+    assert store.row_count() == 6
+
+
+def test_rows_from_an_uncommitted_append_are_dropped(tmp_path):
+    store = call_store.CallStore(str(tmp_path))
+    store.append("aaa", _segments("a"), model="base")
+    # A writer that died after the columns but before calls.jsonl
+    for name in call_store.COLUMNS:
+        with open(tmp_path / f"{name}.bin", "ab") as f:
+            f.write(b"\0" * 64)
+    with open(tmp_path / "text.bin", "ab") as f:
+        f.write(b"half-written")
+
+    store.append("bbb", _segments("b"), model="base")
+
+    reader = call_store.CallStore(str(tmp_path))
+    assert reader.row_count() == 6
+    assert reader.texts(range(6))[3:] == ["call b segment 0", "call b segment 1", "call b segment 2"]
+    assert (tmp_path / "start.bin").stat().st_size == 6 * 4
+
+
+def _append_many(root, worker, calls):
+    store = call_store.CallStore(root)
+    for n in range(calls):
+        store.append(f"{worker}-{n}", _segments(f"{worker}-{n}"), model="base")
+
+
+def test_concurrent_writers_never_interleave_rows(tmp_path):
+    workers = [multiprocessing.Process(target=_append_many, args=(str(tmp_path), w, 10)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    store = call_store.CallStore(str(tmp_path))
+    calls = store.calls()
+    assert len(calls) == 40 and store.row_count() == 120
+    call_col = store.column("call")
+    for call in calls:
+        rows = range(call["row_offset"], call["row_offset"] + call["rows"])
+        assert all(int(call_col[row]) == call["index"] for row in rows)
+        assert store.texts(rows) == [f"call {call['digest']} segment {i}" for i in range(3)]
+
+
+def test_a_lock_file_left_by_a_crashed_writer_does_not_block(tmp_path):
+    (tmp_path / ".lock").write_bytes(b"")
+    store = call_store.CallStore(str(tmp_path))
+
+    assert store.append("aaa", _segments("a"), model="base") == 0
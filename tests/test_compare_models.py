@@ -0,0 +1,52 @@
+import json
+import os
+import time
+
+import analysis
+import compare_models
+
+
+def test_model_specs_resolve_aliases_and_raw_ids():
+    assert compare_models.resolve_models("llama3, Qwen/Qwen2-7B-Instruct,,") == [
+        ("llama3", compare_models.MODEL_ALIASES["llama3"]),
+        ("qwen2-7b-instruct", "Qwen/Qwen2-7B-Instruct"),
+    ]
+
+
+def test_one_transcription_feeds_every_model_concurrently(tmp_path, monkeypatch):
+    transcribed = []
+
+    def transcribe(path):
+        transcribed.append(path)
+        return {"text": "Caller: hello. Founder: hi.", "cached": False}
+
+    def stream_analyze(transcript, token, language, model_id, fresh):
+        time.sleep(0.2)
+        if model_id == "broken/model":
+            raise RuntimeError("model is loading")
+        yield f"**1. {analysis.SECTION_TITLES[1]}**\n\n"
+        yield f"Notes from {model_id}."
+
+    monkeypatch.setattr(compare_models.transcription, "transcribe", transcribe)
+    monkeypatch.setattr(analysis, "stream_analyze", stream_analyze)
+    monkeypatch.setattr(analysis, "cached", lambda *args, **kwargs: None)
+    audio = tmp_path / "ramandeep.wav"
+    audio.write_bytes(b"audio")
+    models = compare_models.resolve_models("llama3,mistral,zephyr,broken/model")
+
+    summary = compare_models.compare_call(str(audio), models, "token", output_dir=str(tmp_path / "out"))
+
+    assert transcribed == [str(audio)]
+    # About the slowest model, not the sum of all four
+    assert summary["analysis_wall_s"] < summary["sum_model_s"] / 2
+    by_alias = {m["alias"]: m for m in summary["models"]}
+    assert [m["ok"] for m in summary["models"]] == [True, True, True, False]
+    assert by_alias["model"]["error"] == "RuntimeError: model is loading"
+    assert open(by_alias["mistral"]["output"]).read().endswith(f"Notes from {compare_models.MODEL_ALIASES['mistral']}.")
+    assert sorted(os.listdir(tmp_path / "out")) == [
+        "ramandeep_comparison.json", "ramandeep_comparison.md",
+        "ramandeep_report_llama3.txt", "ramandeep_report_mistral.txt", "ramandeep_report_zephyr.txt",
+    ]
+    assert json.load(open(tmp_path / "out" / "ramandeep_comparison.json"))["call"] == "ramandeep.wav"
+    side_by_side = open(tmp_path / "out" / "ramandeep_comparison.md").read()
+    assert "| 1 | Notes from meta-llama/Meta-Llama-3-8B-Instruct." in side_by_side
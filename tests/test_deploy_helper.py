@@ -0,0 +1,49 @@
+import os
+
+import deploy_helper
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _snapshot(root):
+    return sorted(os.path.join(folder, name) for folder, _, names in os.walk(root) for name in names)
+
+
+def test_dry_run_writes_nothing_even_when_the_space_does_not_exist(tmp_path, monkeypatch):
+    monkeypatch.chdir(PACKAGE_DIR)
+    hub = deploy_helper.LocalHub(str(tmp_path / "hub"))
+
+    summary = deploy_helper.deploy(api=hub, dry_run=True)
+
+    assert summary["uploaded"] and not summary["skipped"]
+    assert summary["commit"] is None
+    assert not os.path.exists(tmp_path / "hub")
+
+
+def test_dry_run_against_a_deployed_space_leaves_it_untouched(tmp_path, monkeypatch):
+    monkeypatch.chdir(PACKAGE_DIR)
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "hf_test")
+    hub = deploy_helper.LocalHub(str(tmp_path / "hub"))
+    deploy_helper.deploy(api=hub)
+    before = [(path, os.path.getmtime(path)) for path in _snapshot(tmp_path / "hub")]
+
+    summary = deploy_helper.deploy(api=hub, dry_run=True)
+
+    assert summary["uploaded"] == [] and summary["skipped"]
+    assert [(path, os.path.getmtime(path)) for path in _snapshot(tmp_path / "hub")] == before
+
+
+def test_only_changed_files_go_up_in_one_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    hub = deploy_helper.LocalHub(str(tmp_path / "hub"))
+    hub.create_repo("local/space")
+    for name, text in (("a.txt", "one"), ("b.txt", "two")):
+        (tmp_path / name).write_text(text)
+    files = ["a.txt", "b.txt"]
+    deploy_helper.push(hub, "local/space", files)
+    (tmp_path / "b.txt").write_text("changed")
+
+    summary = deploy_helper.push(hub, "local/space", files)
+
+    assert summary["uploaded"] == ["b.txt"] and summary["skipped"] == ["a.txt"]
+    assert (tmp_path / "hub" / "local" / "space" / "b.txt").read_text() == "changed"
@@ -0,0 +1,59 @@
+import os
+import time
+
+from disk_cache import DiskCache
+
+
+def _age(cache, key, seconds):
+    path = cache._path(key)
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_values_round_trip_and_missing_keys_miss(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 20)
+    cache.put("abc123", {"text": "héllo", "segments": [1, 2]})
+
+    assert cache.get("abc123") == {"text": "héllo", "segments": [1, 2]}
+    assert cache.get("def456") is None
+    cache.delete("abc123")
+    assert cache.get("abc123") is None
+
+
+def test_eviction_drops_the_least_recently_used_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 20)
+    for i, key in enumerate(("aa01", "bb02", "cc03")):
+        cache.put(key, "x" * 1000)
+        _age(cache, key, 300 - i * 100)  # aa01 oldest, cc03 newest
+    assert cache.get("aa01") is not None  # a hit makes it the most recent
+
+    cache.max_bytes = cache.size() - 1
+    assert cache.evict() == 1
+
+    assert cache.get("bb02") is None
+    assert cache.get("aa01") is not None and cache.get("cc03") is not None
+
+
+def test_expired_and_corrupt_entries_are_misses(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 20, ttl_seconds=60)
+    cache.put("aa01", "fresh")
+    cache.put("bb02", "stale")
+    with open(cache._path("bb02"), "w") as f:
+        f.write('{"created": %f, "value": "stale"}' % (time.time() - 120))
+    os.makedirs(os.path.dirname(cache._path("cc03")))
+    with open(cache._path("cc03"), "w") as f:
+        f.write("{not json")
+
+    assert cache.get("aa01") == "fresh"
+    assert cache.get("bb02") is None and not os.path.exists(cache._path("bb02"))
+    assert cache.get("cc03") is None and not os.path.exists(cache._path("cc03"))
+
+
+def test_half_written_temp_files_are_not_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 20)
+    cache.put("aa01", "value")
+    leftover = cache._path("aa01") + ".tmp-123-abcd"
+    with open(leftover, "w") as f:
+        f.write("x" * 5000)
+
+    assert cache.size() == os.path.getsize(cache._path("aa01"))
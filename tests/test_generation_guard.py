@@ -0,0 +1,65 @@
+import generation_guard
+
+SENTENCE = "The founder stays guarded and keeps steering the call back to the price before anything else. "
+
+
+def _feed(guard, text, size=7):
+    for i in range(0, len(text), size):
+        reason = guard.feed(text[i:i + size])
+        if reason:
+            return reason
+    return guard.feed(" ")
+
+
+def test_a_repeated_passage_trips_the_loop_check_and_keeps_the_first_pass():
+    guard = generation_guard.GenerationGuard()
+
+    assert _feed(guard, "**1. Founder Context Awareness**\n\n" + SENTENCE * 8) == "loop"
+    assert guard.clean_text() == "**1. Founder Context Awareness**\n\n" + SENTENCE.strip()
+
+
+def test_quoting_a_phrase_a_few_times_is_not_a_loop():
+    guard = generation_guard.GenerationGuard()
+    text = " ".join(f"In section {n} the caller says \"keeps steering the call back\" again, point {n}." for n in range(12))
+
+    assert _feed(guard, text) is None
+    assert guard.clean_text() == text + " "
+
+
+def test_a_long_verbatim_run_from_the_transcript_trips_the_echo_check():
+    transcript = " ".join(f"Caller line {n}: we help teams review calls and spot escalations early." for n in range(10))
+    guard = generation_guard.GenerationGuard(transcript)
+    analysis = "The caller opens politely. "
+
+    assert _feed(guard, analysis + transcript) == "echo"
+    assert guard.clean_text() == analysis.strip()
+
+
+def test_short_transcripts_are_not_checked_for_echo():
+    transcript = "Hello, who is this? I am busy right now, call me later."
+    guard = generation_guard.GenerationGuard(transcript)
+
+    assert _feed(guard, (transcript + " ") * 2) is None
+
+
+def test_role_tokens_split_across_chunks_trip_the_role_check():
+    guard = generation_guard.GenerationGuard()
+
+    assert guard.feed("The founder ends the call politely.[/US") is None
+    assert guard.feed("ER] Thank you") == "role"
+    assert guard.clean_text() == "The founder ends the call politely."
+
+
+def test_a_tripped_guard_keeps_its_reason():
+    guard = generation_guard.GenerationGuard()
+    guard.feed("Done <|im_end|>")
+
+    assert guard.feed("more text") == "role"
+
+
+def test_retry_sampling_raises_temperature_and_penalizes_repeats():
+    assert generation_guard.retry_sampling(0.3) == {
+        "temperature": 0.3 + generation_guard.RETRY_TEMPERATURE_STEP,
+        "frequency_penalty": generation_guard.RETRY_FREQUENCY_PENALTY,
+    }
+    assert generation_guard.retry_sampling(0.95)["temperature"] == 1.0
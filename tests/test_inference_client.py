@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import inference_client
+
+
+class HttpError(Exception):
+    # Shaped like huggingface_hub's HfHubHTTPError: status and headers on .response
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.response = type("Response", (), {"status_code": status, "headers": headers or {}})()
+
+
+def _run(coro):
+    return inference_client.run(coro, timeout=10)
+
+
+def test_rate_limits_are_retried_and_other_errors_are_not(monkeypatch):
+    monkeypatch.setattr(inference_client, "BACKOFF_BASE_S", 0.0)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise HttpError(429 if len(attempts) == 1 else 503)
+        return "ok"
+
+    retry_log = []
+    assert _run(inference_client._with_retries(flaky, time.monotonic() + 5, retry_log)) == "ok"
+    assert [r["attempt"] for r in retry_log] == [1, 2]
+
+    async def bad_request():
+        attempts.append(1)
+        raise HttpError(400)
+
+    attempts.clear()
+    with pytest.raises(HttpError):
+        _run(inference_client._with_retries(bad_request, time.monotonic() + 5, []))
+    assert len(attempts) == 1
+
+
+def test_backoff_never_undercuts_retry_after():
+    assert inference_client._backoff(0, HttpError(429, {"Retry-After": "7"})) >= 7
+    assert inference_client._backoff(0, HttpError(503)) <= inference_client.BACKOFF_BASE_S
+
+
+def test_the_deadline_covers_every_retry(monkeypatch):
+    monkeypatch.setattr(inference_client, "BACKOFF_BASE_S", 0.0)
+
+    async def rate_limited():
+        raise HttpError(429, {"Retry-After": "60"})
+
+    started = time.monotonic()
+    with pytest.raises(HttpError):
+        _run(inference_client._with_retries(rate_limited, time.monotonic() + 1, []))
+    # Gave up instead of sleeping past the deadline
+    assert time.monotonic() - started < 1
+    with pytest.raises(inference_client.InferenceDeadlineExceeded):
+        _run(inference_client._with_retries(rate_limited, time.monotonic() - 1, []))
+
+
+def test_in_flight_requests_are_capped_per_model(monkeypatch):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    class FakeClient:
+        async def chat_completion(self, model, messages, **kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            await asyncio.sleep(0.02)
+            with lock:
+                active.pop()
+            return model
+
+    monkeypatch.setattr(inference_client, "MAX_IN_FLIGHT_PER_MODEL", 2)
+    monkeypatch.setattr(inference_client, "get_client", lambda token: FakeClient())
+
+    async def burst():
+        return await asyncio.gather(*(
+            inference_client.achat_completion("tok", "capped-model", []) for _ in range(6)
+        ))
+
+    assert _run(burst()) == ["capped-model"] * 6
+    assert max(peak) == 2
@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+
+import jobs
+
+
+def test_identical_uploads_merge_only_for_the_same_token(tmp_path):
+    release = threading.Event()
+    queue = jobs.JobQueue(workers=1, output_root=str(tmp_path / "jobs"),
+                          handler=lambda queue, job: release.wait(5))
+    audio = tmp_path / "call.wav"
+    audio.write_bytes(b"same audio")
+
+    first = queue.submit(str(audio), token="token-a")
+    same_user = queue.submit(str(audio), token="token-a")
+    other_user = queue.submit(str(audio), token="token-b")
+    release.set()
+
+    assert same_user is first
+    assert other_user is not first
+    assert other_user.token == "token-b"
+
+
+def _audio(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_watch_streams_progress_until_the_job_finishes(tmp_path):
+    def handler(queue, job):
+        queue.update(job, status=jobs.TRANSCRIBING, progress="step 1")
+        queue.update(job, status=jobs.ANALYZING, progress="step 2")
+
+    def failing(queue, job):
+        raise RuntimeError("model unavailable")
+
+    queue = jobs.JobQueue(workers=1, output_root=str(tmp_path / "jobs"), handler=handler)
+    job = queue.submit(_audio(tmp_path, "ok.wav", b"ok"))
+    snapshots = list(queue.watch(job.id, timeout=5))
+    assert snapshots[-1]["status"] == jobs.DONE
+    assert [s["version"] for s in snapshots] == sorted({s["version"] for s in snapshots})
+
+    queue.handler = failing
+    job = queue.submit(_audio(tmp_path, "bad.wav", b"bad"))
+    final = list(queue.watch(job.id, timeout=5))[-1]
+    assert final["status"] == jobs.FAILED
+    assert final["error"] == "RuntimeError: model unavailable"
+
+
+def test_a_full_queue_rejects_new_work(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler(queue, job):
+        started.set()
+        release.wait(5)
+
+    queue = jobs.JobQueue(workers=1, max_queued=1, output_root=str(tmp_path / "jobs"), handler=handler)
+    try:
+        queue.submit(_audio(tmp_path, "1.wav", b"1"))
+        assert started.wait(5)  # the only worker is busy
+        queue.submit(_audio(tmp_path, "2.wav", b"2"))
+        with pytest.raises(jobs.JobQueueFull):
+            queue.submit(_audio(tmp_path, "3.wav", b"3"))
+    finally:
+        release.set()
+
+
+def test_each_job_writes_its_report_to_its_own_directory(tmp_path, monkeypatch, fake_backend):
+    monkeypatch.setenv("CALL_ANALYZER_BACKEND", "fake")
+    monkeypatch.setattr(jobs.transcription, "transcribe",
+                        lambda path, model_name, on_progress: {"text": open(path).read()})
+    fake_backend.replies = ["Transcript is unclear", "Transcript is unclear"]
+    queue = jobs.JobQueue(workers=2, output_root=str(tmp_path / "jobs"))
+
+    finals = [list(queue.watch(queue.submit(_audio(tmp_path, f"{i}.wav", f"call {i}".encode()),
+                                            fresh=True).id, timeout=10))[-1] for i in range(2)]
+
+    assert [f["status"] for f in finals] == [jobs.DONE, jobs.DONE]
+    assert [f["transcript"] for f in finals] == ["call 0", "call 1"]
+    paths = [f["output_path"] for f in finals]
+    assert len({os.path.dirname(p) for p in paths}) == 2
+    assert all(open(p).read() == f["report"] for p, f in zip(paths, finals))
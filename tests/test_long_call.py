@@ -0,0 +1,54 @@
+import pytest
+
+import analysis_backends
+import long_call
+
+MODEL = "meta-llama/Meta-Llama-3-8B-Instruct"
+
+
+class FlakyBackend(analysis_backends.HuggingFaceBackend):
+    """
+    complete_many with part 2 failing (e.g. past its deadline).
+    """
+
+    def __init__(self, fail=(2,)):
+        self.fail = fail
+
+    def complete_many(self, token, model_id, message_lists, max_tokens, temperature, return_exceptions=False):
+        results = []
+        for messages in message_lists:
+            part = int(messages[1]["content"].split("PART ")[1].split(" ")[0])
+            error = TimeoutError(f"part {part} timed out")
+            if part in self.fail and not return_exceptions:
+                raise error
+            results.append(error if part in self.fail else f"notes {part}")
+        return results
+
+
+def test_one_failed_window_degrades_to_a_placeholder():
+    transcript = " ".join(f"word{i}" for i in range(6000))
+    notes = long_call.map_notes(transcript, "token", MODEL, reduce_budget_tokens=100000, backend=FlakyBackend())
+
+    assert notes[0] == "notes 1"
+    assert notes[1] == "(notes unavailable for part 2)"
+    assert all(note.startswith("notes ") for note in notes[2:])
+
+
+def test_every_window_failing_still_raises():
+    transcript = " ".join(f"word{i}" for i in range(1000))
+    with pytest.raises(TimeoutError):
+        long_call.map_notes(transcript, "token", MODEL, reduce_budget_tokens=100000, backend=FlakyBackend(fail=(1,)))
+
+
+@pytest.mark.parametrize("count", [50, 90, 130, 131, 170])
+def test_no_trailing_window_only_repeats_the_overlap(monkeypatch, count):
+    # 1 token per word: windows of 50 words stepping by 40
+    monkeypatch.setattr(long_call.token_budget, "count_tokens", lambda text, model_id: len(text.split()))
+    words = [f"w{i}" for i in range(count)]
+    blocks = [" ".join(words[i:i + 7]) for i in range(0, count, 7)]
+
+    for windows in (long_call.split_windows(" ".join(words), MODEL, 50, 10),
+                    list(long_call.iter_windows(blocks, MODEL, 50, 10))):
+        assert windows[-1].split()[-1] == words[-1]
+        assert all(not set(b.split()) <= set(a.split()) for a, b in zip(windows, windows[1:]))
+        assert len(windows) == max(1, -(-(count - 10) // 40))
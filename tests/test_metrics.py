@@ -0,0 +1,75 @@
+import json
+import logging
+
+import pytest
+
+import metrics
+
+
+def _trace_records(caplog):
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == "call_analyzer.trace"]
+
+
+def _in_flight(stage):
+    return metrics._gauges.get(metrics._key("call_analyzer_in_flight", {"stage": stage}), 0)
+
+
+def test_nested_spans_log_one_line_each_on_the_same_trace(caplog):
+    caplog.set_level(logging.INFO, logger="call_analyzer.trace")
+
+    with metrics.span("test_call", call="a.wav") as outer:
+        with metrics.span("test_stage") as inner:
+            inner.set(audio_seconds=12.5)
+            assert _in_flight("test_stage") == 1
+
+    stage, call = _trace_records(caplog)
+    assert stage["trace_id"] == call["trace_id"] == outer.trace_id
+    assert stage["parent_id"] == call["span_id"] and call["parent_id"] is None
+    assert stage["audio_seconds"] == 12.5 and call["call"] == "a.wav"
+    assert stage["status"] == call["status"] == "ok"
+    assert _in_flight("test_stage") == 0 and metrics.current_span() is None
+
+
+def test_failed_and_abandoned_spans_are_counted_by_status(caplog):
+    caplog.set_level(logging.INFO, logger="call_analyzer.trace")
+
+    with pytest.raises(ValueError):
+        with metrics.span("test_failing"):
+            raise ValueError("bad audio")
+
+    def streaming():
+        with metrics.span("test_stream", attach=False):
+            yield "first"
+            yield "second"
+
+    stream = streaming()
+    next(stream)
+    stream.close()  # client went away mid-stream
+
+    failed, cancelled = _trace_records(caplog)
+    assert failed["status"] == "error" and failed["error"] == "ValueError: bad audio"
+    assert cancelled["status"] == "cancelled"
+    assert metrics._counters[metrics._key("call_analyzer_stage_total", {"stage": "test_failing", "status": "error"})] == 1
+    assert _in_flight("test_stream") == 0
+
+
+def test_prometheus_text_has_help_types_labels_and_cumulative_buckets(tmp_path):
+    metrics.describe("test_requests_total", "Requests seen by the test.")
+    metrics.inc("test_requests_total", route="local")
+    metrics.inc("test_requests_total", 2, route="local")
+    for value in (0.07, 0.3, 999):
+        metrics.observe("test_latency_seconds", value, model="m")
+
+    path = tmp_path / "metrics.prom"
+    metrics.dump(str(path))
+    lines = path.read_text().splitlines()
+
+    assert "# HELP test_requests_total Requests seen by the test." in lines
+    assert "# TYPE test_requests_total counter" in lines
+    assert 'test_requests_total{route="local"} 3' in lines
+    assert "# TYPE test_latency_seconds histogram" in lines
+    assert 'test_latency_seconds_bucket{model="m",le="0.05"} 0' in lines
+    assert 'test_latency_seconds_bucket{model="m",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{model="m",le="0.5"} 2' in lines
+    assert 'test_latency_seconds_bucket{model="m",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{model="m"} 3' in lines
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pipeline
+
+
+def test_records_come_back_in_input_order_with_failures_recorded():
+    def transcribe(path):
+        if path == "bad-audio":
+            raise ValueError("unreadable")
+        time.sleep(0.02 if path == "a" else 0)
+        return f"text of {path}"
+
+    def analyze(path, transcript):
+        if path == "bad-llm":
+            raise RuntimeError("rate limited")
+        return transcript.upper()
+
+    finished = []
+    records = pipeline.run_pipeline(["a", "bad-audio", "b", "bad-llm"], transcribe, analyze,
+                                    transcribe_workers=2, on_record=lambda r: finished.append(r["path"]))
+
+    assert [r["path"] for r in records] == ["a", "bad-audio", "b", "bad-llm"]
+    assert [r["ok"] for r in records] == [True, False, True, False]
+    assert records[0]["output"] == "TEXT OF A"
+    assert records[1]["error"] == "ValueError: unreadable"
+    assert records[3]["error"] == "RuntimeError: rate limited"
+    assert sorted(finished) == sorted(["a", "bad-audio", "b", "bad-llm"])
+
+
+def test_the_next_call_is_transcribed_while_the_previous_one_is_analyzed():
+    analyzing = threading.Event()
+    overlapped = []
+
+    def transcribe(path):
+        if path == "second":
+            # Only reachable in time if the analyze stage already started on "first"
+            overlapped.append(analyzing.wait(timeout=2))
+        return path
+
+    def analyze(path, transcript):
+        analyzing.set()
+        time.sleep(0.05)
+        return transcript
+
+    records = pipeline.run_pipeline(["first", "second"], transcribe, analyze)
+
+    assert overlapped == [True]
+    assert all(r["ok"] for r in records)
+
+
+def test_transcription_pauses_when_the_analyze_stage_falls_behind():
+    release = threading.Event()
+    transcribed = []
+
+    def transcribe(path):
+        transcribed.append(path)
+        return path
+
+    def analyze(path, transcript):
+        release.wait(timeout=5)
+        return transcript
+
+    paths = [f"call-{i}" for i in range(8)]
+    runner = threading.Thread(target=pipeline.run_pipeline, args=(paths, transcribe, analyze),
+                              kwargs={"analyze_workers": 1, "queue_size": 1})
+    runner.start()
+    time.sleep(0.2)
+    # One being analyzed, one queued, one blocked on the full queue
+    assert len(transcribed) <= 3
+    release.set()
+    runner.join(timeout=5)
+    assert len(transcribed) == len(paths)
@@ -0,0 +1,83 @@
+import analysis
+import search_index
+
+TRANSCRIPT = "Founder: Send me something on email and I will look at it later this week."
+REPORT = """**1. Founder Context Awareness**
+
+The founder is busy and guarded, and defers with an email request.
+
+**4. Trust & Risk Perception**
+
+Trust is low; the founder has heard similar pitches before.
+"""
+
+
+def test_transcripts_and_report_sections_are_searchable(tmp_path):
+    index = search_index.SearchIndex(str(tmp_path / "search.db"))
+    index.add_transcript(TRANSCRIPT, source="call.mp3", model="base")
+    index.add_report(TRANSCRIPT, REPORT, model="llama3", language="English")
+
+    hits = index.search("email")
+    assert {(h["kind"], h["section"]) for h in hits} == {("transcript", None), ("section", 1)}
+    assert all(h["source"] == "call.mp3" for h in hits)  # report hits find the call's audio
+
+    section = index.search("pitches", kind="section")[0]
+    assert (section["section"], section["section_title"]) == (4, "Trust & Risk Perception")
+    assert "[pitches]" in section["snippet"]
+    assert index.search("email", kind="transcript", model="base")[0]["kind"] == "transcript"
+    assert index.stats()["calls"] == 1
+
+
+def test_a_new_report_for_the_same_call_replaces_the_old_one(tmp_path):
+    index = search_index.SearchIndex(str(tmp_path / "search.db"))
+    index.add_report(TRANSCRIPT, REPORT, model="llama3", language="English")
+
+    index.add_report(TRANSCRIPT, REPORT.replace("similar pitches", "similar offers"), model="llama3",
+                     language="English")
+
+    assert index.search("pitches") == []
+    assert len(index.search("offers")) == 1
+    assert index.stats()["section"] == 2
+
+
+def test_hits_are_ranked_by_relevance(tmp_path):
+    index = search_index.SearchIndex(str(tmp_path / "search.db"))
+    index.add_transcript("The founder mentions pricing once among many other unrelated topics of the week.")
+    index.add_transcript("Pricing, pricing and more pricing: the founder only wants to talk about pricing.")
+
+    hits = index.search("pricing")
+
+    assert [h["snippet"].count("[pricing]") + h["snippet"].count("[Pricing]") for h in hits] == [4, 1]
+
+
+def test_a_query_that_does_not_parse_is_searched_as_a_phrase(tmp_path):
+    index = search_index.SearchIndex(str(tmp_path / "search.db"))
+    index.add_transcript(TRANSCRIPT)
+
+    assert len(index.search('"look at')) == 1
+
+
+def test_indexing_degrades_to_a_warning_without_fts5(tmp_path, monkeypatch, capsys):
+    # Same error path as a Python whose SQLite lacks the fts5 module
+    monkeypatch.setattr(search_index, "SCHEMA", search_index.SCHEMA.replace("USING fts5", "USING no_such_fts"))
+    monkeypatch.setattr(search_index, "_index", None)
+    monkeypatch.setenv("CALL_ANALYZER_SEARCH_DB", str(tmp_path / "search.db"))
+
+    search_index.index_transcript(TRANSCRIPT)
+    search_index.index_report(TRANSCRIPT, REPORT)
+
+    output = capsys.readouterr().out
+    assert "Could not index transcript" in output and "no FTS5 support" in output
+    assert "Could not index report" in output
+
+
+def test_analysis_indexes_the_report_it_produces(tmp_path, monkeypatch, fake_backend):
+    index = search_index.SearchIndex(str(tmp_path / "search.db"))
+    monkeypatch.setattr(search_index, "_index", index)
+    transcript = TRANSCRIPT + " Caller: Of course, I will send two short examples from teams at your stage today."
+    fake_backend.replies = [REPORT]
+
+    analysis.analyze(transcript, None, backend="fake", fresh=True, parallel_sections=False)
+
+    hit = index.search("pitches")[0]
+    assert (hit["call"], hit["model"], hit["section"]) == (search_index.call_id(transcript), "fake-model", 4)
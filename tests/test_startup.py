@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import startup
+
+HEAVY = ("whisper", "torch", "huggingface_hub", "gradio", "streamlit", "llama_cpp", "faster_whisper")
+
+
+@pytest.fixture
+def preload(monkeypatch):
+    # Fresh preload state for each test; the loaders are replaced by the test
+    monkeypatch.setattr(startup, "_thread", None)
+    monkeypatch.setattr(startup, "_done", threading.Event())
+    monkeypatch.setattr(startup, "_status", {})
+    return monkeypatch
+
+
+def test_entry_points_import_without_the_heavy_libraries():
+    code = ("import sys, analyze_call, app_gradio, analysis, transcription, jobs, startup; "
+            f"print('heavy:', *[m for m in {HEAVY!r} if m in sys.modules])")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+
+    assert result.stdout.splitlines()[-1] == "heavy:"
+
+
+def test_the_preload_runs_in_the_background_and_reports_readiness(preload):
+    release = threading.Event()
+    preload.setattr(startup, "_load_whisper", lambda name: release.wait(5))
+    preload.setattr(startup, "_warm_analysis", lambda: None)
+
+    thread = startup.start_preload("base")
+    assert startup.start_preload("base") is thread  # e.g. a Streamlit rerun
+    assert not startup.ready()
+    assert startup.describe().startswith("⏳ Loading models in the background: whisper")
+
+    release.set()
+    assert startup.wait(5)
+    assert startup.describe().startswith("✅ Models ready (whisper ")
+
+
+def test_a_failed_preload_is_reported_and_left_to_the_first_request(preload):
+    def broken(name):
+        raise RuntimeError("no weights")
+
+    preload.setattr(startup, "_load_whisper", broken)
+    startup.start_preload("base", warm_analysis=False)
+
+    assert startup.wait(5) is False
+    assert startup.done()
+    assert startup.status()["whisper"]["error"] == "RuntimeError: no weights"
+    assert startup.describe() == ("⚠️ Preload failed for whisper (RuntimeError: no weights); "
+                                  "it will be retried on the first request.")
@@ -0,0 +1,138 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import stream_transcription
+import whisper_registry
+
+SR = stream_transcription.SAMPLE_RATE
+
+
+def _speech(seconds, rng):
+    # Noise bursts with short pauses, which the energy VAD treats as speech
+    audio = rng.uniform(-0.3, 0.3, int(seconds * SR)).astype(np.float32)
+    t = np.arange(len(audio)) / SR
+    audio[(t % 0.6) >= 0.4] = 0.0
+    return audio
+
+
+def _recording():
+    # 6 s of speech, 8 s of silence, 6 s of speech
+    rng = np.random.default_rng(0)
+    return np.concatenate([_speech(6, rng), np.zeros(8 * SR, dtype=np.float32), _speech(6, rng)])
+
+
+class WindowModel:
+    # Fake LoadedModel: one segment per window, optionally failing on one call
+    def __init__(self, label="part ", fail_on=None):
+        self.calls = []
+        self.label = label
+        self.fail_on = fail_on
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        if len(self.calls) == self.fail_on:
+            raise RuntimeError("worker killed")
+        text = f" {self.label}{len(self.calls)}."
+        return {"text": text, "language": "en",
+                "segments": [{"id": 0, "start": 0.0, "end": len(audio) / SR, "text": text}]}
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    recording = _recording()
+    blocks = []
+
+    def read_windows(path, window_s, start_s=0.0):
+        # Same contract as the ffmpeg pipe (including -ss for resuming)
+        audio = recording[int(round(start_s * SR)):]
+        size = int(window_s * SR)
+        for i in range(0, len(audio), size):
+            blocks.append(len(audio[i:i + size]))
+            yield audio[i:i + size]
+
+    monkeypatch.setattr(stream_transcription, "read_windows", read_windows)
+    monkeypatch.setattr(stream_transcription.whisper_registry, "resolve",
+                        lambda precision=None, engine=None: ("cpu", "fp32", "openai"))
+    return blocks
+
+
+def _source(tmp_path):
+    path = tmp_path / "day.wav"
+    path.write_bytes(b"all-day recording")
+    return str(path)
+
+
+def _use(monkeypatch, model):
+    monkeypatch.setattr(whisper_registry, "get_model", lambda *args: model)
+
+
+def test_the_cut_lands_on_the_pause_near_the_end_of_the_window():
+    audio = np.full(5 * SR, 0.3, dtype=np.float32)
+    audio[int(3.0 * SR):int(3.1 * SR)] = 0.0
+
+    cut = stream_transcription.cut_point(audio)
+
+    assert 3.0 * SR < cut <= 3.1 * SR
+    assert stream_transcription.cut_point(audio[:100]) == 100  # shorter than a frame: keep it all
+
+
+def test_windows_are_written_as_they_finish_and_silence_is_skipped(stream, monkeypatch, tmp_path):
+    model = WindowModel()
+    _use(monkeypatch, model)
+    progress = []
+
+    result = stream_transcription.transcribe_stream(_source(tmp_path), str(tmp_path / "out"), window_s=4,
+                                                    on_progress=progress.append)
+
+    segments = list(stream_transcription.iter_segments(result["segments_path"]))
+    assert len(model.calls) < len(stream)  # the silent middle was never decoded
+    assert model.calls[1]["initial_prompt"] == "part 1."
+    assert [s["id"] for s in segments] == list(range(len(segments)))
+    assert all(a["end"] <= b["start"] + 0.01 for a, b in zip(segments, segments[1:]))
+    assert segments[-1]["end"] == pytest.approx(20.0, abs=0.05)
+    assert result["audio_seconds"] == pytest.approx(20.0)
+    assert open(result["text_path"]).read().splitlines() == [f"part {i + 1}." for i in range(len(model.calls))]
+    assert [p["audio_seconds"] for p in progress] == sorted(p["audio_seconds"] for p in progress)
+    assert max(stream) <= 4 * SR  # never more than one window read at a time
+
+
+def test_an_interrupted_run_resumes_where_it_stopped(stream, monkeypatch, tmp_path):
+    audio = _source(tmp_path)
+    _use(monkeypatch, WindowModel(label="first run ", fail_on=2))
+    with pytest.raises(RuntimeError):
+        stream_transcription.transcribe_stream(audio, str(tmp_path / "out"), window_s=4)
+    state = json.load(open(tmp_path / "out" / stream_transcription.STATE_FILE))
+    assert 0 < state["offset_s"] < 20 and not state["done"]
+
+    model = WindowModel(label="second run ")
+    _use(monkeypatch, model)
+    result = stream_transcription.transcribe_stream(audio, str(tmp_path / "out"), window_s=4)
+
+    assert result["resumed"]
+    assert model.calls[0]["initial_prompt"] == "first run 1."  # context carried over
+    lines = open(result["text_path"]).read().splitlines()
+    assert lines == ["first run 1."] + [f"second run {i + 1}." for i in range(len(model.calls))]
+    segments = list(stream_transcription.iter_segments(result["segments_path"]))
+    assert [s["id"] for s in segments] == list(range(len(segments)))
+    assert segments[0]["start"] == 0.0
+    assert segments[-1]["end"] == pytest.approx(20.0, abs=0.05)
+
+    # A finished transcript is not redone
+    again = stream_transcription.transcribe_stream(audio, str(tmp_path / "out"), window_s=4)
+    assert again["segments"] == len(segments)
+    assert len(model.calls) == len(lines) - 1
+
+
+def test_uploaded_bytes_go_through_a_temp_file_that_is_removed(stream, monkeypatch, tmp_path):
+    _use(monkeypatch, WindowModel())
+    paths = []
+    real_digest = stream_transcription.audio_ingest.source_digest
+    monkeypatch.setattr(stream_transcription.audio_ingest, "source_digest",
+                        lambda source: paths.append(source) or real_digest(source))
+
+    stream_transcription.transcribe_stream(b"uploaded audio", str(tmp_path / "out"), window_s=4)
+
+    assert len(paths) == 1 and not os.path.exists(paths[0])
@@ -0,0 +1,56 @@
+import sys
+import threading
+import types
+
+import token_budget
+
+
+def test_a_slow_tokenizer_download_does_not_block_other_models(monkeypatch):
+    release = threading.Event()
+    loaded = []
+
+    class Tokenizer:
+        @staticmethod
+        def from_pretrained(model_id, token=None):
+            if model_id == "slow/model":
+                release.wait(5)
+            loaded.append(model_id)
+            return model_id
+
+    monkeypatch.setitem(sys.modules, "tokenizers", types.SimpleNamespace(Tokenizer=Tokenizer))
+    monkeypatch.setattr(token_budget, "_tokenizers", {})
+    slow = threading.Thread(target=token_budget.get_tokenizer, args=("slow/model",))
+    slow.start()
+    try:
+        assert token_budget.get_tokenizer("fast/model") == "fast/model"
+        assert loaded == ["fast/model"]
+    finally:
+        release.set()
+        slow.join(5)
+    assert token_budget.get_tokenizer("slow/model") == "slow/model"
+    assert loaded == ["fast/model", "slow/model"]
+
+
+def test_the_completion_budget_shrinks_then_falls_back_to_map_reduce(monkeypatch):
+    monkeypatch.setitem(token_budget.CONTEXT_WINDOWS, "small/model", 4000)
+
+    assert token_budget.plan_completion(1000, "small/model", 2500) == ("single", 2500)
+    assert token_budget.plan_completion(2500, "small/model", 2500) == ("single", 1500)
+    assert token_budget.plan_completion(3000, "small/model", 2500) == ("map_reduce", 2500)
+
+
+def test_usage_is_logged_per_call_and_summarized_per_model(monkeypatch, tmp_path):
+    path = tmp_path / "usage.jsonl"
+    monkeypatch.setattr(token_budget, "USAGE_LOG", str(path))
+    for prompt, completion in ((1000, 900), (3000, 1100)):
+        token_budget.record_usage(model="m", route="single", prompt_tokens=prompt, completion_tokens=completion)
+    token_budget.record_usage(model="m", route="local", prompt_tokens=0, completion_tokens=0)
+    with open(path, "a") as f:
+        f.write("not json\n")
+
+    summary = token_budget.usage_summary()["m"]
+
+    assert summary["calls"] == 3
+    assert summary["routes"] == {"single": 2, "local": 1}
+    assert summary["prompt_tokens"] == {"total": 4000, "mean": 2000.0, "p95": 3000, "max": 3000}
+    assert summary["completion_tokens"]["mean"] == 1000.0
@@ -0,0 +1,98 @@
+import numpy as np
+
+import audio_ingest
+import transcription
+import vad_transcription
+import whisper_registry
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, fp16=False, **options):
+        self.calls += 1
+        return {"text": "hello there", "segments": [], "language": "en"}
+
+
+def test_batch_and_auto_runs_share_a_serial_transcript(monkeypatch, tmp_path):
+    model = CountingModel()
+    monkeypatch.setattr(whisper_registry, "_models", {})
+    monkeypatch.setattr(whisper_registry, "_load", lambda *args: (model, None))
+    monkeypatch.setattr(whisper_registry, "_cuda_available", lambda: False)
+    monkeypatch.setattr(vad_transcription, "WORKERS", 2)
+    # 10 s: below PARALLEL_MIN_SECONDS, so "auto" decodes serially
+    monkeypatch.setattr(audio_ingest, "load", lambda source, digest=None: np.zeros(160000, dtype=np.float32))
+    audio = tmp_path / "call.wav"
+    audio.write_bytes(b"short call")
+
+    first = transcription.transcribe(str(audio), parallel=False)
+    second = transcription.transcribe(str(audio), parallel="auto")
+
+    assert not first["cached"]
+    assert second["cached"]
+    assert model.calls == 1
+
+
+def test_parallel_chunks_accept_the_callers_own_decode_options(monkeypatch):
+    seen = {}
+
+    class Model:
+        def transcribe(self, audio, **options):
+            seen.update(options)
+            return {"text": "hi", "segments": [], "language": "en"}
+
+    monkeypatch.setattr(whisper_registry, "_models", {})
+    monkeypatch.setattr(whisper_registry, "_load", lambda *args: (Model(), None))
+    monkeypatch.setattr(whisper_registry, "_cuda_available", lambda: False)
+
+    result = vad_transcription._decode_chunk(0, 0.0, np.zeros(16000, dtype=np.float32), "base", None, None,
+                                             {"condition_on_previous_text": True, "fp16": True, "language": "en"})
+
+    assert result[1] == "hi"
+    assert seen["condition_on_previous_text"] is False
+    assert seen["fp16"] is False  # fp32 weights on CPU
+    assert seen["language"] == "en"
+
+
+def test_the_chunk_pool_is_rebuilt_when_the_model_changes(monkeypatch):
+    pools = []
+
+    class Pool:
+        def __init__(self, max_workers, initializer, initargs):
+            self.initargs = initargs
+            self.shut_down = False
+            pools.append(self)
+
+        def shutdown(self, wait=True):
+            self.shut_down = True
+
+    monkeypatch.setattr(vad_transcription, "ProcessPoolExecutor", Pool)
+    monkeypatch.setattr(vad_transcription, "_pool", None)
+    monkeypatch.setattr(vad_transcription, "_pool_config", None)
+
+    base = vad_transcription._get_pool("base", "openai", "fp32")
+    assert vad_transcription._get_pool("base", "openai", "fp32") is base
+    small = vad_transcription._get_pool("small", "faster-whisper", "int8")
+
+    assert small is not base and base.shut_down and not small.shut_down
+    assert (small.initargs[0], small.initargs[2:]) == ("small", ("faster-whisper", "int8"))
+
+
+def test_the_cache_follows_the_audio_content_not_the_file_name(monkeypatch, tmp_path):
+    model = CountingModel()
+    monkeypatch.setattr(whisper_registry, "_models", {})
+    monkeypatch.setattr(whisper_registry, "_load", lambda *args: (model, None))
+    monkeypatch.setattr(whisper_registry, "_cuda_available", lambda: False)
+    monkeypatch.setattr(audio_ingest, "load", lambda source, digest=None: np.zeros(16000, dtype=np.float32))
+    original = tmp_path / "call.wav"
+    original.write_bytes(b"cache by content")
+    renamed = tmp_path / "renamed copy.wav"
+    renamed.write_bytes(b"cache by content")
+
+    transcription.transcribe(str(original), parallel=False)
+    assert transcription.transcribe(str(renamed), parallel=False)["cached"]
+    assert transcription.transcribe(original.read_bytes(), parallel=False)["cached"]  # an upload's bytes
+    assert not transcription.transcribe(str(original), model_name="small", parallel=False)["cached"]
+    assert not transcription.transcribe(str(original), parallel=False, language="hi")["cached"]
+    assert model.calls == 3
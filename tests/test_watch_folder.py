@@ -0,0 +1,71 @@
+import os
+import time
+
+import watch_folder
+
+
+def test_discover_counts_files_that_are_still_being_written(tmp_path):
+    settled = tmp_path / "settled.wav"
+    settled.write_bytes(b"old")
+    old = time.time() - 60
+    os.utime(settled, (old, old))
+    (tmp_path / "copying.wav").write_bytes(b"new")
+    manifest = watch_folder.Manifest(str(tmp_path / "manifest.db"))
+
+    queued, unsettled = watch_folder.discover(manifest, [str(settled), str(tmp_path / "copying.wav")])
+
+    assert (queued, unsettled) == (1, 1)
+
+
+def _rewrite_on_first_run(path):
+    # The first run sees v1, replaces it with v2 (as if re-exported) and is
+    # still busy when the next scan comes round
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(f"{path}.runs", "a") as f:
+        f.write(content.decode() + "\n")
+    if content == b"v1":
+        with open(path, "wb") as f:
+            f.write(b"v2")
+        old = time.time() - 60
+        os.utime(path, (old, old))
+        time.sleep(1.0)
+    return {"ok": True, "error": None, "output": content.decode(), "transcribe_s": 0.0, "analyze_s": 0.0}
+
+
+def test_a_file_rewritten_while_running_is_processed_again(tmp_path):
+    recording = tmp_path / "call.wav"
+    recording.write_bytes(b"v1")
+    old = time.time() - 60
+    os.utime(recording, (old, old))
+    manifest_path = str(tmp_path / "manifest.db")
+    started = time.monotonic()
+
+    def list_files():
+        row = watch_folder.Manifest(manifest_path).get(str(recording))
+        if time.monotonic() - started > 10 or (row and row["status"] == watch_folder.DONE):
+            raise KeyboardInterrupt
+        return [str(recording)]
+
+    watch_folder.watch(list_files, _rewrite_on_first_run, manifest_path, interval_s=0.05)
+
+    row = watch_folder.Manifest(manifest_path).get(str(recording))
+    assert (tmp_path / "call.wav.runs").read_text().split() == ["v1", "v2"]
+    assert row["status"] == watch_folder.DONE and row["output"] == "v2"
+
+
+def test_once_scans_the_folders_a_single_time(tmp_path):
+    recording = tmp_path / "call.wav"
+    recording.write_bytes(b"v2")
+    old = time.time() - 60
+    os.utime(recording, (old, old))
+    scans = []
+
+    def list_files():
+        scans.append(1)
+        return [str(recording)]
+
+    counts = watch_folder.watch(list_files, _rewrite_on_first_run, str(tmp_path / "manifest.db"), once=True)
+
+    assert len(scans) == 1
+    assert counts == {watch_folder.DONE: 1}
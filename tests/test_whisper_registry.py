@@ -0,0 +1,138 @@
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+
+import analysis
+import audio_ingest
+import jobs
+import whisper_registry
+
+
+class OverlapModel:
+    """
+    Stands in for an openai-whisper model and records overlapping decodes
+    (the real one would corrupt its shared KV cache).
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, fp16=False, **options):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.calls += 1
+        time.sleep(0.2)
+        with self._lock:
+            self.active -= 1
+        return {"text": f"hello {len(audio)}", "segments": [], "language": "en"}
+
+
+def test_concurrent_jobs_share_one_model_without_overlapping_decodes(monkeypatch, tmp_path):
+    model = OverlapModel()
+    monkeypatch.setattr(whisper_registry, "_models", {})
+    monkeypatch.setattr(whisper_registry, "_load", lambda *args: (model, None))
+    monkeypatch.setattr(audio_ingest, "load", lambda source, digest=None: np.zeros(16000, dtype=np.float32))
+    monkeypatch.setattr(analysis, "stream_analyze", lambda transcript, *args, **kwargs: iter(["report"]))
+
+    paths = []
+    for i in range(2):
+        path = tmp_path / f"call{i}.wav"
+        path.write_bytes(f"audio {i}".encode())  # different content: two separate jobs
+        paths.append(str(path))
+
+    queue = jobs.JobQueue(workers=2, output_root=str(tmp_path / "jobs"))
+    submitted = [queue.submit(path, token="t") for path in paths]
+    finished = [list(queue.watch(job.id, timeout=10))[-1] for job in submitted]
+
+    assert [snapshot["status"] for snapshot in finished] == [jobs.DONE, jobs.DONE]
+    assert model.calls == 2
+    assert model.max_active == 1
+
+
+def test_concurrent_callers_share_a_single_load(monkeypatch):
+    loads = []
+
+    def slow_load(name, device, precision, engine, threads):
+        loads.append(name)
+        time.sleep(0.2)
+        return OverlapModel(), 1024 * 1024
+
+    monkeypatch.setattr(whisper_registry, "_models", {})
+    monkeypatch.setattr(whisper_registry, "_load", slow_load)
+    entries = []
+    threads = [threading.Thread(target=lambda: entries.append(whisper_registry.get_model("base")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert loads == ["base"]
+    assert len(entries) == 4 and all(entry is entries[0] for entry in entries)
+    assert whisper_registry.stats()[0]["param_mb"] == 1.0
+
+
+def test_each_model_is_loaded_once_until_unloaded(monkeypatch):
+    loads = []
+    monkeypatch.setattr(whisper_registry, "_models", {})
+    monkeypatch.setattr(whisper_registry, "_load", lambda name, *args: loads.append(name) or (OverlapModel(), None))
+
+    base = whisper_registry.get_model("base")
+    assert whisper_registry.get_model("base") is base
+    assert whisper_registry.get_model("small") is not base
+    assert sorted(s["name"] for s in whisper_registry.stats()) == ["base", "small"]
+
+    assert whisper_registry.unload("base")
+    assert whisper_registry.get_model("base") is not base
+    assert loads == ["base", "small", "base"]
+
+
+def test_engine_and_precision_defaults_and_validation(monkeypatch):
+    monkeypatch.delenv("CALL_ANALYZER_WHISPER_ENGINE", raising=False)
+    monkeypatch.delenv("CALL_ANALYZER_WHISPER_PRECISION", raising=False)
+
+    assert whisper_registry.resolve("cpu") == ("cpu", "fp32", "openai")
+    assert whisper_registry.resolve("cuda") == ("cuda", "fp16", "openai")
+    monkeypatch.setenv("CALL_ANALYZER_WHISPER_ENGINE", "faster-whisper")
+    monkeypatch.setenv("CALL_ANALYZER_WHISPER_PRECISION", "int8")
+    assert whisper_registry.resolve("cpu") == ("cpu", "int8", "faster-whisper")
+    assert whisper_registry.resolve("cuda") == ("cuda", "int8", "faster-whisper")
+
+    for args in (("cpu", None, "onnx"), ("cpu", "bf16", None), ("cuda", "int8", "openai")):
+        with pytest.raises(ValueError):
+            whisper_registry.resolve(*args)
+
+
+def test_faster_whisper_loads_with_its_compute_type_and_thread_cap(monkeypatch):
+    created = []
+
+    class WhisperModel:
+        def __init__(self, name, device, compute_type, cpu_threads):
+            created.append((name, device, compute_type, cpu_threads))
+
+        def transcribe(self, audio, **options):
+            segments = (types.SimpleNamespace(id=i, start=i * 2.0, end=i * 2.0 + 2, text=text, avg_logprob=-0.2,
+                                              compression_ratio=1.3, no_speech_prob=0.01)
+                        for i, text in enumerate([" Hello there.", " Thanks for calling."]))
+            return segments, types.SimpleNamespace(language="en")
+
+    monkeypatch.setitem(sys.modules, "faster_whisper", types.SimpleNamespace(WhisperModel=WhisperModel))
+    monkeypatch.setattr(whisper_registry, "_models", {})
+
+    entry = whisper_registry.get_model("small", "cpu", "int8", "faster-whisper", threads=3)
+    result = entry.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+
+    assert created == [("small", "cpu", "int8", 3)]
+    assert entry.stats()["threads"] == 3 and entry.stats()["param_mb"] is None
+    assert result["text"] == " Hello there. Thanks for calling."
+    assert result["language"] == "en"
+    assert [s["end"] for s in result["segments"]] == [2.0, 4.0]
+    assert result["segments"][0]["temperature"] == 0.0
@@ -0,0 +1,176 @@
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+from disk_cache import default_cache_root
+
+# Token counting against the target model's own tokenizer, so we know before
+# sending whether a prompt fits the context window.
+# Falls back to a conservative character estimate when the tokenizer can't be
+# loaded (offline, `tokenizers` missing, or gated repo without a token).
+
+CONTEXT_WINDOWS = {
+    "meta-llama/Meta-Llama-3-8B-Instruct": 8192,
+    "mistralai/Mistral-7B-Instruct-v0.2": 32768,
+    "HuggingFaceH4/zephyr-7b-beta": 32768,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Llama-3 averages ~4 chars/token on English; Hinglish romanization runs lower
+CHARS_PER_TOKEN_ESTIMATE = 3.5
+# Chat template overhead per message (role header + end-of-turn tokens)
+TOKENS_PER_MESSAGE = 8
+# Smallest completion worth sending in one shot: a full 8-section report is
+# ~1100 Llama-3 tokens (see the *_report_llama3.txt files)
+MIN_COMPLETION_TOKENS = 1200
+
+# One JSON line per analysis (prompt/completion tokens, route) for capacity
+# planning; "0" turns it off
+USAGE_LOG = os.getenv("CALL_ANALYZER_TOKEN_LOG")
+
+_tokenizers = {}
+_registry_lock = threading.Lock()
+_key_locks = {}
+
+
+def context_window(model_id):
+    return CONTEXT_WINDOWS.get(model_id, DEFAULT_CONTEXT_WINDOW)
+
+
+def get_tokenizer(model_id):
+    """
+    Returns a `tokenizers.Tokenizer` for model_id, or None if unavailable.
+    The result (including a failure) is cached per model.
+    """
+    if model_id in _tokenizers:
+        return _tokenizers[model_id]
+    # Per-model lock: a slow download for one model doesn't hold up the others
+    with _registry_lock:
+        key_lock = _key_locks.setdefault(model_id, threading.Lock())
+
+    with key_lock:
+        if model_id in _tokenizers:
+            return _tokenizers[model_id]
+        tokenizer = None
+        try:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_pretrained(model_id, token=os.getenv("HUGGINGFACE_API_KEY"))
+        except Exception:
+            tokenizer = None
+        _tokenizers[model_id] = tokenizer
+        return tokenizer
+
+
+def count_tokens(text, model_id):
+    if not text:
+        return 0
+    tokenizer = get_tokenizer(model_id)
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+    return math.ceil(len(text) / CHARS_PER_TOKEN_ESTIMATE)
+
+
+def count_message_tokens(messages, model_id):
+    return sum(count_tokens(m["content"], model_id) + TOKENS_PER_MESSAGE for m in messages)
+
+
+def fits(messages, model_id, max_tokens):
+    """
+    True if prompt + requested completion fit in the model's context window.
+    """
+    return count_message_tokens(messages, model_id) + max_tokens <= context_window(model_id)
+
+
+def plan_completion(prompt_tokens, model_id, max_tokens):
+    """
+    Picks the completion budget and route for a prompt of prompt_tokens:
+    ("single", max_tokens) if it fits as requested, ("single", what is left)
+    if that is still enough for a full report, else ("map_reduce", max_tokens).
+    """
+    available = context_window(model_id) - prompt_tokens
+    if available >= max_tokens:
+        return "single", max_tokens
+    if available >= MIN_COMPLETION_TOKENS:
+        return "single", available
+    return "map_reduce", max_tokens
+
+
+def usage_log_path():
+    if USAGE_LOG == "0":
+        return None
+    return USAGE_LOG or os.path.join(default_cache_root(), "token_usage.jsonl")
+
+
+def record_usage(**fields):
+    """
+    Appends one analysis' token usage to the usage log. Never raises.
+    """
+    path = usage_log_path()
+    if path is None:
+        return
+    fields = dict(ts=time.strftime("%Y-%m-%dT%H:%M:%S"), **fields)
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(fields, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not write token usage: {e}")
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0
+
+
+def usage_summary(path=None):
+    """
+    Per model: calls by route, and mean/p95/max prompt and completion tokens.
+    """
+    path = path or usage_log_path()
+    models = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            stats = models.setdefault(record.get("model"), {"routes": {}, "prompt": [], "completion": []})
+            route = record.get("route")
+            stats["routes"][route] = stats["routes"].get(route, 0) + 1
+            if route not in ("cache", "local"):
+                stats["prompt"].append(record.get("prompt_tokens") or 0)
+                stats["completion"].append(record.get("completion_tokens") or 0)
+    summary = {}
+    for model, stats in models.items():
+        summary[model] = {"calls": sum(stats["routes"].values()), "routes": stats["routes"]}
+        for kind in ("prompt", "completion"):
+            values = stats[kind]
+            summary[model][f"{kind}_tokens"] = {
+                "total": sum(values),
+                "mean": round(sum(values) / len(values), 1) if values else 0,
+                "p95": _percentile(values, 0.95),
+                "max": max(values) if values else 0,
+            }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Token usage per analysis (capacity planning)")
+    parser.add_argument("command", choices=["usage"])
+    parser.add_argument("--log", default=None, help="Usage log. Default: CALL_ANALYZER_TOKEN_LOG or the cache dir")
+    args = parser.parse_args(argv)
+
+    path = args.log or usage_log_path()
+    if not path or not os.path.exists(path):
+        print(f"❌ No token usage log at {path}")
+        return 1
+    print(json.dumps(usage_summary(path), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+
+import audio_ingest
+import call_store
+import metrics
+import search_index
+import whisper_registry
+import vad_transcription
+from disk_cache import DiskCache, default_cache_root
+
+# Shared transcription step with an on-disk transcript cache.
+# Re-analyzing a call (Hinglish after English, or after a prompt change)
+# reuses the stored text + segments instead of running Whisper again.
+
+TRANSCRIPT_CACHE_MB = int(os.getenv("CALL_ANALYZER_TRANSCRIPT_CACHE_MB", "512"))
+# Recordings at least this long are split at silences and decoded in parallel on CPU
+PARALLEL_MIN_SECONDS = float(os.getenv("CALL_ANALYZER_PARALLEL_MIN_SECONDS", "600"))
+
+# Segment fields worth keeping (tokens are dropped to keep entries small)
+SEGMENT_FIELDS = ("id", "start", "end", "text", "avg_logprob", "compression_ratio", "no_speech_prob", "temperature")
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(
+            os.path.join(default_cache_root(), "transcripts"),
+            max_bytes=TRANSCRIPT_CACHE_MB * 1024 * 1024,
+        )
+    return _cache
+
+
+def file_digest(source):
+    """
+    SHA-256 of the audio bytes, so renamed or re-uploaded copies still hit the cache.
+    """
+    return audio_ingest.source_digest(source)
+
+
+def cache_key(audio_digest, model_name, options):
+    payload = json.dumps(
+        {"audio": audio_digest, "model": model_name, "options": options},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _clean_segments(segments):
+    cleaned = []
+    for segment in segments:
+        item = {}
+        for field in SEGMENT_FIELDS:
+            if field not in segment:
+                continue
+            value = segment[field]
+            if field == "id":
+                value = int(value)
+            elif field != "text":
+                value = float(value)  # numpy scalars aren't JSON-serializable
+            item[field] = value
+        cleaned.append(item)
+    return cleaned
+
+
+def _source_name(audio_path):
+    # Uploads arrive as bytes and have no name
+    return os.path.abspath(audio_path) if isinstance(audio_path, (str, os.PathLike)) else None
+
+
+def _decode_modes(parallel, device):
+    # Decode modes ("serial"/"parallel") whose cached transcript can answer
+    # this request, preferred first. "auto" depends on the duration, which
+    # isn't known before decoding, so it takes either.
+    if parallel == "auto":
+        if device == "cpu" and vad_transcription.WORKERS > 1:
+            return ["serial", "parallel"]
+        return ["serial"]
+    return ["parallel" if parallel else "serial"]
+
+
+def _use_parallel(parallel, device, duration_s):
+    if parallel == "auto":
+        return (device == "cpu" and vad_transcription.WORKERS > 1
+                and duration_s >= PARALLEL_MIN_SECONDS)
+    return bool(parallel)
+
+
+def transcribe(audio_path, model_name="base", use_cache=True, parallel="auto", on_progress=None,
+               engine=None, precision=None, **decode_options):
+    """
+    Transcribes audio_path (a file path, or the raw bytes of an upload) with Whisper and returns
+    {"text", "segments", "language", "cached"}.
+    parallel: True/False, or "auto" to use VAD-segmented parallel decoding for
+    long recordings on CPU. on_progress gets partial transcripts in that mode.
+    engine/precision default to whisper_registry's settings (see there).
+    decode_options are passed to model.transcribe and are part of the cache key.
+    """
+    with metrics.span("transcribe", model=model_name) as span:
+        return _transcribe(span, audio_path, model_name, use_cache, parallel, on_progress, engine, precision,
+                           decode_options)
+
+
+def _transcribe(span, audio_path, model_name, use_cache, parallel, on_progress, engine, precision, decode_options):
+    device, precision, engine = whisper_registry.resolve(precision=precision, engine=engine)
+    # Keyed by the decode mode actually used, not the requested flag, so
+    # batch (parallel=False) and app ("auto") runs share serial transcripts
+    options = dict(decode_options, device=device, precision=precision)
+    if engine != "openai":
+        options["engine"] = engine  # keeps existing cache entries valid
+
+    digest = file_digest(audio_path)
+    if use_cache:
+        for mode in _decode_modes(parallel, device):
+            cached = get_cache().get(cache_key(digest, model_name, dict(options, decode=mode)))
+            if cached is not None:
+                break
+        if cached is not None:
+            cached["cached"] = True
+            span.set(cached=True, transcript_chars=len(cached["text"]))
+            # Calls transcribed before the store existed get added on their next run
+            call_store.record(digest, model_name, cached, source=_source_name(audio_path))
+            search_index.index_transcript(cached["text"], source=_source_name(audio_path), model=model_name,
+                                          language=cached.get("language"))
+            return cached
+
+    # Decoded once per content and memory-mapped from the PCM cache
+    audio = audio_ingest.load(audio_path, digest)
+    duration_s = audio_ingest.duration_seconds(audio)
+    use_parallel = _use_parallel(parallel, device, duration_s)
+    span.set(cached=False, audio_seconds=round(duration_s, 2), parallel=use_parallel, engine=engine,
+             precision=precision)
+    metrics.inc("call_analyzer_audio_seconds_total", duration_s)
+    if use_parallel:
+        result = vad_transcription.transcribe_parallel(
+            audio, model_name, on_progress=on_progress, engine=engine, precision=precision, **decode_options
+        )
+    else:
+        entry = whisper_registry.get_model(model_name, device, precision, engine)
+        result = entry.transcribe(audio, **decode_options)
+
+    transcript = {
+        "text": result["text"],
+        "segments": _clean_segments(result.get("segments", [])),
+        "language": result.get("language"),
+    }
+    span.set(transcript_chars=len(transcript["text"]), segments=len(transcript["segments"]))
+    if use_cache:
+        mode = "parallel" if use_parallel else "serial"
+        get_cache().put(cache_key(digest, model_name, dict(options, decode=mode)), transcript)
+    # Segments (timings, confidence, no-speech scores) also go to the columnar store
+    call_store.record(digest, model_name, transcript, source=_source_name(audio_path), duration_s=duration_s)
+    search_index.index_transcript(transcript["text"], source=_source_name(audio_path), model=model_name,
+                                  language=transcript["language"])
+
+    transcript["cached"] = False
+    return transcript
@@ -0,0 +1,209 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import whisper_registry
+
+# Parallel transcription for long recordings.
+# 1. Voice activity detection splits the 16 kHz waveform at silences and
+#    drops non-speech regions (hold music, dead air, ringing).
+# 2. Speech regions are packed into chunks of up to MAX_CHUNK_S seconds.
+# 3. Chunks are decoded in parallel by worker processes, each holding its own
+#    Whisper model (loaded once per worker) with a share of the CPU threads.
+# 4. Results are stitched back in order with timestamps shifted to the
+#    position of each chunk in the original recording.
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+MIN_SILENCE_S = 0.6      # shorter pauses don't split speech
+MIN_SPEECH_S = 0.25      # shorter bursts are treated as noise
+PAD_S = 0.2              # keep a little context around each region
+MAX_CHUNK_S = 30.0       # one Whisper window, so no seeking inside a chunk
+MAX_MERGE_GAP_S = 2.0    # longer silences start a new chunk instead of being decoded
+
+WORKERS = int(os.getenv("CALL_ANALYZER_VAD_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+
+_pool = None
+_pool_config = None
+_pool_lock = threading.Lock()
+
+
+def _speech_mask_webrtc(audio, aggressiveness=2):
+    import webrtcvad
+
+    vad = webrtcvad.Vad(aggressiveness)
+    frame_len = SAMPLE_RATE * FRAME_MS // 1000
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    n_frames = len(pcm) // frame_len
+    return np.array([
+        vad.is_speech(pcm[i * frame_len:(i + 1) * frame_len].tobytes(), SAMPLE_RATE)
+        for i in range(n_frames)
+    ], dtype=bool)
+
+
+def _speech_mask_energy(audio):
+    # Fallback when webrtcvad isn't installed: frame RMS against an adaptive
+    # noise floor (the quietest 10% of frames)
+    frame_len = SAMPLE_RATE * FRAME_MS // 1000
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+    frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+    noise_floor = np.percentile(rms, 10)
+    threshold = max(noise_floor * 3.0, 0.005)
+    return rms > threshold
+
+
+def speech_regions(audio):
+    """
+    Returns [(start_sample, end_sample)] of speech, with short gaps bridged,
+    short blips dropped and a little padding on each side.
+    """
+    try:
+        mask = _speech_mask_webrtc(audio)
+    except ImportError:
+        mask = _speech_mask_energy(audio)
+
+    frame_len = SAMPLE_RATE * FRAME_MS // 1000
+    min_silence = int(MIN_SILENCE_S * 1000 / FRAME_MS)
+    min_speech = int(MIN_SPEECH_S * 1000 / FRAME_MS)
+    pad = int(PAD_S * SAMPLE_RATE)
+
+    regions = []
+    start = None
+    silence = 0
+    for i, is_speech in enumerate(mask):
+        if is_speech:
+            if start is None:
+                start = i
+            silence = 0
+        elif start is not None:
+            silence += 1
+            if silence >= min_silence:
+                end = i - silence + 1
+                if end - start >= min_speech:
+                    regions.append((start, end))
+                start = None
+                silence = 0
+    if start is not None and len(mask) - start >= min_speech:
+        regions.append((start, len(mask) - silence))
+
+    return [
+        (max(0, s * frame_len - pad), min(len(audio), e * frame_len + pad))
+        for s, e in regions
+    ]
+
+
+def plan_chunks(audio, max_chunk_s=MAX_CHUNK_S):
+    """
+    Packs speech regions into chunks of at most max_chunk_s, cutting only at
+    silences (a single region longer than that is cut hard).
+    Returns [(start_sample, end_sample)].
+    """
+    max_len = int(max_chunk_s * SAMPLE_RATE)
+    chunks = []
+    for start, end in speech_regions(audio):
+        while end - start > max_len:
+            chunks.append((start, start + max_len))
+            start += max_len
+        if (chunks and end - chunks[-1][0] <= max_len
+                and start - chunks[-1][1] <= MAX_MERGE_GAP_S * SAMPLE_RATE):
+            # Extend the previous chunk; the silence in between is cheap to decode
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    return chunks
+
+
+def _init_worker(model_name, threads, engine=None, precision=None):
+    whisper_registry.set_threads(max(1, threads))
+    whisper_registry.get_model(model_name, precision=precision, engine=engine, threads=max(1, threads))
+
+
+def _decode_chunk(index, offset_s, samples, model_name, engine, precision, decode_options):
+    entry = whisper_registry.get_model(model_name, precision=precision, engine=engine)
+    # Chunks are independent; merged first so a caller's own value can't clash
+    options = dict(decode_options, condition_on_previous_text=False)
+    result = entry.transcribe(samples, **options)
+    segments = []
+    for segment in result.get("segments", []):
+        segments.append({
+            "start": float(segment["start"]) + offset_s,
+            "end": float(segment["end"]) + offset_s,
+            "text": segment["text"],
+            "avg_logprob": float(segment.get("avg_logprob", 0.0)),
+            "compression_ratio": float(segment.get("compression_ratio", 0.0)),
+            "no_speech_prob": float(segment.get("no_speech_prob", 0.0)),
+            "temperature": float(segment.get("temperature", 0.0)),
+        })
+    return index, result["text"].strip(), segments, result.get("language")
+
+
+def _get_pool(model_name, engine=None, precision=None):
+    # One long-lived pool per process so workers keep their models warm. A
+    # different model/engine/precision replaces it: its workers were loaded
+    # and thread-capped for the old one
+    global _pool, _pool_config
+    config = (model_name, engine, precision)
+    with _pool_lock:
+        if _pool is not None and _pool_config != config:
+            _pool.shutdown(wait=False)  # chunks already submitted still finish
+            _pool = None
+        if _pool is None:
+            # Split this process's thread budget between the workers
+            budget = whisper_registry.default_threads() or os.cpu_count() or 1
+            threads = max(1, budget // WORKERS)
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKERS,
+                initializer=_init_worker,
+                initargs=(model_name, threads, engine, precision),
+            )
+            _pool_config = config
+        return _pool
+
+
+def transcribe_parallel(audio, model_name="base", on_progress=None, engine=None, precision=None,
+                        **decode_options):
+    """
+    Transcribes a 16 kHz float32 waveform by decoding VAD chunks in parallel.
+    on_progress({"done", "total", "text"}) is called as chunks finish; "text"
+    is the in-order transcript of every chunk finished so far.
+    Returns {"text", "segments", "language"} like model.transcribe.
+    """
+    chunks = plan_chunks(audio)
+    total = len(chunks)
+    if total == 0:
+        return {"text": "", "segments": [], "language": None}
+
+    pool = _get_pool(model_name, engine, precision)
+    futures = [
+        pool.submit(_decode_chunk, i, start / SAMPLE_RATE, np.ascontiguousarray(audio[start:end]),
+                    model_name, engine, precision, decode_options)
+        for i, (start, end) in enumerate(chunks)
+    ]
+
+    results = [None] * total
+    done = 0
+    for future in as_completed(futures):
+        index, text, segments, language = future.result()
+        results[index] = (text, segments, language)
+        done += 1
+        if on_progress is not None:
+            partial = " ".join(r[0] for r in results if r is not None and r[0])
+            on_progress({"done": done, "total": total, "text": partial})
+
+    segments = []
+    for text, chunk_segments, _ in results:
+        for segment in chunk_segments:
+            segment["id"] = len(segments)
+            segments.append(segment)
+
+    languages = [r[2] for r in results if r[2]]
+    return {
+        "text": " ".join(r[0] for r in results if r[0]),
+        "segments": segments,
+        "language": max(set(languages), key=languages.count) if languages else None,
+    }
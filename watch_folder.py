@@ -0,0 +1,215 @@
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import audio_ingest
+
+# Watch mode for analyze_call.py (--watch).
+# Polls the input folders, and a durable SQLite manifest remembers every file
+# it has seen (size, mtime, SHA-256) and how far it got:
+#
+#   pending -> running -> done | failed (retried up to MAX_ATTEMPTS times)
+#
+# - A file is only picked up once it has stopped changing (SETTLE_S).
+# - A touched-but-identical file (same hash) is not redone; changed content is.
+# - After a crash, "running" entries go back to pending. Finished stages are
+#   not redone: transcripts and reports come back from the content-addressed
+#   caches, so a resumed file only pays for the stage it was in.
+# - At most workers * 2 files are in flight, so a burst of drops queues up in
+#   the manifest instead of spawning work per file.
+
+SETTLE_S = 2.0
+MAX_ATTEMPTS = 3
+RETRY_DELAY_S = 60.0
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    output TEXT,
+    transcribe_s REAL,
+    analyze_s REAL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_status ON files(status);
+"""
+
+
+class Manifest:
+    """
+    Per-file progress, committed after every change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get(self, path):
+        row = self.conn.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def put(self, path, **fields):
+        fields["updated"] = time.time()
+        with self.conn:
+            if self.get(path) is None:
+                columns = ["path"] + list(fields)
+                self.conn.execute(
+                    f"INSERT INTO files ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                    [path] + list(fields.values()),
+                )
+            else:
+                self.conn.execute(
+                    f"UPDATE files SET {', '.join(f'{k} = ?' for k in fields)} WHERE path = ?",
+                    list(fields.values()) + [path],
+                )
+
+    def reset_running(self):
+        """
+        Puts files left "running" by a crashed or killed run back in the queue.
+        """
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE files SET status = ?, attempts = MAX(attempts - 1, 0) WHERE status = ?",
+                (PENDING, RUNNING),
+            ).rowcount
+
+    def next_batch(self, limit, exclude=()):
+        rows = self.conn.execute(
+            "SELECT path FROM files WHERE status = ? "
+            "OR (status = ? AND attempts < ? AND updated < ?) ORDER BY mtime_ns",
+            (PENDING, FAILED, MAX_ATTEMPTS, time.time() - RETRY_DELAY_S),
+        ).fetchall()
+        return [r["path"] for r in rows if r["path"] not in exclude][:limit]
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+
+
+def discover(manifest, paths):
+    """
+    Records new or changed files as pending. Returns (queued, unsettled): how
+    many were queued and how many were skipped because they are still changing.
+    """
+    queued = 0
+    unsettled = 0
+    now = time.time()
+    for path in paths:
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if now - stat.st_mtime < SETTLE_S:
+            unsettled += 1  # probably still being copied in
+            continue
+        row = manifest.get(path)
+        if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            continue
+
+        try:
+            digest = audio_ingest.source_digest(path)
+        except OSError:
+            continue
+        if row is not None and row["digest"] == digest and row["status"] == DONE:
+            # Touched or copied over with the same content
+            manifest.put(path, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            continue
+        manifest.put(path, size=stat.st_size, mtime_ns=stat.st_mtime_ns, digest=digest,
+                     status=PENDING, attempts=0, error=None)
+        queued += 1
+    return queued, unsettled
+
+
+def watch(list_files, process_fn, manifest_path, workers=1, initializer=None, initargs=(),
+          interval_s=5.0, once=False):
+    """
+    Runs process_fn(path) -> record (see analyze_call.process_file) for every
+    new or changed file returned by list_files(), with at most workers * 2
+    files in flight. once=True drains what is there now and returns.
+    """
+    manifest = Manifest(manifest_path)
+    resumed = manifest.reset_running()
+    if resumed:
+        print(f"♻️ Resuming {resumed} file(s) interrupted in a previous run")
+    print(f"👀 Watching for new recordings (manifest: {manifest_path}). Press Ctrl+C to stop.")
+
+    max_in_flight = max(1, workers) * 2
+    in_flight = {}  # future -> (path, digest it was submitted with)
+    last_scan = None
+    unsettled = 0
+    pool = ProcessPoolExecutor(max_workers=max(1, workers), initializer=initializer, initargs=initargs)
+    try:
+        while True:
+            # once=True scans (and hashes) the folders a single time up front
+            if last_scan is None or (not once and time.monotonic() - last_scan >= interval_s):
+                queued, unsettled = discover(manifest, list_files())
+                last_scan = time.monotonic()
+                if queued:
+                    print(f"📥 {queued} new or changed file(s)")
+
+            free = max_in_flight - len(in_flight)
+            if free > 0:
+                for path in manifest.next_batch(free, exclude={path for path, _ in in_flight.values()}):
+                    row = manifest.get(path)
+                    manifest.put(path, status=RUNNING, attempts=row["attempts"] + 1)
+                    in_flight[pool.submit(process_fn, path)] = (path, row["digest"])
+
+            if not in_flight:
+                if once:
+                    if unsettled:
+                        print(f"⏳ Skipped {unsettled} file(s) still being written; run again once they have settled.")
+                    break
+                time.sleep(interval_s)
+                continue
+
+            done, _ = wait(list(in_flight), timeout=interval_s, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, digest = in_flight.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # Worker crash: only this file fails
+                    record = {"ok": False, "error": f"{type(e).__name__}: {e}", "output": None,
+                              "transcribe_s": 0.0, "analyze_s": 0.0}
+                if manifest.get(path)["digest"] != digest:
+                    # Rewritten while it ran: discover() already queued the new content
+                    print(f"🔁 {path} changed while it was processed; queued again")
+                    continue
+                manifest.put(
+                    path,
+                    status=DONE if record["ok"] else FAILED,
+                    error=record["error"],
+                    output=record["output"],
+                    transcribe_s=record["transcribe_s"],
+                    analyze_s=record["analyze_s"],
+                )
+                counts = manifest.counts()
+                progress = (f"[{counts.get(DONE, 0)} done, {counts.get(FAILED, 0)} failed, "
+                            f"{counts.get(PENDING, 0) + counts.get(RUNNING, 0)} queued]")
+                if record["ok"]:
+                    print(f"✅ {progress} {path} -> {record['output']}")
+                else:
+                    print(f"❌ {progress} {path}: {record['error']}")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping; unfinished files will be resumed next time.")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        for path, _ in in_flight.values():
+            manifest.put(path, status=PENDING)
+    return manifest.counts()
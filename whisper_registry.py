@@ -0,0 +1,270 @@
+import os
+import threading
+import time
+
+import metrics
+
+# Process-wide registry of loaded Whisper models.
+# Loading "base" re-reads ~140MB of weights and re-allocates them, so every
+# entry point shares one copy per (model size, device, precision, engine).
+#
+# Engines (CALL_ANALYZER_WHISPER_ENGINE):
+#   openai          the openai-whisper PyTorch model (default). On CPU it can
+#                   run with int8 dynamic quantization of the Linear layers.
+#   faster-whisper  CTranslate2 implementation (pip install faster-whisper);
+#                   int8 on CPU is usually the fastest option there.
+# Precision: CALL_ANALYZER_WHISPER_PRECISION (fp32/fp16/int8).
+# CALL_ANALYZER_WHISPER_THREADS caps the intra-op threads of each process, so
+# several concurrent transcriptions don't fight over the same cores.
+
+ENGINES = ("openai", "faster-whisper")
+PRECISIONS = ("fp16", "fp32", "int8")
+# faster-whisper compute types
+_COMPUTE_TYPES = {"fp16": "float16", "fp32": "float32", "int8": "int8"}
+
+_models = {}
+_registry_lock = threading.Lock()
+_key_locks = {}
+
+
+class LoadedModel:
+    """
+    A loaded Whisper model plus what it cost to load.
+    openai-whisper decodes are serialized: each one installs KV-cache hooks
+    on the shared model, so two at once would overwrite each other's cache.
+    Run transcriptions in processes (batch mode) to decode in parallel.
+    """
+
+    def __init__(self, model, name, device, precision, load_seconds, param_bytes, rss_delta_bytes,
+                 engine="openai", threads=None):
+        self.model = model
+        self.name = name
+        self.device = device
+        self.precision = precision
+        self.engine = engine
+        self.threads = threads
+        self.load_seconds = load_seconds
+        self.param_bytes = param_bytes
+        self.rss_delta_bytes = rss_delta_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def fp16(self):
+        # Pass to model.transcribe(..., fp16=...) so decoding matches the loaded weights
+        return self.precision == "fp16"
+
+    def transcribe(self, audio, **options):
+        """
+        model.transcribe for either engine; returns {"text", "segments", "language"}.
+        """
+        if self.engine == "openai":
+            with self._lock:
+                # fp16 must match the loaded weights, whatever the caller passed
+                return self.model.transcribe(audio, **dict(options, fp16=self.fp16))
+
+        segments, info = self.model.transcribe(audio, **options)
+        result = {"text": "", "segments": [], "language": info.language}
+        for segment in segments:  # a generator: decoding happens here
+            result["segments"].append({
+                "id": segment.id,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob,
+                "temperature": getattr(segment, "temperature", 0.0),  # newer releases only
+            })
+        result["text"] = "".join(s["text"] for s in result["segments"])
+        return result
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "engine": self.engine,
+            "device": self.device,
+            "precision": self.precision,
+            "threads": self.threads,
+            "load_seconds": round(self.load_seconds, 3),
+            "param_mb": round(self.param_bytes / 1024 / 1024, 1) if self.param_bytes is not None else None,
+            "rss_delta_mb": round(self.rss_delta_bytes / 1024 / 1024, 1) if self.rss_delta_bytes is not None else None,
+        }
+
+    def __repr__(self):
+        s = self.stats()
+        return (f"<Whisper {s['name']} ({s['engine']}) on {s['device']}/{s['precision']}: "
+                f"loaded in {s['load_seconds']}s, {s['param_mb']}MB params>")
+
+
+def _current_rss():
+    # Resident set size in bytes, or None if we can't tell on this platform
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def default_threads():
+    # Read on every call so worker processes pick up what the parent set
+    return int(os.getenv("CALL_ANALYZER_WHISPER_THREADS", "0")) or None
+
+
+def _cuda_available():
+    try:
+        import torch
+    except ImportError:
+        return False  # faster-whisper can run without PyTorch
+    return torch.cuda.is_available()
+
+
+def resolve(device=None, precision=None, engine=None):
+    """
+    Fills in the default device, precision and engine for this machine.
+    Returns (device, precision, engine).
+    """
+    engine = engine or os.getenv("CALL_ANALYZER_WHISPER_ENGINE") or "openai"
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported Whisper engine '{engine}' (use {' or '.join(repr(e) for e in ENGINES)}).")
+    if device is None:
+        device = "cuda" if _cuda_available() else "cpu"
+    precision = precision or os.getenv("CALL_ANALYZER_WHISPER_PRECISION") or None
+    if precision is None:
+        # fp16 is only a win on GPU; on CPU Whisper falls back to fp32 anyway
+        precision = "fp16" if device.startswith("cuda") else "fp32"
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported precision '{precision}' (use {', '.join(PRECISIONS)}).")
+    if engine == "openai" and precision == "int8" and device != "cpu":
+        raise ValueError("int8 with the openai engine is CPU-only (PyTorch dynamic quantization).")
+    return device, precision, engine
+
+
+def set_threads(threads):
+    """
+    Caps PyTorch's intra-op thread pool for this process.
+    """
+    if not threads:
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def _quantize_int8(model):
+    # Dynamic int8 quantization of every Linear layer (weights stored as int8,
+    # activations quantized on the fly). Whisper uses its own Linear subclass,
+    # which only casts dtypes, so it is turned back into nn.Linear first:
+    # quantize_dynamic only swaps exact nn.Linear modules.
+    import torch
+
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _weight_bytes(model):
+    # Quantized layers keep their weights in packed params, not parameters()
+    import torch
+
+    total = 0
+    for value in model.state_dict().values():
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _load(name, device, precision, engine, threads):
+    # Returns (model, weight bytes or None)
+    if engine == "faster-whisper":
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("The faster-whisper engine needs: pip install faster-whisper")
+        model = WhisperModel(name, device=device, compute_type=_COMPUTE_TYPES[precision],
+                             cpu_threads=threads or 0)
+        return model, None
+
+    # Imported here, not at module level: whisper pulls in torch (seconds)
+    import whisper
+
+    set_threads(threads)
+    model = whisper.load_model(name, device=device)
+    if precision == "fp16":
+        model = model.half()
+    elif precision == "int8":
+        model = _quantize_int8(model)
+    return model, _weight_bytes(model)
+
+
+def get_model(name="base", device=None, precision=None, engine=None, threads=None):
+    """
+    Returns the shared LoadedModel for (name, device, precision, engine),
+    loading it on first use. Concurrent callers for the same key wait for a
+    single load. threads (default CALL_ANALYZER_WHISPER_THREADS) applies to
+    the first load.
+    """
+    device, precision, engine = resolve(device, precision, engine)
+    key = (name, device, precision, engine)
+
+    entry = _models.get(key)
+    if entry is not None:
+        return entry
+
+    with _registry_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        entry = _models.get(key)
+        if entry is not None:
+            return entry
+
+        threads = threads or default_threads()
+        with metrics.span("model_load", model=name, device=device, precision=precision, engine=engine) as span:
+            rss_before = _current_rss()
+            started = time.perf_counter()
+            model, param_bytes = _load(name, device, precision, engine, threads)
+            load_seconds = time.perf_counter() - started
+            rss_after = _current_rss()
+
+            rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            span.set(param_bytes=param_bytes, rss_delta_bytes=rss_delta)
+
+        entry = LoadedModel(model, name, device, precision, load_seconds, param_bytes, rss_delta,
+                            engine=engine, threads=threads)
+        _models[key] = entry
+        return entry
+
+
+def preload(name="base", device=None, precision=None, engine=None, threads=None):
+    """
+    Loads a model eagerly (e.g. at app launch) and prints what it cost.
+    """
+    entry = get_model(name, device, precision, engine, threads)
+    s = entry.stats()
+    print(f"🎧 Whisper '{s['name']}' ({s['engine']}) ready on {s['device']}/{s['precision']} "
+          f"in {s['load_seconds']}s ({s['param_mb'] or '?'}MB params, RSS +{s['rss_delta_mb']}MB)")
+    return entry
+
+
+def unload(name="base", device=None, precision=None, engine=None):
+    """
+    Drops a model from the registry (e.g. between benchmark configurations).
+    """
+    device, precision, engine = resolve(device, precision, engine)
+    return _models.pop((name, device, precision, engine), None) is not None
+
+
+def stats():
+    """
+    Load statistics for every model currently held by this process.
+    """
+    return [entry.stats() for entry in list(_models.values())]